@@ -0,0 +1,124 @@
+"""
+/analyze-product and product read logic shared by the Flask app (app.py)
+and the ASGI server (asgi.py). Each front end does its own I/O (scrape,
+score, database) and turns the bodies built here into its responses.
+"""
+from http_utils import parse_review_options, apply_review_options, json_safe
+from scraper.scraper import detect_product_type, mock_details
+from database.products import PENDING
+
+DEFAULT_PRODUCT_NAME = "Unknown Product"
+
+
+def parse_analyze_request(data, args):
+    """
+    Reads the JSON body and query string of /analyze-product. Returns
+    ({"url", "product_name", "review_options"}, error message).
+    """
+    if not data or "url" not in data:
+        return None, "Product review URL is required"
+
+    # Optional response shaping: ?reviews=all|none|top&limit=&offset=&truncate=
+    review_options, options_error = parse_review_options(args)
+    if options_error:
+        return None, options_error
+    return {
+        "url": data["url"],
+        "product_name": data.get("product_name", DEFAULT_PRODUCT_NAME),
+        "review_options": review_options
+    }, None
+
+
+def stored_product_fields(product, review_options):
+    """
+    Analysis results of a stored product, as in the analyze response.
+    """
+    return {
+        "product_id": str(product["_id"]),
+        "product_name": product.get("product_name"),
+        "summary": product["sentiment_summary"],
+        "score_stats": product.get("score_stats"),
+        "rating": product.get("rating"),
+        "reviews_total": product.get("total_reviews", len(product.get("reviews", []))),
+        "reviews": apply_review_options(product.get("reviews", []), review_options),
+        # Archived review text is back after POST /products/<id>/restore
+        "reviews_archived": bool(product.get("reviews_archived"))
+    }
+
+
+def existing_product_body(product, review_options):
+    return {"message": "Product already analyzed", **stored_product_fields(product, review_options)}
+
+
+def queued_body(job, created):
+    """
+    (body, status URL) of the 202 for an analysis handed to the job queue.
+    """
+    status_url = f"/jobs/{job['_id']}"
+    return {
+        "message": "Analysis queued" if created else "Analysis already queued",
+        "job_id": str(job["_id"]),
+        "status": job["status"],
+        "status_url": status_url
+    }, status_url
+
+
+def admission_rejected_body(e):
+    """
+    (body, headers) of the 429 for a request refused by admission control.
+    """
+    return {"error": str(e), "reason": e.reason, "retry_after": e.retry_after}, {"Retry-After": str(e.retry_after)}
+
+
+def analysis_outcome(analyze_request, extracted_product_name, reviews_data, page_data):
+    """
+    What steps 1-2 produced: (product name, product type, mock details).
+    Copies the page's star rating into reviews_data. Mock reviews are
+    sample data and are never stored as the product's reviews.
+    """
+    # Use extracted product name if available, otherwise use provided name
+    product_name = extracted_product_name if extracted_product_name != DEFAULT_PRODUCT_NAME else analyze_request["product_name"]
+    reviews_data["rating"] = page_data.get("rating")
+    return product_name, detect_product_type(analyze_request["url"], product_name), mock_details(page_data)
+
+
+def analysis_body(product_name, reviews_data, mock, review_options, product_id=None, stored=None):
+    """
+    Response body of a completed analysis; product_id and stored (STORED or
+    PENDING) when it was stored. Pending stores are answered with 202.
+    """
+    if stored == PENDING:
+        message = "Product analyzed; storing is pending"
+    elif product_id:
+        message = "Product analyzed and stored successfully"
+    elif mock["mock_data"]:
+        message = "Could not scrape reviews; showing sample reviews (not stored)"
+    else:
+        message = "Product analyzed successfully (not stored - database not configured)"
+    body = {"message": message}
+    if product_id:
+        body["product_id"] = product_id
+        body["stored"] = stored
+    body.update({
+        "product_name": product_name,
+        "summary": reviews_data["summary"],
+        "score_stats": reviews_data["score_stats"],
+        "rating": reviews_data["rating"],
+        "reviews_total": len(reviews_data["reviews"]),
+        "reviews": apply_review_options(reviews_data["reviews"], review_options),
+        **mock
+    })
+    return body
+
+
+def product_body(product, review_options):
+    """
+    A stored product as returned by GET /products/<id>, with ObjectIds and
+    datetimes as strings (a copy; product may be shared with the cache).
+    """
+    return json_safe(dict(product, reviews=apply_review_options(product.get("reviews", []), review_options)))
+
+
+def products_body(products):
+    serialized = json_safe(products)
+    return {"products": serialized, "total": len(serialized)}
@@ -1,21 +1,93 @@
 from flask import Flask, request, jsonify, render_template
 from flask_cors import CORS
 from scraper.scraper import get_reviews
-from sentiment.sentiment import analyze_sentiment
+from scraper.fetch_scheduler import fetch_scheduler
+from scraper.circuit_breaker import circuit_breaker
+from scraper.browser_supervisor import browser_supervisor
+from scraper.admission import scrape_admission, AdmissionRejected
+from sentiment.sentiment import summarize_reviews
 from database.connection import db_connection
+from database.aggregates import STATS_SCOPES, STATS_SCOPE_DESCRIPTIONS
+from database.history import HISTORY_INTERVALS
+from database.cache import product_cache, product_etag, products_etag
+from database.write_buffer import write_buffer
+from database.routing import routing_state
+from database.jobs import job_view
+from database.retention import ArchiveExpired
+from database.products import PENDING
+from datetime import datetime
+from http_utils import register_compression, parse_review_options, review_options_tag
+from analysis import (
+    parse_analyze_request, existing_product_body, queued_body, admission_rejected_body,
+    analysis_outcome, analysis_body, product_body, products_body, stored_product_fields
+)
+from log_utils import configure_logging, register_request_id
+from profiling import register_profiling
 import os
 
+configure_logging()
 app = Flask(__name__)
+register_compression(app)
+register_request_id(app)
+register_profiling(app)
 CORS(app, origins=["http://localhost:3000", "http://localhost:3001", "http://localhost:3002", "http://localhost:3004", "http://localhost:3005"])
 
+# Seconds clients may reuse product reads before revalidating with the ETag
+HTTP_CACHE_MAX_AGE = int(os.getenv('HTTP_CACHE_MAX_AGE', '5'))
+# "inline" scrapes inside the request; "queue" only enqueues a job for
+# worker.py and answers 202 with the job to poll
+ANALYZE_MODE = os.getenv('ANALYZE_MODE', 'inline').lower()
+
+# Reap Chrome processes leaked by earlier runs, and watch scrape budgets
+browser_supervisor.start()
+
 # Initialize database connection
 db_connected = db_connection.connect()
 
 # Import models only if database is connected
 product_model = None
 review_model = None
+stats_model = None
+history_model = None
+job_queue = None
 if db_connected:
-    from database.models import product_model, review_model
+    from database.models import product_model, review_model, stats_model, history_model, job_queue
+
+
+def database_unavailable(model, analytics=False):
+    """
+    Returns a 503 response when the database cannot serve this request, so
+    handlers fail fast instead of waiting on server selection. Analytics
+    reads only need a server their read preference allows (a secondary
+    while there is no primary).
+    """
+    if not db_connected or not model:
+        return jsonify({"error": "Database not connected. Configure MongoDB to use this endpoint."}), 503
+    if not db_connection.is_available(analytics):
+        return jsonify({"error": "Database temporarily unavailable. Please retry shortly."}), 503
+    return None
+
+
+def cacheable(response, etag):
+    """
+    Adds the ETag and Cache-Control headers to a product read response.
+    Clients may reuse it for HTTP_CACHE_MAX_AGE seconds, then revalidate.
+    """
+    response.set_etag(etag)
+    response.cache_control.max_age = HTTP_CACHE_MAX_AGE
+    response.cache_control.must_revalidate = True
+    return response
+
+
+def queued_response(job, created):
+    """
+    202 response for an analysis handed to the job queue.
+    """
+    body, status_url = queued_body(job, created)
+    response = jsonify(body)
+    response.status_code = 202
+    response.headers["Location"] = status_url
+    return response
 
 
 # Home route (just to check server is running)
@@ -39,6 +111,14 @@ def database_status():
             }
         }
         
+        if db_connected:
+            status["database_available"] = db_connection.is_available()
+            status["analytics_available"] = db_connection.is_available(analytics=True)
+            status["connection_pool"] = db_connection.pool_stats()
+            status["product_cache"] = product_cache.stats()
+            status["write_buffer"] = write_buffer.stats()
+            status["routing"] = routing_state()
+        
         if db_connected and product_model:
             try:
                 products_count = len(product_model.get_all_products())
@@ -51,133 +131,243 @@ def database_status():
         return jsonify({"error": f"Status check failed: {str(e)}"}), 500
 
 
+# Outbound fetch state: per-domain slots, queues, circuit breakers, browsers and admission
+@app.route("/fetch-status", methods=["GET"])
+def fetch_status():
+    return jsonify(dict(
+        fetch_scheduler.queue_state(),
+        circuit_breakers=circuit_breaker.state(),
+        browsers=browser_supervisor.state(),
+        admission=scrape_admission.state()
+    ))
+
+
+# Background refresh scheduler state (written by refresh_scheduler.py)
+@app.route("/refresh-status", methods=["GET"])
+def refresh_status():
+    unavailable = database_unavailable(product_model)
+    if unavailable:
+        return unavailable
+    
+    try:
+        state = db_connection.get_collection('refresh_state').find_one({'_id': 'refresh_scheduler'})
+        if not state:
+            return jsonify({"running": False, "message": "Refresh scheduler has not run yet"})
+        state.pop('_id')
+        return jsonify(state)
+    except Exception as e:
+        return jsonify({"error": f"Failed to retrieve refresh status: {str(e)}"}), 500
+
+
+def admission_rejected(e):
+    body, headers = admission_rejected_body(e)
+    response = jsonify(body)
+    response.headers.update(headers)
+    return response, 429
+
+
 # Main API route
 @app.route("/analyze-product", methods=["POST"])
 def analyze_product():
-    data = request.get_json()
-
-    # Validate input
-    if not data or "url" not in data:
-        return jsonify({"error": "Product review URL is required"}), 400
-
-    product_url = data["url"]
-    product_name = data.get("product_name", "Unknown Product")
+    analyze_request, error = parse_analyze_request(request.get_json(), request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    product_url = analyze_request["url"]
+    review_options = analyze_request["review_options"]
 
     # Check if product already exists (only if database is connected)
     if db_connected and product_model:
+        if not db_connection.is_available():
+            return jsonify({"error": "Database temporarily unavailable. Please retry shortly."}), 503
         existing_product = product_model.get_product_by_url(product_url)
         if existing_product:
-            return jsonify({
-                "message": "Product already analyzed",
-                "product_id": str(existing_product["_id"]),
-                "summary": existing_product["sentiment_summary"],
-                "reviews": existing_product["reviews"]
-            })
-
-    # Step 1: Scrape reviews and get product name
-    reviews_data = get_reviews(product_url)
-    
-    # Handle both old format (just reviews) and new format (reviews, product_name)
-    if isinstance(reviews_data, tuple) and len(reviews_data) == 2:
-        reviews, extracted_product_name = reviews_data
-    else:
-        # Backward compatibility for old scraper format
-        reviews = reviews_data
-        extracted_product_name = product_name
-    
-    # Use extracted product name if available, otherwise use provided name
-    final_product_name = extracted_product_name if extracted_product_name != "Unknown Product" else product_name
-
-    # Step 2: Sentiment analysis
-    summary = {
-        "Positive": 0,
-        "Negative": 0,
-        "Neutral": 0
-    }
-
-    final_reviews = []
-
-    for r in reviews:
-        sentiment = analyze_sentiment(r["text"])
-        summary[sentiment] += 1
-        final_reviews.append({
-            "text": r["text"],
-            "sentiment": sentiment
-        })
-
-    reviews_data = {
-        "summary": summary,
-        "reviews": final_reviews
-    }
+            product_model.record_request(existing_product["_id"])
+            return jsonify(existing_product_body(existing_product, review_options))
+
+    # Queue mode: a worker scrapes and stores; the client polls the job
+    if ANALYZE_MODE == "queue" and db_connected and job_queue:
+        try:
+            job, created = job_queue.enqueue(product_url, analyze_request["product_name"])
+        except Exception as e:
+            return jsonify({"error": f"Failed to queue analysis: {str(e)}"}), 500
+        return queued_response(job, created)
+
+    # Steps 1-2 only run for admitted requests: a burst gets 429 instead of
+    # a browser per request
+    try:
+        with scrape_admission.admit():
+            # Step 1: Scrape reviews, product name and star rating
+            reviews, extracted_product_name, page_data = get_reviews(product_url)
+            # Step 2: Sentiment analysis
+            reviews_data = summarize_reviews(reviews)
+    except AdmissionRejected as e:
+        return admission_rejected(e)
+    product_name, product_type, mock = analysis_outcome(analyze_request, extracted_product_name, reviews_data, page_data)
 
     # Step 3: Store in MongoDB (only if connected)
-    if db_connected and product_model:
+    product_id = stored = None
+    if db_connected and product_model and not mock["mock_data"]:
         try:
-            product_id = product_model.create_product(final_product_name, product_url, reviews_data)
-            
-            # Step 4: Return JSON response
-            return jsonify({
-                "message": "Product analyzed and stored successfully",
-                "product_id": product_id,
-                "product_name": final_product_name,
-                "summary": summary,
-                "reviews": final_reviews
-            })
+            product_id, stored = product_model.create_product(product_name, product_url, reviews_data, product_type)
         except Exception as e:
             return jsonify({"error": f"Failed to store data: {str(e)}"}), 500
-    else:
-        # Return response without storing in database
-        return jsonify({
-            "message": "Product analyzed successfully (not stored - database not configured)",
-            "product_name": final_product_name,
-            "summary": summary,
-            "reviews": final_reviews
-        })
+
+    # Step 4: Return JSON response (202 while the insert is still pending)
+    return jsonify(analysis_body(product_name, reviews_data, mock, review_options, product_id, stored)), 202 if stored == PENDING else 200
+
+
+# Analysis job queue: counts per status
+@app.route("/jobs", methods=["GET"])
+def get_jobs():
+    unavailable = database_unavailable(job_queue)
+    if unavailable:
+        return unavailable
+    
+    try:
+        return jsonify(dict(job_queue.stats(), analyze_mode=ANALYZE_MODE))
+    except Exception as e:
+        return jsonify({"error": f"Failed to retrieve job queue: {str(e)}"}), 500
+
+
+# Status of a queued analysis, with the analyzed product once it is done
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    unavailable = database_unavailable(job_queue)
+    if unavailable:
+        return unavailable
+    
+    try:
+        review_options, options_error = parse_review_options(request.args)
+        if options_error:
+            return jsonify({"error": options_error}), 400
+        
+        job = job_queue.get_job(job_id)
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        
+        response = {"job": job_view(job)}
+        if job["status"] == "done":
+            product = product_model.get_product_by_id(job["result"]["product_id"])
+            if product:
+                response.update(stored_product_fields(product, review_options))
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({"error": f"Failed to retrieve job: {str(e)}"}), 500
 
 
 # Get all products
 @app.route("/products", methods=["GET"])
 def get_all_products():
-    if not db_connected or not product_model:
-        return jsonify({"error": "Database not connected. Configure MongoDB to use this endpoint."}), 503
+    unavailable = database_unavailable(product_model, analytics=True)
+    if unavailable:
+        return unavailable
     
     try:
         products = product_model.get_all_products()
-        # Convert ObjectId to string for JSON serialization
+        etag = products_etag(products)
+        if request.if_none_match.contains_weak(etag):
+            return cacheable(app.response_class(status=304), etag)
+        
+        return cacheable(jsonify(products_body(products)), etag)
+    except Exception as e:
+        return jsonify({"error": f"Failed to retrieve products: {str(e)}"}), 500
+
+
+# Products ranked by mean compound sentiment score
+@app.route("/rankings", methods=["GET"])
+def get_rankings():
+    unavailable = database_unavailable(product_model, analytics=True)
+    if unavailable:
+        return unavailable
+    
+    try:
+        limit = request.args.get('limit', 10, type=int)
+        order = request.args.get('order', 'desc')
+        if order not in ["asc", "desc"]:
+            return jsonify({"error": "Invalid order. Must be asc or desc"}), 400
+        
+        products = product_model.get_products_ranked_by_sentiment(limit, ascending=(order == "asc"))
         for product in products:
             product['_id'] = str(product['_id'])
-            # Convert datetime to string for JSON
-            if 'created_at' in product:
-                product['created_at'] = str(product['created_at'])
-            if 'updated_at' in product:
-                product['updated_at'] = str(product['updated_at'])
-        return jsonify({"products": products, "total": len(products)})
+        return jsonify({"products": products, "order": order, "count": len(products)})
     except Exception as e:
-        return jsonify({"error": f"Failed to retrieve products: {str(e)}"}), 500
+        return jsonify({"error": f"Failed to rank products: {str(e)}"}), 500
 
 
 # Get specific product by ID
 @app.route("/products/<product_id>", methods=["GET"])
 def get_product(product_id):
-    if not db_connected or not product_model:
-        return jsonify({"error": "Database not connected. Configure MongoDB to use this endpoint."}), 503
+    unavailable = database_unavailable(product_model)
+    if unavailable:
+        return unavailable
     
     try:
+        review_options, options_error = parse_review_options(request.args)
+        if options_error:
+            return jsonify({"error": options_error}), 400
+        
         product = product_model.get_product_by_id(product_id)
         if not product:
             return jsonify({"error": "Product not found"}), 404
+        product_model.record_request(product_id)
         
-        product['_id'] = str(product['_id'])
-        return jsonify({"product": product})
+        etag = product_etag(product) + review_options_tag(review_options)
+        if request.if_none_match.contains_weak(etag):
+            return cacheable(app.response_class(status=304), etag)
+        
+        return cacheable(jsonify({"product": product_body(product, review_options)}), etag)
     except Exception as e:
         return jsonify({"error": f"Failed to retrieve product: {str(e)}"}), 500
 
 
+# Bring a product's archived reviews back into its document
+@app.route("/products/<product_id>/restore", methods=["POST"])
+def restore_product_reviews(product_id):
+    unavailable = database_unavailable(product_model)
+    if unavailable:
+        return unavailable
+    
+    try:
+        restored = product_model.review_archive.restore(product_id)
+        if restored is None:
+            return jsonify({"error": "Product not found or its reviews are not archived"}), 404
+        return jsonify({"message": "Reviews restored", "product_id": product_id, "restored": restored})
+    except ArchiveExpired as e:
+        return jsonify({"error": str(e)}), 410
+    except Exception as e:
+        return jsonify({"error": f"Failed to restore reviews: {str(e)}"}), 500
+
+
+# Sentiment history of a product, down-sampled to an interval
+@app.route("/products/<product_id>/history", methods=["GET"])
+def get_product_history(product_id):
+    unavailable = database_unavailable(history_model, analytics=True)
+    if unavailable:
+        return unavailable
+    
+    try:
+        interval = request.args.get('interval', 'day')
+        if interval not in HISTORY_INTERVALS:
+            return jsonify({"error": f"Invalid interval. Must be one of: {', '.join(HISTORY_INTERVALS)}"}), 400
+        
+        try:
+            start = datetime.fromisoformat(request.args['from']) if 'from' in request.args else None
+            end = datetime.fromisoformat(request.args['to']) if 'to' in request.args else None
+        except ValueError:
+            return jsonify({"error": "Invalid date. Use ISO format, e.g. 2024-01-31"}), 400
+        
+        points = history_model.get_history(product_id, interval, start, end)
+        return jsonify({"product_id": product_id, "interval": interval, "history": points, "count": len(points)})
+    except Exception as e:
+        return jsonify({"error": f"Failed to retrieve history: {str(e)}"}), 500
+
+
 # Get reviews by sentiment
 @app.route("/reviews/sentiment/<sentiment>", methods=["GET"])
 def get_reviews_by_sentiment(sentiment):
-    if not db_connected or not review_model:
-        return jsonify({"error": "Database not connected. Configure MongoDB to use this endpoint."}), 503
+    unavailable = database_unavailable(review_model, analytics=True)
+    if unavailable:
+        return unavailable
     
     try:
         if sentiment not in ["Positive", "Negative", "Neutral"]:
@@ -198,8 +388,9 @@ def get_reviews_by_sentiment(sentiment):
 # Search reviews by text
 @app.route("/reviews/search", methods=["GET"])
 def search_reviews():
-    if not db_connected or not review_model:
-        return jsonify({"error": "Database not connected. Configure MongoDB to use this endpoint."}), 503
+    unavailable = database_unavailable(review_model, analytics=True)
+    if unavailable:
+        return unavailable
     
     try:
         search_term = request.args.get('q')
@@ -217,11 +408,41 @@ def search_reviews():
         return jsonify({"error": f"Failed to search reviews: {str(e)}"}), 500
 
 
+# Sentiment aggregates (materialized, one document read per bucket)
+@app.route("/stats", methods=["GET"])
+@app.route("/stats/<scope>", methods=["GET"])
+@app.route("/stats/<scope>/<path:key>", methods=["GET"])
+def get_stats(scope="global", key=None):
+    unavailable = database_unavailable(stats_model, analytics=True)
+    if unavailable:
+        return unavailable
+    
+    try:
+        if scope not in STATS_SCOPES:
+            return jsonify({"error": f"Invalid scope. Must be one of: {', '.join(STATS_SCOPES)}"}), 400
+        
+        if scope != "global" and key is None:
+            limit = request.args.get('limit', 100, type=int)
+            buckets = stats_model.list_stats(scope, limit)
+            for bucket in buckets:
+                bucket['updated_at'] = str(bucket.get('updated_at'))
+            return jsonify({"scope": scope, "description": STATS_SCOPE_DESCRIPTIONS[scope], "stats": buckets, "count": len(buckets)})
+        
+        bucket = stats_model.get_stats(scope, key or "all")
+        if not bucket:
+            return jsonify({"error": "No statistics for this bucket"}), 404
+        bucket['updated_at'] = str(bucket.get('updated_at'))
+        return jsonify({"stats": bucket, "description": STATS_SCOPE_DESCRIPTIONS[scope]})
+    except Exception as e:
+        return jsonify({"error": f"Failed to retrieve statistics: {str(e)}"}), 500
+
+
 # Delete product
 @app.route("/products/<product_id>", methods=["DELETE"])
 def delete_product(product_id):
-    if not db_connected or not product_model:
-        return jsonify({"error": "Database not connected. Configure MongoDB to use this endpoint."}), 503
+    unavailable = database_unavailable(product_model)
+    if unavailable:
+        return unavailable
     
     try:
         success = product_model.delete_product(product_id)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Archive Reviews
+Moves the review text of products not analyzed for RETENTION_REVIEW_AGE_DAYS
+out of the products collection into compressed NDJSON (see
+database/retention.py), or restores a product's archived reviews.
+
+Run periodically, e.g. daily from cron:
+    python archive_reviews.py
+    python archive_reviews.py --older-than-days 30 --limit 1000
+    python archive_reviews.py --restore <product_id>
+"""
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database.connection import db_connection
+from database.retention import RETENTION_REVIEW_AGE_DAYS, RETENTION_BATCH_SIZE, ArchiveExpired
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old review text or restore it")
+    parser.add_argument("--older-than-days", type=float, default=RETENTION_REVIEW_AGE_DAYS)
+    parser.add_argument("--limit", type=int, default=RETENTION_BATCH_SIZE)
+    parser.add_argument("--restore", metavar="PRODUCT_ID")
+    args = parser.parse_args()
+
+    print("🗄️  Review retention")
+    print("=" * 50)
+
+    if not db_connection.connect():
+        print("❌ Database is NOT connected")
+        return False
+
+    from database.models import product_model
+    archive = product_model.review_archive
+
+    if args.restore:
+        try:
+            restored = archive.restore(args.restore)
+        except ArchiveExpired as e:
+            print(f"❌ {e}")
+            return False
+        if restored is None:
+            print("❌ Product not found or its reviews are not archived")
+            return False
+        print(f"✅ Restored {restored} reviews")
+    else:
+        counts = archive.archive(args.older_than_days, args.limit)
+        print(f"✅ Archived {counts['reviews']} reviews of {counts['products']} products "
+              f"({counts['bytes'] / 1024:.1f} KB compressed)")
+
+    stats = archive.stats()
+    print(f"📦 {stats['archived_products']} products archived in {stats['store']} ({stats['codec']}), "
+          f"{stats['archived_reviews']} reviews, {stats['archived_bytes'] / 1024:.1f} KB")
+
+    db_connection.disconnect()
+    return True
+
+if __name__ == "__main__":
+    main()
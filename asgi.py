@@ -0,0 +1,233 @@
+"""
+ASGI entry point for production.
+
+The I/O-bound endpoints (analyze, product reads) run natively on the event
+loop with the async Mongo driver and the async fetcher; sentiment scoring
+is CPU-bound and runs in a process pool. Every other route is served by
+the Flask app from app.py, mounted underneath.
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route
+
+from app import app as flask_app, HTTP_CACHE_MAX_AGE, ANALYZE_MODE, product_model as sync_product_model
+from database.cache import product_etag, products_etag
+from http_utils import CompressionMiddleware, parse_review_options, review_options_tag, json_safe
+from log_utils import RequestIdMiddleware, configure_logging
+from profiling import profiled
+from database.async_connection import async_db_connection
+from database.write_buffer import write_buffer
+from database.products import PENDING
+from analysis import (
+    parse_analyze_request, existing_product_body, queued_body, admission_rejected_body,
+    analysis_outcome, analysis_body, product_body, products_body
+)
+from scraper.async_scraper import BROWSER_THREADS, close_client, get_reviews_async
+from scraper.admission import scrape_admission, AdmissionRejected
+from sentiment.sentiment import summarize_reviews
+
+SENTIMENT_WORKERS = int(os.getenv('SENTIMENT_WORKERS', str(os.cpu_count() or 2)))
+
+# Set during startup
+db_connected = False
+product_model = None
+job_queue = None
+sentiment_executor = None
+browser_executor = None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global db_connected, product_model, job_queue, sentiment_executor, browser_executor
+    configure_logging()
+    sentiment_executor = ProcessPoolExecutor(max_workers=SENTIMENT_WORKERS)
+    browser_executor = ThreadPoolExecutor(max_workers=BROWSER_THREADS, thread_name_prefix="browser")
+
+    db_connected = await async_db_connection.connect()
+    if db_connected:
+        from database.async_models import async_product_model, async_job_queue
+        product_model = async_product_model
+        job_queue = async_job_queue
+
+    yield
+
+    # Write out what the write buffer still holds before the process exits
+    await asyncio.to_thread(write_buffer.stop)
+    await close_client()
+    await async_db_connection.disconnect()
+    browser_executor.shutdown(wait=False, cancel_futures=True)
+    sentiment_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def json_response(body, status_code=200, headers=None):
+    """
+    JSONResponse of body with ObjectIds and datetimes as strings.
+    """
+    return JSONResponse(json_safe(body), status_code=status_code, headers=headers)
+
+
+def database_unavailable(analytics=False):
+    """
+    Returns a 503 response when the database cannot serve this request
+    (see app.database_unavailable).
+    """
+    if not db_connected or not product_model:
+        return json_response({"error": "Database not connected. Configure MongoDB to use this endpoint."}, status_code=503)
+    if not async_db_connection.is_available(analytics):
+        return json_response({"error": "Database temporarily unavailable. Please retry shortly."}, status_code=503)
+    return None
+
+
+def record_request(product_id):
+    # Request counts feed the refresh scheduler; they are tracked by the
+    # sync model's batched tracker
+    if sync_product_model:
+        sync_product_model.record_request(product_id)
+
+
+def etag_matches(request, etag):
+    if_none_match = request.headers.get("if-none-match", "")
+    candidates = [tag.strip().removeprefix("W/").strip('"') for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def cacheable(response, etag):
+    """
+    Adds the ETag and Cache-Control headers to a product read response.
+    """
+    response.headers["ETag"] = f'"{etag}"'
+    response.headers["Cache-Control"] = f"max-age={HTTP_CACHE_MAX_AGE}, must-revalidate"
+    return response
+
+
+@profiled
+async def analyze_product(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    analyze_request, error = parse_analyze_request(data, request.query_params)
+    if error:
+        return json_response({"error": error}, status_code=400)
+    product_url = analyze_request["url"]
+    review_options = analyze_request["review_options"]
+
+    # Check if product already exists (only if database is connected)
+    if db_connected and product_model:
+        if not async_db_connection.is_available():
+            return json_response({"error": "Database temporarily unavailable. Please retry shortly."}, status_code=503)
+        existing_product = await product_model.get_product_by_url(product_url)
+        if existing_product:
+            record_request(existing_product["_id"])
+            return json_response(existing_product_body(existing_product, review_options))
+
+    # Queue mode: a worker scrapes and stores; the client polls /jobs/<id>
+    if ANALYZE_MODE == "queue" and db_connected and job_queue:
+        try:
+            job, created = await job_queue.enqueue(product_url, analyze_request["product_name"])
+        except Exception as e:
+            return json_response({"error": f"Failed to queue analysis: {str(e)}"}, status_code=500)
+        body, status_url = queued_body(job, created)
+        return json_response(body, status_code=202, headers={"Location": status_url})
+
+    # Steps 1-2 only run for admitted requests. Already analyzed products
+    # (above) and the product reads are not admission-controlled, so they
+    # keep their latency during a burst of scrapes
+    try:
+        async with scrape_admission.async_admit():
+            # Step 1: Scrape reviews, product name and star rating
+            reviews, extracted_product_name, page_data = await get_reviews_async(product_url, executor=browser_executor)
+            # Step 2: Sentiment analysis (CPU-bound, off the event loop)
+            loop = asyncio.get_running_loop()
+            reviews_data = await loop.run_in_executor(sentiment_executor, summarize_reviews, reviews)
+    except AdmissionRejected as e:
+        body, headers = admission_rejected_body(e)
+        return json_response(body, status_code=429, headers=headers)
+    product_name, product_type, mock = analysis_outcome(analyze_request, extracted_product_name, reviews_data, page_data)
+
+    # Step 3: Store in MongoDB (only if connected)
+    product_id = stored = None
+    if db_connected and product_model and not mock["mock_data"]:
+        try:
+            product_id, stored = await product_model.create_product(product_name, product_url, reviews_data, product_type)
+        except Exception as e:
+            return json_response({"error": f"Failed to store data: {str(e)}"}, status_code=500)
+
+    # Step 4: Return JSON response (202 while the insert is still pending)
+    return json_response(analysis_body(product_name, reviews_data, mock, review_options, product_id, stored),
+                         status_code=202 if stored == PENDING else 200)
+
+
+@profiled
+async def get_all_products(request):
+    unavailable = database_unavailable(analytics=True)
+    if unavailable:
+        return unavailable
+
+    try:
+        products = await product_model.get_all_products()
+        etag = products_etag(products)
+        if etag_matches(request, etag):
+            return cacheable(Response(status_code=304), etag)
+        return cacheable(json_response(products_body(products)), etag)
+    except Exception as e:
+        return json_response({"error": f"Failed to retrieve products: {str(e)}"}, status_code=500)
+
+
+@profiled
+async def get_product(request):
+    unavailable = database_unavailable()
+    if unavailable:
+        return unavailable
+
+    try:
+        review_options, options_error = parse_review_options(request.query_params)
+        if options_error:
+            return json_response({"error": options_error}, status_code=400)
+
+        product = await product_model.get_product_by_id(request.path_params["product_id"])
+        if not product:
+            return json_response({"error": "Product not found"}, status_code=404)
+        record_request(product["_id"])
+
+        etag = product_etag(product) + review_options_tag(review_options)
+        if etag_matches(request, etag):
+            return cacheable(Response(status_code=304), etag)
+        return cacheable(json_response({"product": product_body(product, review_options)}), etag)
+    except Exception as e:
+        return json_response({"error": f"Failed to retrieve product: {str(e)}"}, status_code=500)
+
+
+routes = [
+    Route("/analyze-product", analyze_product, methods=["POST"]),
+    Route("/products", get_all_products, methods=["GET"]),
+    Route("/products/{product_id}", get_product, methods=["GET"]),
+    # Everything else (DELETE, review search, jobs, status...) is handled by Flask
+    Mount("/", app=WSGIMiddleware(flask_app)),
+]
+
+app = Starlette(
+    routes=routes,
+    lifespan=lifespan,
+    middleware=[
+        Middleware(RequestIdMiddleware),
+        Middleware(CompressionMiddleware),
+        Middleware(
+            CORSMiddleware,
+            allow_origins=["http://localhost:3000", "http://localhost:3001", "http://localhost:3002", "http://localhost:3004", "http://localhost:3005"],
+            allow_methods=["*"],
+            allow_headers=["*"]
+        )
+    ]
+)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Lexicon Startup Benchmark
+Compares what each worker process pays to get a ready sentiment analyzer:
+parsing the VADER sources with SentimentIntensityAnalyzer() and compiling
+the VectorScorer lexicon, against memory-mapping the precompiled artifact
+(sentiment/lexicon_artifact.py). Each run is a fresh process, so imports
+and the page cache are as a new worker sees them.
+
+Usage:
+    python benchmark_lexicon.py --runs 10
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+CHILD = """
+import json, sys, time
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from sentiment.vector_scorer import CompiledLexicon, VectorScorer
+from sentiment import lexicon_artifact
+
+def private_kib():
+    # Resident pages no other process can share (heap, parsed dicts)
+    fields = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if value.strip().endswith("kB"):
+                    fields[name] = int(value.split()[0])
+    except OSError:
+        pass
+    return fields.get("Private_Dirty", 0)
+
+mode, path = sys.argv[1:3]
+before = private_kib()
+start = time.perf_counter()
+if mode == "source":
+    analyzer = SentimentIntensityAnalyzer()
+    compiled = CompiledLexicon(analyzer.lexicon)
+else:
+    lexicon, emojis, compiled = lexicon_artifact.load(path)
+    analyzer = lexicon_artifact.LexiconAnalyzer(lexicon, emojis)
+scorer = VectorScorer(compiled, analyzer.emojis)
+elapsed = time.perf_counter() - start
+print(json.dumps({"ms": elapsed * 1000, "private_kib": private_kib() - before}))
+"""
+
+def run(mode, path):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, mode, path],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup cost of the VADER lexicon per worker process")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    from sentiment.lexicon_artifact import LEXICON_ARTIFACT, build
+    path = build(LEXICON_ARTIFACT)
+
+    print(f"🧪 Lexicon startup, median of {args.runs} fresh processes")
+    print("=" * 60)
+    results = {}
+    for mode, label in (("source", "parse sources"), ("artifact", "mapped artifact")):
+        runs = [run(mode, path) for _ in range(args.runs)]
+        results[mode] = {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+        r = results[mode]
+        print(f"{label:16} {r['ms']:7.1f} ms   private RSS +{r['private_kib']:6.0f} KiB")
+    print(f"Speedup:         {results['source']['ms'] / max(results['artifact']['ms'], 1e-6):.1f}x, "
+          f"{results['source']['private_kib'] - results['artifact']['private_kib']:.0f} KiB less private memory per worker")
+
+if __name__ == "__main__":
+    main()
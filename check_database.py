@@ -46,7 +46,7 @@ def check_database_health():
         }
         
         # Test Create
-        product_id = product_model.create_product(
+        product_id, _ = product_model.create_product(
             "Health Check Test Product", 
             "https://test.example.com/health-check", 
             test_data
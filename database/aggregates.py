@@ -0,0 +1,89 @@
+from datetime import datetime
+from urllib.parse import urlparse
+from pymongo import UpdateOne
+
+SENTIMENTS = ("Positive", "Negative", "Neutral")
+STATS_SCOPES = ("global", "domain", "product_type", "day")
+
+# What a bucket of each scope counts, returned with the buckets by /stats.
+# Day buckets are creation cohorts: a refresh or a delete changes the bucket
+# of the day the product was first analyzed, not the day it happened, so
+# each bucket always equals the current state of that day's products (and
+# what rebuild() recomputes from created_at).
+STATS_SCOPE_DESCRIPTIONS = {
+    "global": "All stored products",
+    "domain": "Stored products of one site",
+    "product_type": "Stored products of one product type",
+    "day": "Stored products first analyzed on this day (UTC), with their current reviews"
+}
+
+def product_domain(product_url: str) -> str:
+    netloc = urlparse(product_url or "").netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    return netloc or "unknown"
+
+def stats_keys(product: dict) -> list:
+    """
+    Aggregate buckets a product document contributes to, as (scope, key)
+    pairs. Day buckets are keyed by the product's created_at date, also
+    for the deltas of later refreshes and of the delete, so a day bucket
+    is the creation cohort of that day (see STATS_SCOPE_DESCRIPTIONS).
+    """
+    created_at = product.get('created_at') or datetime.utcnow()
+    return [
+        ("global", "all"),
+        ("domain", product.get('domain') or product_domain(product.get('product_url', ''))),
+        ("product_type", product.get('product_type') or "general"),
+        ("day", created_at.strftime("%Y-%m-%d"))
+    ]
+
+def stats_id(scope: str, key: str) -> str:
+    return "global" if scope == "global" else f"{scope}:{key}"
+
+def stats_updates(product: dict, summary_delta: dict, products_delta: int, reviews_delta: int) -> list:
+    """
+    $inc upserts that apply a change in one product's summary to every
+    bucket it belongs to. Returns an empty list when nothing changed.
+    """
+    increments = {f'sentiment.{label}': summary_delta.get(label, 0) for label in SENTIMENTS}
+    increments['products'] = products_delta
+    increments['reviews'] = reviews_delta
+    if not any(increments.values()):
+        return []
+
+    now = datetime.utcnow()
+    return [
+        UpdateOne(
+            {'_id': stats_id(scope, key)},
+            {
+                '$inc': increments,
+                '$set': {'updated_at': now},
+                '$setOnInsert': {'scope': scope, 'key': key}
+            },
+            upsert=True
+        )
+        for scope, key in stats_keys(product)
+    ]
+
+def summary_difference(new_summary: dict, old_summary: dict) -> dict:
+    return {label: new_summary.get(label, 0) - old_summary.get(label, 0) for label in SENTIMENTS}
+
+def negate_summary(summary: dict) -> dict:
+    return {label: -summary.get(label, 0) for label in SENTIMENTS}
+
+def rebuild_pipeline(scope: str) -> list:
+    """
+    Aggregation pipeline recomputing one scope's buckets from the raw
+    product documents.
+    """
+    group_keys = {
+        "global": "all",
+        "domain": {'$ifNull': ['$domain', 'unknown']},
+        "product_type": {'$ifNull': ['$product_type', 'general']},
+        "day": {'$dateToString': {'format': '%Y-%m-%d', 'date': '$created_at'}}
+    }
+    group = {'_id': group_keys[scope], 'products': {'$sum': 1}, 'reviews': {'$sum': '$total_reviews'}}
+    for label in SENTIMENTS:
+        group[label] = {'$sum': {'$ifNull': [f'$sentiment_summary.{label}', 0]}}
+    return [{'$group': group}]
@@ -0,0 +1,83 @@
+import os
+from pymongo import AsyncMongoClient
+from dotenv import load_dotenv
+from .connection import client_options
+from .monitoring import PoolMetricsListener, TopologyHealthListener
+from .routing import ANALYTICS_READS
+from log_utils import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+class AsyncDatabaseConnection:
+    """
+    asyncio counterpart of DatabaseConnection, used by the ASGI server (asgi.py).
+    Must be connected from inside the running event loop.
+    """
+    def __init__(self):
+        self.connection_string = os.getenv('MONGODB_CONNECTION_STRING')
+        self.db_name = os.getenv('DB_NAME', 'product_sentiment_db')
+        self.client = None
+        self.db = None
+        self.connected = False
+        self.options = client_options()
+        self.pool_metrics = PoolMetricsListener()
+        self.topology = TopologyHealthListener(ANALYTICS_READS)
+    
+    async def connect(self):
+        # Check if connection string is properly configured
+        if not self.connection_string or 'your_username' in self.connection_string:
+            logger.warning("MongoDB connection string not configured. Running without database.")
+            self.connected = False
+            return False
+        
+        try:
+            self.client = AsyncMongoClient(
+                self.connection_string,
+                event_listeners=[self.pool_metrics, self.topology],
+                **self.options
+            )
+            self.db = self.client[self.db_name]
+        except Exception as e:
+            logger.error("Error connecting to MongoDB: %s. Running without database connection.", e)
+            self.client = None
+            self.db = None
+            self.connected = False
+            return False
+
+        self.connected = True
+        try:
+            await self.db.command('ping')
+            logger.info("Connected to MongoDB Atlas (async) successfully")
+        except Exception as e:
+            # The client reconnects by itself; until then is_available() is False
+            logger.warning("MongoDB not reachable at startup (async): %s. Requests get 503 until it is.", e)
+        return True
+    
+    async def disconnect(self):
+        if self.client:
+            await self.client.close()
+            logger.info("Disconnected from MongoDB (async)")
+    
+    def get_collection(self, collection_name):
+        if not self.connected or self.db is None:
+            raise Exception("Database not connected. Check your MongoDB configuration.")
+        return self.db[collection_name]
+    
+    def is_connected(self):
+        return self.connected
+
+    def is_available(self, analytics=False):
+        return self.connected and (self.topology.readable if analytics else self.topology.available)
+
+    def pool_stats(self):
+        return {
+            "max_pool_size": self.options['maxPoolSize'],
+            "min_pool_size": self.options['minPoolSize'],
+            "server_available": self.topology.available,
+            "analytics_server_available": self.topology.readable,
+            "pools": self.pool_metrics.snapshot(self.options['maxPoolSize'])
+        }
+
+async_db_connection = AsyncDatabaseConnection()
@@ -0,0 +1,98 @@
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple
+from .async_connection import async_db_connection
+from .connection import db_connection
+from .write_buffer import write_buffer, WRITE_ACK_TIMEOUT_SECONDS
+from .routing import analytics, primary, read_after_write_seconds
+from .cache import product_cache, product_key, invalidate_product, products_written_within, ALL_PRODUCTS_KEY
+from .products import new_product_document, product_stored_writes, STORED, PENDING
+from .jobs import enqueue_operation
+from pymongo import ReturnDocument, InsertOne
+from log_utils import get_logger
+from pymongo.errors import DuplicateKeyError
+
+logger = get_logger(__name__)
+
+class AsyncProductModel:
+    """
+    Awaitable version of ProductModel for the endpoints served natively by asgi.py.
+    Documents have the same shape as those written by ProductModel.
+    """
+    def __init__(self):
+        products = async_db_connection.get_collection('products')
+        self.collection = primary(products, 'product')
+        self.analytics_collection = analytics(products)
+        self.stats_collection = primary(async_db_connection.get_collection('sentiment_stats'), 'aggregate')
+        self.history_collection = primary(async_db_connection.get_collection('sentiment_history'), 'aggregate')
+    
+    async def create_product(self, product_name: str, product_url: str, reviews_data: Dict[str, Any], product_type: Optional[str] = None) -> Tuple[str, str]:
+        # (product id, STORED or PENDING), see ProductModel.create_product
+        product_document = new_product_document(product_name, product_url, reviews_data, product_type)
+        stored_writes = product_stored_writes(product_document, reviews_data)
+        if write_buffer.enabled and db_connection.is_connected():
+            # Batched with concurrent requests by the write buffer (on the
+            # sync client); only the product insert is awaited
+            ticket = write_buffer.submit('products', [InsertOne(product_document)])
+            status = STORED
+            try:
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(ticket.future)), WRITE_ACK_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                # Still queued and written once the buffer drains (see ProductModel)
+                logger.warning("Product insert not acknowledged yet, still pending", extra={"url": product_url})
+                status = PENDING
+
+            def stored():
+                invalidate_product()
+                for collection_name, operations in stored_writes:
+                    write_buffer.submit(collection_name, operations)
+            ticket.on_success(stored)
+            return str(product_document['_id']), status
+        
+        await self.collection.insert_one(product_document)
+        invalidate_product()
+        collections = {'sentiment_stats': self.stats_collection, 'sentiment_history': self.history_collection}
+        for collection_name, operations in stored_writes:
+            if operations:
+                await collections[collection_name].bulk_write(operations, ordered=False)
+        return str(product_document['_id']), STORED
+    
+    async def get_product_by_url(self, product_url: str) -> Dict[str, Any]:
+        return await self.collection.find_one({'product_url': product_url}, {'review_hashes': 0})
+    
+    async def get_product_by_id(self, product_id: str) -> Dict[str, Any]:
+        from bson.objectid import ObjectId
+        product = product_cache.get(product_key(product_id))
+        if product is None:
+            product = await self.collection.find_one({'_id': ObjectId(product_id)}, {'review_hashes': 0})
+            if product:
+                product_cache.set(product_key(product_id), product)
+        return product
+    
+    async def get_all_products(self) -> List[Dict[str, Any]]:
+        products = product_cache.get(ALL_PRODUCTS_KEY)
+        if products is None:
+            # See ProductModel.get_all_products
+            collection = self.collection if products_written_within(read_after_write_seconds()) else self.analytics_collection
+            cursor = collection.find({}, {'product_name': 1, 'product_url': 1, 'created_at': 1, 'updated_at': 1, 'sentiment_summary': 1, 'mean_compound': 1, 'rating': 1, 'total_reviews': 1})
+            products = await cursor.to_list()
+            product_cache.set(ALL_PRODUCTS_KEY, products)
+        return products
+
+class AsyncJobQueue:
+    """
+    Enqueue side of database.jobs.JobQueue for asgi.py. Workers, indexes
+    and job reads use the sync queue.
+    """
+    def __init__(self):
+        self.collection = primary(async_db_connection.get_collection('jobs'), 'job')
+    
+    async def enqueue(self, product_url: str, product_name: str = 'Unknown Product', priority: int = 0):
+        job_filter, update, job_id = enqueue_operation(product_url, product_name, priority)
+        try:
+            job = await self.collection.find_one_and_update(job_filter, update, upsert=True, return_document=ReturnDocument.AFTER)
+        except DuplicateKeyError:
+            job = await self.collection.find_one(job_filter)
+        return job, job['_id'] == job_id
+
+async_product_model = AsyncProductModel()
+async_job_queue = AsyncJobQueue()
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Server-side cache for hot product reads. Writes in this process
+# invalidate entries immediately; the TTL bounds staleness when another
+# process (worker, second server) changed the product.
+PRODUCT_CACHE_SIZE = int(os.getenv('PRODUCT_CACHE_SIZE', '512'))
+PRODUCT_CACHE_TTL = float(os.getenv('PRODUCT_CACHE_TTL', '60'))
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after ttl seconds.
+    Cached values are shared; callers must not mutate them.
+    """
+    def __init__(self, maxsize=PRODUCT_CACHE_SIZE, ttl=PRODUCT_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl, "hits": self.hits, "misses": self.misses}
+
+product_cache = TTLCache()
+
+ALL_PRODUCTS_KEY = "products:all"
+
+# When this process last changed the product list (monotonic seconds)
+_products_written_at = None
+
+def product_key(product_id) -> str:
+    return f"product:{product_id}"
+
+def invalidate_product(product_id=None):
+    """
+    Drop a product and the product list from the cache after a write.
+    """
+    global _products_written_at
+    _products_written_at = time.monotonic()
+    if product_id is None:
+        product_cache.invalidate(ALL_PRODUCTS_KEY)
+    else:
+        product_cache.invalidate(product_key(product_id), ALL_PRODUCTS_KEY)
+
+def products_written_within(seconds) -> bool:
+    """
+    True when this process changed the product list in the last seconds.
+    """
+    return _products_written_at is not None and time.monotonic() - _products_written_at < seconds
+
+def product_etag(product: dict) -> str:
+    updated_at = product.get('updated_at') or product.get('created_at')
+    stamp = updated_at.timestamp() if hasattr(updated_at, 'timestamp') else updated_at
+    # Archiving and restoring reviews change the document but not updated_at
+    archived = "-archived" if product.get('reviews_archived') else ""
+    return f"{product['_id']}-{stamp}{archived}"
+
+def products_etag(products: list) -> str:
+    digest = hashlib.blake2b(digest_size=12)
+    for product in products:
+        digest.update(product_etag(product).encode('utf-8'))
+    return digest.hexdigest()
@@ -1,9 +1,44 @@
 import os
+import threading
+import time
 from pymongo import MongoClient
+from pymongo.errors import ConnectionFailure
 from dotenv import load_dotenv
+from .monitoring import PoolMetricsListener, TopologyHealthListener
+from .routing import ANALYTICS_READS
+from log_utils import get_logger
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
+# While the cluster is unreachable, seconds between reconnection attempts,
+# doubled after every failed attempt up to the max
+RECONNECT_INTERVAL_SECONDS = float(os.getenv('MONGO_RECONNECT_INTERVAL_SECONDS', '5'))
+RECONNECT_MAX_INTERVAL_SECONDS = float(os.getenv('MONGO_RECONNECT_MAX_INTERVAL_SECONDS', '300'))
+# A setup that keeps failing while the cluster is reachable is given up
+# after this many attempts
+SETUP_MAX_ATTEMPTS = int(os.getenv('MONGO_SETUP_MAX_ATTEMPTS', '5'))
+
+def client_options():
+    """
+    Connection pool, timeout and retry settings shared by the sync and async
+    clients. Defaults fail fast when the cluster is unreachable instead of
+    waiting out PyMongo's 30s server selection timeout.
+    """
+    return {
+        'maxPoolSize': int(os.getenv('MONGO_MAX_POOL_SIZE', '100')),
+        'minPoolSize': int(os.getenv('MONGO_MIN_POOL_SIZE', '5')),
+        'maxIdleTimeMS': int(os.getenv('MONGO_MAX_IDLE_TIME_MS', '300000')),
+        'waitQueueTimeoutMS': int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', '2000')),
+        'serverSelectionTimeoutMS': int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '3000')),
+        'connectTimeoutMS': int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', '5000')),
+        'socketTimeoutMS': int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', '20000')),
+        'retryWrites': os.getenv('MONGO_RETRY_WRITES', 'true').lower() == 'true',
+        'retryReads': os.getenv('MONGO_RETRY_READS', 'true').lower() == 'true',
+        'appname': os.getenv('MONGO_APP_NAME', 'product-sentiment-analyzer')
+    }
+
 class DatabaseConnection:
     def __init__(self):
         self.connection_string = os.getenv('MONGODB_CONNECTION_STRING')
@@ -11,30 +46,117 @@ class DatabaseConnection:
         self.client = None
         self.db = None
         self.connected = False
+        self.options = client_options()
+        self.pool_metrics = PoolMetricsListener()
+        self.topology = TopologyHealthListener(ANALYTICS_READS)
+        self.reachable = False   # result of the last ping
+        self._setup = []     # [setup, failed attempts], run once the cluster is reachable
+        self._setup_lock = threading.Lock()
+        self._reconnect_thread = None
     
     def connect(self):
         # Check if connection string is properly configured
         if not self.connection_string or 'your_username' in self.connection_string:
-            print("Warning: MongoDB connection string not configured. Running without database.")
+            logger.warning("MongoDB connection string not configured. Running without database.")
             self.connected = False
             return False
         
         try:
-            self.client = MongoClient(self.connection_string)
+            self.client = MongoClient(
+                self.connection_string,
+                event_listeners=[self.pool_metrics, self.topology],
+                **self.options
+            )
             self.db = self.client[self.db_name]
-            self.connected = True
-            print("Connected to MongoDB Atlas successfully!")
-            return True
         except Exception as e:
-            print(f"Error connecting to MongoDB: {e}")
-            print("Running without database connection.")
+            # Invalid connection string or options
+            logger.error("Error connecting to MongoDB: %s. Running without database connection.", e)
+            self.client = None
+            self.db = None
             self.connected = False
             return False
+
+        self.connected = True
+        try:
+            # Ping so an unreachable cluster is reported at startup; this also
+            # opens the first pooled connection (minPoolSize fills the rest)
+            self.db.command('ping')
+            self.reachable = True
+            logger.info("Connected to MongoDB Atlas successfully")
+        except Exception as e:
+            # Keep the client: it reconnects by itself, and until then
+            # is_available() makes handlers return 503
+            logger.warning("MongoDB not reachable at startup: %s. Retrying in the background.", e)
+            self._start_reconnect()
+        return True
+
+    def when_available(self, setup):
+        """
+        Runs setup (e.g. index creation) now, or once the cluster is
+        reachable when it was not at startup.
+        """
+        attempts = 0
+        if self.reachable:
+            try:
+                setup()
+                return
+            except Exception as e:
+                attempts = 1
+                self.reachable = not isinstance(e, ConnectionFailure)
+                logger.warning("Database setup failed, retrying in the background: %s", e)
+        with self._setup_lock:
+            self._setup.append([setup, attempts])
+        self._start_reconnect()
+
+    def _start_reconnect(self):
+        with self._setup_lock:
+            if self._reconnect_thread is not None:
+                return
+            self._reconnect_thread = threading.Thread(target=self._reconnect, name="mongo-reconnect", daemon=True)
+            self._reconnect_thread.start()
+
+    def _reconnect(self):
+        interval = RECONNECT_INTERVAL_SECONDS
+        while self.client is not None:
+            time.sleep(interval)
+            interval = min(interval * 2, RECONNECT_MAX_INTERVAL_SECONDS)
+            try:
+                self.db.command('ping')
+            except Exception as e:
+                self.reachable = False
+                logger.debug("MongoDB still unreachable: %s", e)
+                continue
+            self.reachable = True
+            with self._setup_lock:
+                pending, self._setup = self._setup, []
+            for entry in pending:
+                setup, attempts = entry
+                try:
+                    setup()
+                except Exception as e:
+                    if isinstance(e, ConnectionFailure):
+                        # Lost the cluster again: not the setup's fault
+                        self.reachable = False
+                    else:
+                        entry[1] = attempts = attempts + 1
+                    if attempts >= SETUP_MAX_ATTEMPTS:
+                        logger.error("Database setup %s failed %d times, giving up: %s",
+                                     getattr(setup, '__qualname__', setup), attempts, e)
+                        continue
+                    logger.warning("Database setup failed: %s", e)
+                    with self._setup_lock:
+                        self._setup.append(entry)
+            with self._setup_lock:
+                if not self._setup:
+                    self._reconnect_thread = None
+                    logger.info("Connected to MongoDB Atlas successfully")
+                    return
     
     def disconnect(self):
         if self.client:
-            self.client.close()
-            print("Disconnected from MongoDB")
+            client, self.client = self.client, None
+            client.close()
+            logger.info("Disconnected from MongoDB")
     
     def get_collection(self, collection_name):
         if not self.connected or self.db is None:
@@ -44,4 +166,21 @@ class DatabaseConnection:
     def is_connected(self):
         return self.connected
 
+    def is_available(self, analytics=False):
+        """
+        True when connected and the driver currently sees a writable server,
+        or with analytics a server analytics reads may use (a secondary
+        while there is no primary).
+        """
+        return self.connected and (self.topology.readable if analytics else self.topology.available)
+
+    def pool_stats(self):
+        return {
+            "max_pool_size": self.options['maxPoolSize'],
+            "min_pool_size": self.options['minPoolSize'],
+            "server_available": self.topology.available,
+            "analytics_server_available": self.topology.readable,
+            "pools": self.pool_metrics.snapshot(self.options['maxPoolSize'])
+        }
+
 db_connection = DatabaseConnection()
@@ -0,0 +1,98 @@
+import os
+from datetime import datetime, timedelta
+
+# Snapshots kept per monthly bucket document; bounds document size even for
+# products refreshed many times a day
+MAX_SNAPSHOTS_PER_BUCKET = int(os.getenv('HISTORY_MAX_SNAPSHOTS_PER_BUCKET', '1000'))
+
+HISTORY_INTERVALS = ("raw", "day", "week", "month")
+
+def bucket_start(at: datetime) -> datetime:
+    return datetime(at.year, at.month, 1)
+
+def bucket_id(product_id, at: datetime) -> str:
+    return f"{product_id}:{at.strftime('%Y-%m')}"
+
+def make_snapshot(summary: dict, mean_compound=None, at: datetime = None) -> dict:
+    """
+    Compact snapshot of one analysis run. Short field names keep bucket
+    documents small: t=time, p/n/u=Positive/Negative/Neutral counts,
+    c=mean compound score.
+    """
+    return {
+        't': at or datetime.utcnow(),
+        'p': summary.get('Positive', 0),
+        'n': summary.get('Negative', 0),
+        'u': summary.get('Neutral', 0),
+        'c': None if mean_compound is None else round(float(mean_compound), 4)
+    }
+
+def history_update(product_id, reviews_data: dict, at: datetime):
+    """
+    (filter, update) appending one analysis run to the product's monthly
+    bucket document, creating the bucket on first use.
+    """
+    snapshot = make_snapshot(reviews_data['summary'], reviews_data.get('mean_compound'), at)
+    return (
+        {'_id': bucket_id(product_id, at)},
+        {
+            '$push': {'snapshots': {'$each': [snapshot], '$slice': -MAX_SNAPSHOTS_PER_BUCKET}},
+            '$inc': {'count': 1},
+            '$setOnInsert': {'product_id': product_id, 'start': bucket_start(at)}
+        }
+    )
+
+def interval_start(at: datetime, interval: str) -> datetime:
+    if interval == "day":
+        return datetime(at.year, at.month, at.day)
+    if interval == "week":
+        day = datetime(at.year, at.month, at.day)
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return datetime(at.year, at.month, 1)
+    return at
+
+def downsample(snapshots: list, interval: str) -> list:
+    """
+    Collapse time-ordered snapshots into one point per interval with the
+    mean counts and mean compound of the runs in it.
+    """
+    points = []
+    current = None
+    for snap in snapshots:
+        start = interval_start(snap['t'], interval)
+        if current is None or current['start'] != start:
+            current = {'start': start, 'runs': 0, 'p': 0, 'n': 0, 'u': 0, 'c_sum': 0.0, 'c_runs': 0}
+            points.append(current)
+        current['runs'] += 1
+        current['p'] += snap['p']
+        current['n'] += snap['n']
+        current['u'] += snap['u']
+        if snap.get('c') is not None:
+            current['c_sum'] += snap['c']
+            current['c_runs'] += 1
+
+    return [
+        {
+            'timestamp': point['start'].isoformat(),
+            'runs': point['runs'],
+            'Positive': round(point['p'] / point['runs'], 2),
+            'Negative': round(point['n'] / point['runs'], 2),
+            'Neutral': round(point['u'] / point['runs'], 2),
+            'mean_compound': round(point['c_sum'] / point['c_runs'], 4) if point['c_runs'] else None
+        }
+        for point in points
+    ]
+
+def raw_points(snapshots: list) -> list:
+    return [
+        {
+            'timestamp': snap['t'].isoformat(),
+            'runs': 1,
+            'Positive': snap['p'],
+            'Negative': snap['n'],
+            'Neutral': snap['u'],
+            'mean_compound': snap.get('c')
+        }
+        for snap in snapshots
+    ]
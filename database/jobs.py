@@ -0,0 +1,235 @@
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument, ASCENDING
+from pymongo.errors import DuplicateKeyError
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# A claimed job belongs to its worker until the lease expires; the worker
+# extends it every JOB_HEARTBEAT_SECONDS while the job runs
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '120'))
+JOB_HEARTBEAT_SECONDS = float(os.getenv('JOB_HEARTBEAT_SECONDS', '30'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+# Delay before a failed job is retried, doubled on every attempt
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv('JOB_RETRY_BACKOFF_SECONDS', '30'))
+# Finished jobs are removed by a TTL index after this long
+JOB_RETENTION_HOURS = float(os.getenv('JOB_RETENTION_HOURS', '24'))
+
+JOB_STATUSES = ('queued', 'running', 'done', 'failed')
+
+# Fields only a running job has
+_LEASE_FIELDS = {'lease_owner': '', 'lease_expires_at': '', 'heartbeat_at': ''}
+
+def worker_name(suffix=''):
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    return f"{name}:{suffix}" if suffix else name
+
+def enqueue_operation(product_url: str, product_name: str, priority: int = 0, max_attempts: int = JOB_MAX_ATTEMPTS):
+    """
+    (filter, update, job_id) for an upsert that queues an analysis of
+    product_url, or matches the job already queued or running for it.
+    The job is new when the returned document has job_id as _id.
+    """
+    now = datetime.utcnow()
+    job_id = ObjectId()
+    job = {
+        '_id': job_id,
+        'type': 'analyze',
+        'product_name': product_name,
+        'status': 'queued',
+        'priority': priority,
+        'attempts': 0,
+        'max_attempts': max_attempts,
+        'created_at': now,
+        'available_at': now
+    }
+    # "active" is set while queued or running; the partial unique index on
+    # (product_url, active) allows one active job per URL
+    return {'product_url': product_url, 'active': True}, {'$setOnInsert': job}, job_id
+
+def create_job_indexes(collection):
+    collection.create_index(
+        [('product_url', ASCENDING)],
+        name='one_active_job_per_url',
+        unique=True,
+        partialFilterExpression={'active': True}
+    )
+    collection.create_index([('status', ASCENDING), ('priority', ASCENDING), ('available_at', ASCENDING)])
+    collection.create_index([('status', ASCENDING), ('lease_expires_at', ASCENDING)])
+    collection.create_index('finished_at', expireAfterSeconds=int(JOB_RETENTION_HOURS * 3600))
+
+def job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    A job document as returned by the API.
+    """
+    view = {key: value for key, value in job.items() if key not in ('active', 'lease_owner')}
+    view['_id'] = str(job['_id'])
+    for field in ('created_at', 'available_at', 'started_at', 'finished_at', 'lease_expires_at', 'heartbeat_at'):
+        if view.get(field):
+            view[field] = str(view[field])
+    return view
+
+class JobQueue:
+    """
+    Analysis jobs in a MongoDB collection, shared by any number of worker
+    processes on any number of hosts.
+
+    A worker claims the next job with one atomic find_one_and_update that
+    sets it running under a lease. While the job runs the worker renews
+    the lease (heartbeat). A job whose lease expired, because its worker
+    died or hung, is claimable again. Completion and failure are only
+    written by the lease owner.
+    """
+    def __init__(self, collection, lease_seconds=JOB_LEASE_SECONDS):
+        self.collection = collection
+        self.lease = timedelta(seconds=lease_seconds)
+
+    def create_indexes(self):
+        create_job_indexes(self.collection)
+
+    def enqueue(self, product_url: str, product_name: str = 'Unknown Product', priority: int = 0):
+        """
+        Queues an analysis of product_url unless one is already queued or
+        running. Returns (job, created).
+        """
+        job_filter, update, job_id = enqueue_operation(product_url, product_name, priority)
+        try:
+            job = self.collection.find_one_and_update(job_filter, update, upsert=True, return_document=ReturnDocument.AFTER)
+        except DuplicateKeyError:
+            # Another request queued the same URL between our find and insert
+            job = self.collection.find_one(job_filter)
+        return job, job['_id'] == job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.collection.find_one({'_id': ObjectId(job_id)})
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """
+        Leases the next due job to worker: queued jobs by priority and age,
+        or a running job whose lease expired. None when there is nothing to do.
+        """
+        now = datetime.utcnow()
+        return self.collection.find_one_and_update(
+            {
+                '$or': [
+                    {'status': 'queued', 'available_at': {'$lte': now}},
+                    {'status': 'running', 'lease_expires_at': {'$lt': now}, '$expr': {'$lt': ['$attempts', '$max_attempts']}}
+                ]
+            },
+            {
+                '$set': {
+                    'status': 'running',
+                    'lease_owner': worker,
+                    'lease_expires_at': now + self.lease,
+                    'heartbeat_at': now,
+                    'started_at': now
+                },
+                '$inc': {'attempts': 1}
+            },
+            sort=[('priority', ASCENDING), ('available_at', ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def heartbeat(self, job: Dict[str, Any], worker: str) -> bool:
+        """
+        Extends the lease. False if the worker no longer holds it.
+        """
+        now = datetime.utcnow()
+        result = self.collection.update_one(
+            {'_id': job['_id'], 'status': 'running', 'lease_owner': worker},
+            {'$set': {'lease_expires_at': now + self.lease, 'heartbeat_at': now}}
+        )
+        return result.matched_count == 1
+
+    def complete(self, job: Dict[str, Any], worker: str, result: Dict[str, Any]) -> bool:
+        outcome = self.collection.update_one(
+            {'_id': job['_id'], 'status': 'running', 'lease_owner': worker},
+            {
+                '$set': {'status': 'done', 'result': result, 'finished_at': datetime.utcnow()},
+                '$unset': dict(_LEASE_FIELDS, active='', error='')
+            }
+        )
+        return outcome.matched_count == 1
+
+    def fail(self, job: Dict[str, Any], worker: str, error: str, retry_after: Optional[float] = None) -> bool:
+        """
+        Requeues the job with exponential backoff (or after retry_after
+        seconds), or marks it failed once it used up its attempts.
+        """
+        now = datetime.utcnow()
+        if job['attempts'] < job.get('max_attempts', JOB_MAX_ATTEMPTS):
+            delay = retry_after if retry_after is not None else JOB_RETRY_BACKOFF_SECONDS * 2 ** (job['attempts'] - 1)
+            update = {
+                '$set': {'status': 'queued', 'available_at': now + timedelta(seconds=delay), 'error': error},
+                '$unset': _LEASE_FIELDS
+            }
+        else:
+            update = {
+                '$set': {'status': 'failed', 'error': error, 'finished_at': now},
+                '$unset': dict(_LEASE_FIELDS, active='')
+            }
+        outcome = self.collection.update_one({'_id': job['_id'], 'status': 'running', 'lease_owner': worker}, update)
+        return outcome.matched_count == 1
+
+    def expire_exhausted(self) -> int:
+        """
+        Marks failed the running jobs whose lease expired on their last
+        attempt, so a job that keeps killing its worker is not retried forever.
+        """
+        now = datetime.utcnow()
+        result = self.collection.update_many(
+            {'status': 'running', 'lease_expires_at': {'$lt': now}, '$expr': {'$gte': ['$attempts', '$max_attempts']}},
+            {
+                '$set': {'status': 'failed', 'error': 'Lease expired on the last attempt', 'finished_at': now},
+                '$unset': dict(_LEASE_FIELDS, active='')
+            }
+        )
+        return result.modified_count
+
+    def stats(self) -> Dict[str, Any]:
+        counts = {status: 0 for status in JOB_STATUSES}
+        for row in self.collection.aggregate([{'$group': {'_id': '$status', 'count': {'$sum': 1}}}]):
+            counts[row['_id']] = row['count']
+        oldest = self.collection.find_one({'status': 'queued'}, {'created_at': 1}, sort=[('created_at', ASCENDING)])
+        return {
+            'jobs': counts,
+            'oldest_queued_seconds': round((datetime.utcnow() - oldest['created_at']).total_seconds(), 1) if oldest else None
+        }
+
+class Heartbeat:
+    """
+    Renews a job's lease in a background thread while the job runs.
+    lost is set when the lease was taken over, e.g. after a long pause.
+    """
+    def __init__(self, queue: JobQueue, job: Dict[str, Any], worker: str, interval=JOB_HEARTBEAT_SECONDS):
+        self.queue = queue
+        self.job = job
+        self.worker = worker
+        self.interval = interval
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{job['_id']}", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.queue.heartbeat(self.job, self.worker):
+                    logger.warning("Lease lost", extra={"job_id": str(self.job['_id'])})
+                    self.lost.set()
+                    return
+            except Exception as e:
+                # Keep trying; the lease only lapses after JOB_LEASE_SECONDS
+                logger.warning("Heartbeat failed: %s", e, extra={"job_id": str(self.job['_id'])})
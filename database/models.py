@@ -1,59 +1,233 @@
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from pymongo import ReturnDocument, ASCENDING, DESCENDING, InsertOne, UpdateOne, DeleteMany
 from .connection import db_connection
+from .request_tracker import RequestTracker
+from .write_buffer import write_buffer
+from .routing import analytics, primary, read_after_write_seconds
+from .jobs import JobQueue
+from .products import new_product_document, product_stored_writes, STORED, PENDING
+from .retention import ReviewArchive, ArchiveExpired
+from .cache import product_cache, product_key, invalidate_product, products_written_within, ALL_PRODUCTS_KEY
+from scraper.dedupe import review_hash
+from sentiment.review_batch import review_documents
+from .history import bucket_start, history_update, downsample, raw_points
+from .aggregates import (
+    STATS_SCOPES, SENTIMENTS, stats_id, stats_updates,
+    summary_difference, negate_summary, rebuild_pipeline
+)
+from log_utils import get_logger
+
+logger = get_logger(__name__)
 
 class ProductModel:
     def __init__(self):
-        self.collection = db_connection.get_collection('products')
-    
-    def create_product(self, product_name: str, product_url: str, reviews_data: List[Dict[str, Any]]) -> str:
-        product_document = {
-            'product_name': product_name,
-            'product_url': product_url,
-            'created_at': datetime.utcnow(),
-            'updated_at': datetime.utcnow(),
-            'sentiment_summary': reviews_data['summary'],
-            'total_reviews': len(reviews_data['reviews']),
-            'reviews': reviews_data['reviews']
-        }
+        products = db_connection.get_collection('products')
+        # Writes and reads that must see them go to the primary; dashboard
+        # reads may be served by secondaries (database/routing.py)
+        self.collection = primary(products, 'product')
+        self.analytics_collection = analytics(products)
+        self.history_collection = primary(db_connection.get_collection('sentiment_history'), 'aggregate')
+        self.request_tracker = RequestTracker(primary(products, 'tracking'))
+        self.write_buffer = write_buffer
+        self.review_archive = ReviewArchive(self.collection, primary(db_connection.get_collection('review_archive'), 'archive'))
+        db_connection.when_available(self.create_indexes)
+    
+    def create_indexes(self):
+        self.collection.create_index('mean_compound')
+        self.collection.create_index([('requests_since_refresh', DESCENDING)])
+        self.review_archive.create_indexes()
+    
+    def create_product(self, product_name: str, product_url: str, reviews_data: List[Dict[str, Any]], product_type: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Stores a new product. Returns (product id, STORED or PENDING): PENDING
+        when the insert was not acknowledged within WRITE_ACK_TIMEOUT_SECONDS
+        but is still queued in the write buffer.
+        """
+        product_document = new_product_document(product_name, product_url, reviews_data, product_type)
         
-        result = self.collection.insert_one(product_document)
-        return str(result.inserted_id)
+        # Batched with the inserts of concurrent requests; the product is
+        # only reported stored once the insert is acknowledged
+        ticket = self.write_buffer.submit('products', [InsertOne(product_document)])
+        status = STORED
+        try:
+            ticket.wait()
+        except TimeoutError:
+            # Still queued and written once the buffer drains: failing the
+            # request now would make a retry insert the product twice
+            logger.warning("Product insert not acknowledged yet, still pending", extra={"url": product_url})
+            status = PENDING
+        # The aggregates follow the insert, whenever it is written
+        ticket.on_success(lambda: self._product_stored(product_document, reviews_data))
+        return str(product_document['_id']), status
+    
+    def _product_stored(self, product_document: Dict[str, Any], reviews_data: Dict[str, Any]):
+        invalidate_product()
+        # Write-behind: nobody waits for the aggregates
+        for collection_name, operations in product_stored_writes(product_document, reviews_data):
+            self.write_buffer.submit(collection_name, operations)
     
     def get_product_by_url(self, product_url: str) -> Dict[str, Any]:
-        return self.collection.find_one({'product_url': product_url})
+        # Dedup check before a scrape: on the primary, so a product stored
+        # moments ago is never scraped twice
+        return self.collection.find_one({'product_url': product_url}, {'review_hashes': 0})
     
     def get_product_by_id(self, product_id: str) -> Dict[str, Any]:
         from bson.objectid import ObjectId
-        return self.collection.find_one({'_id': ObjectId(product_id)})
+        product = product_cache.get(product_key(product_id))
+        if product is None:
+            product = self.collection.find_one({'_id': ObjectId(product_id)}, {'review_hashes': 0})
+            if product:
+                product_cache.set(product_key(product_id), product)
+        return product
+    
+    def get_seen_review_hashes(self, product_id: str) -> set:
+        """
+        Fingerprints of the reviews already stored for a product, used to
+        skip them when the product is scraped again.
+        """
+        from bson.objectid import ObjectId
+        product = self.collection.find_one({'_id': ObjectId(product_id)}, {'review_hashes': 1})
+        return set(product.get('review_hashes', [])) if product else set()
+    
+    def get_stored_reviews(self, product_id: str) -> List[Dict[str, Any]]:
+        """
+        All stored reviews of a product, read from the archive if they were
+        archived (an expired archive yields none).
+        """
+        from bson.objectid import ObjectId
+        product = self.collection.find_one({'_id': ObjectId(product_id)}, {'reviews': 1, 'reviews_archived': 1})
+        if not product:
+            return []
+        if product.get('reviews_archived'):
+            try:
+                return self.review_archive.load(product_id, product['reviews_archived'])
+            except ArchiveExpired:
+                return []
+        return product.get('reviews', [])
     
     def get_all_products(self) -> List[Dict[str, Any]]:
-        return list(self.collection.find({}, {'product_name': 1, 'product_url': 1, 'created_at': 1, 'sentiment_summary': 1, 'total_reviews': 1}))
+        products = product_cache.get(ALL_PRODUCTS_KEY)
+        if products is None:
+            # A secondary may not have our latest writes yet; caching what it
+            # returns would hide them for the whole TTL
+            collection = self.collection if products_written_within(read_after_write_seconds()) else self.analytics_collection
+            products = list(collection.find({}, {'product_name': 1, 'product_url': 1, 'created_at': 1, 'updated_at': 1, 'sentiment_summary': 1, 'mean_compound': 1, 'rating': 1, 'total_reviews': 1}))
+            product_cache.set(ALL_PRODUCTS_KEY, products)
+        return products
+    
+    def get_products_ranked_by_sentiment(self, limit: int = 10, ascending: bool = False) -> List[Dict[str, Any]]:
+        # Served from the mean_compound index; unscored products are skipped
+        return list(
+            self.analytics_collection.find(
+                {'mean_compound': {'$ne': None}},
+                {'product_name': 1, 'product_url': 1, 'mean_compound': 1, 'sentiment_summary': 1, 'total_reviews': 1}
+            )
+            .sort('mean_compound', ASCENDING if ascending else DESCENDING)
+            .limit(limit)
+        )
+    
+    def record_request(self, product_id: str):
+        # Buffered; written in batches by the request tracker thread
+        self.request_tracker.record(product_id)
+    
+    def get_refresh_candidates(self, stale_before: datetime, limit: int = 50, min_requests: int = 1) -> List[Dict[str, Any]]:
+        """
+        Stale products that were requested since their last analysis, most
+        requested first. Products backing off after failed refreshes are
+        left out until their next_refresh_at.
+        """
+        return list(
+            self.analytics_collection.find(
+                {
+                    'updated_at': {'$lt': stale_before},
+                    'requests_since_refresh': {'$gte': min_requests},
+                    '$or': [{'next_refresh_at': None}, {'next_refresh_at': {'$lte': datetime.utcnow()}}]
+                },
+                {'product_name': 1, 'product_url': 1, 'updated_at': 1, 'requests_since_refresh': 1, 'last_requested_at': 1, 'refresh_failures': 1}
+            )
+            .sort('requests_since_refresh', DESCENDING)
+            .limit(limit)
+        )
+    
+    def record_refresh_failure(self, product_id: str, next_refresh_at: datetime, error: str):
+        from bson.objectid import ObjectId
+        self.collection.update_one(
+            {'_id': ObjectId(product_id)},
+            {'$inc': {'refresh_failures': 1}, '$set': {'next_refresh_at': next_refresh_at, 'last_refresh_error': error}}
+        )
     
     def update_product_sentiment(self, product_id: str, reviews_data: Dict[str, Any]) -> bool:
         from bson.objectid import ObjectId
         
+        reviews = review_documents(reviews_data['reviews'])
         update_data = {
             'sentiment_summary': reviews_data['summary'],
-            'total_reviews': len(reviews_data['reviews']),
-            'reviews': reviews_data['reviews'],
+            'score_stats': reviews_data.get('score_stats'),
+            'mean_compound': reviews_data.get('mean_compound'),
+            'total_reviews': len(reviews),
+            'reviews': reviews,
+            'review_hashes': [review_hash(r['text']) for r in reviews],
+            'requests_since_refresh': 0,
             'updated_at': datetime.utcnow()
         }
+        # Keep the stored star rating when this scrape found none
+        if reviews_data.get('rating'):
+            update_data['rating'] = reviews_data['rating']
         
-        result = self.collection.update_one(
+        # Read the previous summary in the same operation so the aggregates
+        # can be adjusted by the difference
+        previous = self.collection.find_one_and_update(
             {'_id': ObjectId(product_id)},
-            {'$set': update_data}
+            {'$set': update_data, '$unset': {'reviews_archived': '', 'restored_at': '', 'refresh_failures': '', 'next_refresh_at': '', 'last_refresh_error': ''}},
+            projection={'product_url': 1, 'domain': 1, 'product_type': 1, 'created_at': 1, 'sentiment_summary': 1, 'total_reviews': 1, 'reviews_archived': 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        invalidate_product(product_id)
+        if not previous:
+            return False
+        # The reviews are hot again
+        if previous.get('reviews_archived'):
+            self.review_archive.discard(previous['_id'], previous['reviews_archived'])
+        
+        self._update_stats(
+            previous,
+            summary_difference(reviews_data['summary'], previous.get('sentiment_summary', {})),
+            0,
+            update_data['total_reviews'] - previous.get('total_reviews', 0)
         )
-        return result.modified_count > 0
+        self._record_history(previous['_id'], reviews_data, update_data['updated_at'])
+        return True
     
     def delete_product(self, product_id: str) -> bool:
         from bson.objectid import ObjectId
-        result = self.collection.delete_one({'_id': ObjectId(product_id)})
-        return result.deleted_count > 0
+        deleted = self.collection.find_one_and_delete(
+            {'_id': ObjectId(product_id)},
+            projection={'product_url': 1, 'domain': 1, 'product_type': 1, 'created_at': 1, 'sentiment_summary': 1, 'total_reviews': 1, 'reviews_archived': 1}
+        )
+        invalidate_product(product_id)
+        if not deleted:
+            return False
+        if deleted.get('reviews_archived'):
+            self.review_archive.discard(deleted['_id'], deleted['reviews_archived'])
+        
+        self._update_stats(deleted, negate_summary(deleted.get('sentiment_summary', {})), -1, -deleted.get('total_reviews', 0))
+        # Through the buffer, so it lands after history updates still queued
+        self.write_buffer.submit('sentiment_history', [DeleteMany({'product_id': deleted['_id']})])
+        return True
+    
+    def _update_stats(self, product: Dict[str, Any], summary_delta: Dict[str, int], products_delta: int, reviews_delta: int):
+        # Write-behind: nobody waits for the aggregates
+        self.write_buffer.submit('sentiment_stats', stats_updates(product, summary_delta, products_delta, reviews_delta))
+    
+    def _record_history(self, product_id, reviews_data: Dict[str, Any], at: datetime):
+        # Append the run to the product's monthly bucket document
+        bucket_filter, update = history_update(product_id, reviews_data, at)
+        self.write_buffer.submit('sentiment_history', [UpdateOne(bucket_filter, update, upsert=True)])
 
 class ReviewModel:
     def __init__(self):
-        self.collection = db_connection.get_collection('reviews')
+        self.collection = analytics(db_connection.get_collection('reviews'))
     
     def get_reviews_by_sentiment(self, sentiment: str, limit: int = 100) -> List[Dict[str, Any]]:
         return list(self.collection.find({'sentiment': sentiment}).limit(limit))
@@ -61,5 +235,95 @@ class ReviewModel:
     def search_reviews_by_text(self, search_term: str) -> List[Dict[str, Any]]:
         return list(self.collection.find({'text': {'$regex': search_term, '$options': 'i'}}))
 
+class HistoryModel:
+    """
+    Per-product sentiment time series, stored as one bucket document per
+    product per month holding compact snapshots of each analysis run.
+    """
+    def __init__(self):
+        self.collection = analytics(db_connection.get_collection('sentiment_history'))
+        db_connection.when_available(self.create_indexes)
+    
+    def create_indexes(self):
+        self.collection.create_index([('product_id', 1), ('start', 1)])
+    
+    def get_history(self, product_id: str, interval: str = 'day', start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        from bson.objectid import ObjectId
+        query = {'product_id': ObjectId(product_id)}
+        if start or end:
+            query['start'] = {}
+            if start:
+                query['start']['$gte'] = bucket_start(start)
+            if end:
+                query['start']['$lte'] = end
+        
+        snapshots = []
+        for bucket in self.collection.find(query, {'snapshots': 1}).sort('start', 1):
+            snapshots.extend(
+                snap for snap in bucket['snapshots']
+                if (not start or snap['t'] >= start) and (not end or snap['t'] <= end)
+            )
+        
+        # Backfilled runs may have been appended out of order
+        snapshots.sort(key=lambda snap: snap['t'])
+        if interval == 'raw':
+            return raw_points(snapshots)
+        return downsample(snapshots, interval)
+
+class StatsModel:
+    """
+    Materialized sentiment aggregates (global, per domain, per product type
+    and per day), maintained incrementally by ProductModel writes.
+    """
+    def __init__(self):
+        stats = db_connection.get_collection('sentiment_stats')
+        self.collection = analytics(stats)
+        # rebuild() reads and writes on the primary
+        self.primary_collection = primary(stats, 'aggregate')
+        self.products = primary(db_connection.get_collection('products'), 'product')
+        db_connection.when_available(self.create_indexes)
+    
+    def create_indexes(self):
+        self.collection.create_index([('scope', 1), ('key', DESCENDING)])
+    
+    def get_stats(self, scope: str = 'global', key: str = 'all') -> Optional[Dict[str, Any]]:
+        return self.collection.find_one({'_id': stats_id(scope, key)})
+    
+    def list_stats(self, scope: str, limit: int = 100) -> List[Dict[str, Any]]:
+        # Day keys sort chronologically, so newest days come first
+        return list(self.collection.find({'scope': scope}).sort('key', DESCENDING).limit(limit))
+    
+    def rebuild(self) -> Dict[str, int]:
+        """
+        Recompute every aggregate from the raw product documents, replacing
+        the stored buckets. Returns the number of buckets per scope.
+        """
+        now = datetime.utcnow()
+        buckets = {}
+        counts = {}
+        for scope in STATS_SCOPES:
+            rows = list(self.products.aggregate(rebuild_pipeline(scope)))
+            counts[scope] = len(rows)
+            for row in rows:
+                key = str(row['_id'])
+                buckets[stats_id(scope, key)] = {
+                    '_id': stats_id(scope, key),
+                    'scope': scope,
+                    'key': key,
+                    'products': row['products'],
+                    'reviews': row['reviews'],
+                    'sentiment': {label: row[label] for label in SENTIMENTS},
+                    'updated_at': now
+                }
+        
+        self.primary_collection.delete_many({'_id': {'$nin': list(buckets)}})
+        for bucket in buckets.values():
+            self.primary_collection.replace_one({'_id': bucket['_id']}, bucket, upsert=True)
+        return counts
+
 product_model = ProductModel()
 review_model = ReviewModel()
+stats_model = StatsModel()
+history_model = HistoryModel()
+job_queue = JobQueue(primary(db_connection.get_collection('jobs'), 'job'))
+db_connection.when_available(job_queue.create_indexes)
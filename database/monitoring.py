@@ -0,0 +1,117 @@
+import threading
+from pymongo import monitoring
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Collects connection pool utilization from PyMongo's CMAP monitoring events.
+    Counters are kept per server address and read through snapshot().
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools = {}
+
+    def _pool(self, address):
+        key = f"{address[0]}:{address[1]}"
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = {
+                "open_connections": 0,
+                "checked_out": 0,
+                "max_checked_out": 0,
+                "checkouts": 0,
+                "checkout_failures": 0,
+                "checkout_wait_ms_total": 0.0,
+                "checkout_wait_ms_max": 0.0,
+                "pool_clears": 0
+            }
+            self._pools[key] = pool
+        return pool
+
+    def pool_created(self, event):
+        with self._lock:
+            self._pool(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._pool(event.address)["pool_clears"] += 1
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._pools.pop(f"{event.address[0]}:{event.address[1]}", None)
+
+    def connection_created(self, event):
+        with self._lock:
+            self._pool(event.address)["open_connections"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["open_connections"] = max(0, pool["open_connections"] - 1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self._pool(event.address)["checkout_failures"] += 1
+
+    def connection_checked_out(self, event):
+        # duration is available on PyMongo >= 4.7
+        wait_ms = getattr(event, "duration", 0) * 1000
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["checkouts"] += 1
+            pool["checked_out"] += 1
+            pool["max_checked_out"] = max(pool["max_checked_out"], pool["checked_out"])
+            pool["checkout_wait_ms_total"] += wait_ms
+            pool["checkout_wait_ms_max"] = max(pool["checkout_wait_ms_max"], wait_ms)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["checked_out"] = max(0, pool["checked_out"] - 1)
+
+    def snapshot(self, max_pool_size=None):
+        with self._lock:
+            pools = {}
+            for address, pool in self._pools.items():
+                stats = dict(pool)
+                stats["avg_checkout_wait_ms"] = round(pool["checkout_wait_ms_total"] / pool["checkouts"], 3) if pool["checkouts"] else 0.0
+                stats["checkout_wait_ms_total"] = round(pool["checkout_wait_ms_total"], 3)
+                stats["checkout_wait_ms_max"] = round(pool["checkout_wait_ms_max"], 3)
+                if max_pool_size:
+                    stats["utilization"] = round(pool["checked_out"] / max_pool_size, 3)
+                pools[address] = stats
+            return pools
+
+class TopologyHealthListener(monitoring.TopologyListener):
+    """
+    Tracks whether the driver currently sees a writable server, and a
+    server analytics reads may use (read_preference), so request handlers
+    can fail fast instead of waiting out server selection.
+    """
+    def __init__(self, read_preference=None):
+        self.read_preference = read_preference
+        self.available = False
+        self.readable = False
+
+    def opened(self, event):
+        pass
+
+    def description_changed(self, event):
+        description = event.new_description
+        self.available = description.has_writable_server()
+        if self.read_preference is None:
+            self.readable = self.available
+        else:
+            self.readable = description.has_readable_server(self.read_preference)
+
+    def closed(self, event):
+        self.available = False
+        self.readable = False
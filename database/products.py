@@ -0,0 +1,49 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from scraper.dedupe import review_hash
+from sentiment.review_batch import review_documents
+from .aggregates import product_domain, stats_updates
+from .history import history_update
+
+# Outcome of create_product: the insert is acknowledged, or it timed out
+# in the write buffer and is written once the buffer drains
+STORED = 'stored'
+PENDING = 'pending'
+
+def new_product_document(product_name: str, product_url: str, reviews_data: Dict[str, Any], product_type: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Products document for a new analysis, as stored by ProductModel and
+    AsyncProductModel.
+    """
+    # Storage boundary: build the review documents once
+    reviews = review_documents(reviews_data['reviews'])
+    now = datetime.utcnow()
+    return {
+        '_id': ObjectId(),
+        'product_name': product_name,
+        'product_url': product_url,
+        'domain': product_domain(product_url),
+        'product_type': product_type or 'general',
+        'created_at': now,
+        'updated_at': now,
+        'sentiment_summary': reviews_data['summary'],
+        'score_stats': reviews_data.get('score_stats'),
+        'mean_compound': reviews_data.get('mean_compound'),
+        'rating': reviews_data.get('rating'),
+        'total_reviews': len(reviews),
+        'reviews': reviews,
+        'review_hashes': [review_hash(r['text']) for r in reviews]
+    }
+
+def product_stored_writes(product_document: Dict[str, Any], reviews_data: Dict[str, Any]) -> List[Tuple[str, list]]:
+    """
+    (collection name, operations) that follow the insert of a new product:
+    the aggregate counters and the product's first history point.
+    """
+    bucket_filter, update = history_update(product_document['_id'], reviews_data, product_document['created_at'])
+    return [
+        ('sentiment_stats', stats_updates(product_document, reviews_data['summary'], 1, product_document['total_reviews'])),
+        ('sentiment_history', [UpdateOne(bucket_filter, update, upsert=True)])
+    ]
@@ -0,0 +1,67 @@
+import os
+import threading
+from collections import Counter
+from datetime import datetime
+from pymongo import UpdateOne
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# How often request counts are written to MongoDB (seconds)
+FLUSH_INTERVAL = float(os.getenv('REQUEST_TRACK_FLUSH_SECONDS', '10'))
+
+class RequestTracker:
+    """
+    Counts product reads in memory and periodically folds them into the
+    product documents (requests_since_refresh, last_requested_at) with one
+    bulk write, so the refresh scheduler can find the hottest products
+    without a database write per request.
+    """
+    def __init__(self, collection, flush_interval=FLUSH_INTERVAL):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def record(self, product_id):
+        with self._lock:
+            self._counts[str(product_id)] += 1
+        if self._thread is None:
+            self.start()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="request-tracker", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.exception("Request tracker flush failed: %s", e)
+
+    def flush(self):
+        from bson.objectid import ObjectId
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        if not counts:
+            return 0
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {'_id': ObjectId(product_id)},
+                {'$inc': {'requests_since_refresh': count, 'request_count': count}, '$max': {'last_requested_at': now}}
+            )
+            for product_id, count in counts.items()
+        ]
+        self.collection.bulk_write(operations, ordered=False)
+        return len(operations)
@@ -0,0 +1,243 @@
+import glob
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from bson.binary import Binary
+from bson.objectid import ObjectId
+from pymongo import ASCENDING
+from log_utils import get_logger
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; gzip is always available
+    zstandard = None
+
+logger = get_logger(__name__)
+
+# Review text of products not analyzed for this many days is moved out of
+# the product document; summaries, scores and review hashes stay
+RETENTION_REVIEW_AGE_DAYS = float(os.getenv('RETENTION_REVIEW_AGE_DAYS', '90'))
+# Where archived reviews go: "collection" (review_archive) or "files"
+RETENTION_ARCHIVE = os.getenv('RETENTION_ARCHIVE', 'collection').lower()
+RETENTION_ARCHIVE_DIR = os.getenv('RETENTION_ARCHIVE_DIR', 'archive')
+# Archived reviews are deleted after this many days; 0 keeps them forever
+RETENTION_ARCHIVE_TTL_DAYS = float(os.getenv('RETENTION_ARCHIVE_TTL_DAYS', '0'))
+# Products archived per run
+RETENTION_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', '500'))
+
+ARCHIVE_STORES = ("collection", "files")
+CODEC = "zstd" if zstandard is not None else "gzip"
+EXTENSIONS = {"zstd": "zst", "gzip": "gz"}
+
+class ArchiveExpired(Exception):
+    pass
+
+def encode_reviews(reviews: List[Dict[str, Any]], codec: str = CODEC) -> bytes:
+    """
+    Review documents as compressed NDJSON, one review per line.
+    """
+    ndjson = "".join(json.dumps(review, ensure_ascii=False, separators=(",", ":")) + "\n" for review in reviews).encode("utf-8")
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(ndjson)
+    return gzip.compress(ndjson, compresslevel=9)
+
+def decode_reviews(data: bytes, codec: str) -> List[Dict[str, Any]]:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Reviews were archived with zstd; install zstandard to restore them")
+        ndjson = zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    else:
+        ndjson = gzip.decompress(data)
+    return [json.loads(line) for line in ndjson.decode("utf-8").splitlines() if line]
+
+class ReviewArchive:
+    """
+    Cold tier for review text. Products not analyzed for
+    RETENTION_REVIEW_AGE_DAYS have their embedded reviews moved into one
+    compressed NDJSON blob per product, in the review_archive collection or
+    in RETENTION_ARCHIVE_DIR. The product keeps its summary, scores and
+    review hashes (so re-scrapes still skip known reviews) plus a
+    reviews_archived marker; restore() puts the reviews back and sets
+    restored_at, which keeps them hot for another
+    RETENTION_REVIEW_AGE_DAYS.
+
+    Archived blobs expire after RETENTION_ARCHIVE_TTL_DAYS through a TTL
+    index on expires_at (files are pruned by archive runs).
+    """
+    def __init__(self, products, collection, store: str = RETENTION_ARCHIVE, directory: str = RETENTION_ARCHIVE_DIR):
+        if store not in ARCHIVE_STORES:
+            raise ValueError(f"RETENTION_ARCHIVE must be one of: {', '.join(ARCHIVE_STORES)}")
+        self.products = products
+        self.collection = collection
+        self.store = store
+        self.directory = directory
+
+    def create_indexes(self):
+        # expires_at is only set when a TTL is configured
+        self.collection.create_index('expires_at', expireAfterSeconds=0)
+        self.products.create_index([('updated_at', ASCENDING)])
+
+    def _path(self, product_id, codec: str) -> str:
+        return os.path.join(self.directory, f"{product_id}.ndjson.{EXTENSIONS[codec]}")
+
+    def _write(self, product: Dict[str, Any], data: bytes, codec: str, now: datetime):
+        if self.store == "files":
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(product['_id'], codec)
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+            return
+        entry = {
+            '_id': product['_id'],
+            'product_url': product.get('product_url'),
+            'codec': codec,
+            'count': len(product['reviews']),
+            'data': Binary(data),
+            'archived_at': now
+        }
+        if RETENTION_ARCHIVE_TTL_DAYS > 0:
+            entry['expires_at'] = now + timedelta(days=RETENTION_ARCHIVE_TTL_DAYS)
+        self.collection.replace_one({'_id': product['_id']}, entry, upsert=True)
+
+    def archive_product(self, product: Dict[str, Any], now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """
+        Moves the reviews of one product document (with _id, updated_at and
+        reviews) to the archive. Returns the marker set on the product, or
+        None if the product was updated meanwhile and keeps its reviews.
+        """
+        now = now or datetime.utcnow()
+        data = encode_reviews(product['reviews'], CODEC)
+        self._write(product, data, CODEC, now)
+        marker = {
+            'at': now,
+            'count': len(product['reviews']),
+            'store': self.store,
+            'codec': CODEC,
+            'bytes': len(data)
+        }
+        # Only if no analysis replaced the reviews since they were read
+        result = self.products.update_one(
+            {'_id': product['_id'], 'updated_at': product['updated_at']},
+            {'$unset': {'reviews': ''}, '$set': {'reviews_archived': marker}}
+        )
+        if not result.modified_count:
+            self.discard(product['_id'], marker)
+            return None
+        return marker
+
+    def archive(self, older_than_days: float = RETENTION_REVIEW_AGE_DAYS, limit: int = RETENTION_BATCH_SIZE) -> Dict[str, int]:
+        """
+        Archives the reviews of up to limit products not analyzed for
+        older_than_days. Returns counts of products, reviews and bytes.
+        """
+        from .cache import invalidate_product
+
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        candidates = self.products.find(
+            {
+                'updated_at': {'$lt': cutoff},
+                'reviews.0': {'$exists': True},
+                # Restoring doesn't change updated_at (the product was not
+                # analyzed again), so restored reviews age from restored_at
+                '$or': [{'restored_at': {'$exists': False}}, {'restored_at': {'$lt': cutoff}}]
+            },
+            {'product_url': 1, 'updated_at': 1, 'reviews': 1}
+        ).limit(limit)
+
+        counts = {'products': 0, 'reviews': 0, 'bytes': 0}
+        for product in candidates:
+            marker = self.archive_product(product)
+            if marker:
+                invalidate_product(str(product['_id']))
+                counts['products'] += 1
+                counts['reviews'] += marker['count']
+                counts['bytes'] += marker['bytes']
+        if self.store == "files":
+            counts['expired_files'] = self.expire_files()
+        logger.info("Archived reviews of %d products", counts['products'], extra=counts)
+        return counts
+
+    def load(self, product_id, marker: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        The archived reviews of a product, without restoring them. Raises
+        ArchiveExpired when the archive is gone.
+        """
+        product_id = ObjectId(product_id)
+        if marker.get('store') == "files":
+            try:
+                with open(self._path(product_id, marker['codec']), "rb") as f:
+                    return decode_reviews(f.read(), marker['codec'])
+            except FileNotFoundError:
+                raise ArchiveExpired(f"Archived reviews of {product_id} have expired")
+        entry = self.collection.find_one({'_id': product_id})
+        if not entry:
+            raise ArchiveExpired(f"Archived reviews of {product_id} have expired")
+        return decode_reviews(entry['data'], entry['codec'])
+
+    def restore(self, product_id) -> Optional[int]:
+        """
+        Puts a product's archived reviews back into its document. Returns
+        the number restored, or None if the product has none archived.
+        """
+        from .cache import invalidate_product
+
+        product_id = ObjectId(product_id)
+        product = self.products.find_one({'_id': product_id}, {'reviews_archived': 1})
+        if not product or not product.get('reviews_archived'):
+            return None
+        marker = product['reviews_archived']
+        reviews = self.load(product_id, marker)
+        result = self.products.update_one(
+            {'_id': product_id, 'reviews_archived.at': marker['at']},
+            {'$set': {'reviews': reviews, 'restored_at': datetime.utcnow()}, '$unset': {'reviews_archived': ''}}
+        )
+        invalidate_product(str(product_id))
+        if result.modified_count:
+            self.discard(product_id, marker)
+        return len(reviews)
+
+    def discard(self, product_id, marker: Dict[str, Any]):
+        """
+        Deletes a product's archived reviews (replaced, restored or deleted).
+        """
+        if marker.get('store') == "files":
+            try:
+                os.remove(self._path(product_id, marker['codec']))
+            except FileNotFoundError:
+                pass
+        else:
+            self.collection.delete_one({'_id': ObjectId(product_id)})
+
+    def expire_files(self) -> int:
+        """
+        File store counterpart of the TTL index.
+        """
+        if RETENTION_ARCHIVE_TTL_DAYS <= 0 or not os.path.isdir(self.directory):
+            return 0
+        cutoff = time.time() - RETENTION_ARCHIVE_TTL_DAYS * 86400
+        expired = 0
+        for path in glob.glob(os.path.join(self.directory, "*.ndjson.*")):
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                expired += 1
+        return expired
+
+    def stats(self) -> Dict[str, Any]:
+        archived = list(self.products.aggregate([
+            {'$match': {'reviews_archived': {'$exists': True}}},
+            {'$group': {'_id': None, 'products': {'$sum': 1}, 'reviews': {'$sum': '$reviews_archived.count'}, 'bytes': {'$sum': '$reviews_archived.bytes'}}}
+        ]))
+        totals = archived[0] if archived else {'products': 0, 'reviews': 0, 'bytes': 0}
+        return {
+            'store': self.store,
+            'codec': CODEC,
+            'review_age_days': RETENTION_REVIEW_AGE_DAYS,
+            'archive_ttl_days': RETENTION_ARCHIVE_TTL_DAYS,
+            'archived_products': totals['products'],
+            'archived_reviews': totals['reviews'],
+            'archived_bytes': totals['bytes']
+        }
@@ -0,0 +1,91 @@
+import os
+from pymongo import ReadPreference
+from pymongo.read_preferences import PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
+from pymongo.write_concern import WriteConcern
+
+# Dashboard/analytics reads (product lists, rankings, stats, history,
+# review search) may be served by a secondary lagging at most this much.
+# MongoDB requires a max staleness of at least 90s; -1 removes the bound.
+ANALYTICS_READ_PREFERENCE = os.getenv('MONGO_ANALYTICS_READ_PREFERENCE', 'secondaryPreferred')
+ANALYTICS_MAX_STALENESS_SECONDS = int(os.getenv('MONGO_ANALYTICS_MAX_STALENESS_SECONDS', '90'))
+
+# Write concern per operation type, as MONGO_WRITE_CONCERN_<TYPE>:
+# "majority", a number of members, or either with ":j" (journaled)
+WRITE_CONCERN_DEFAULTS = {
+    'product': 'majority',    # products: analyses, refreshes, deletes
+    'job': 'majority',        # job queue claims, leases and results
+    'archive': 'majority',    # archived review text
+    'aggregate': '1',         # sentiment_stats and sentiment_history
+    'tracking': '1',          # request counters
+}
+WRITE_TIMEOUT_MS = int(os.getenv('MONGO_WRITE_TIMEOUT_MS', '5000'))
+
+# Write type of the collections written through the write buffer
+COLLECTION_WRITE_TYPES = {
+    'products': 'product',
+    'jobs': 'job',
+    'review_archive': 'archive',
+    'sentiment_stats': 'aggregate',
+    'sentiment_history': 'aggregate',
+}
+
+_READ_PREFERENCES = {
+    'primaryPreferred': PrimaryPreferred,
+    'secondary': Secondary,
+    'secondaryPreferred': SecondaryPreferred,
+    'nearest': Nearest,
+}
+
+def analytics_read_preference(mode=ANALYTICS_READ_PREFERENCE, max_staleness=ANALYTICS_MAX_STALENESS_SECONDS):
+    if mode == 'primary':
+        return ReadPreference.PRIMARY
+    if mode not in _READ_PREFERENCES:
+        raise ValueError(f"MONGO_ANALYTICS_READ_PREFERENCE must be primary or one of: {', '.join(_READ_PREFERENCES)}")
+    return _READ_PREFERENCES[mode](max_staleness=max_staleness)
+
+def parse_write_concern(spec):
+    """
+    WriteConcern from "majority", "2", "1:j", ... ("0" is unacknowledged).
+    """
+    w, _, flag = spec.strip().partition(':')
+    w = int(w) if w.isdigit() else w
+    if w == 0:
+        return WriteConcern(w=0)
+    return WriteConcern(w=w, j=True if flag == 'j' else None, wtimeout=WRITE_TIMEOUT_MS)
+
+WRITE_CONCERNS = {
+    write_type: parse_write_concern(os.getenv(f'MONGO_WRITE_CONCERN_{write_type.upper()}', default))
+    for write_type, default in WRITE_CONCERN_DEFAULTS.items()
+}
+ANALYTICS_READS = analytics_read_preference()
+
+def analytics(collection):
+    """
+    The collection for dashboard reads, which tolerate bounded staleness.
+    """
+    return collection.with_options(read_preference=ANALYTICS_READS)
+
+def primary(collection, write_type):
+    """
+    The collection for writes of write_type and for reads that must see
+    the latest writes (the dedup check, read-after-write, job claims).
+    """
+    return collection.with_options(read_preference=ReadPreference.PRIMARY, write_concern=WRITE_CONCERNS[write_type])
+
+def read_after_write_seconds():
+    """
+    How long after a write in this process analytics reads of the written
+    data go to the primary instead: secondaries may lag that long.
+    """
+    if ANALYTICS_READS.mode == ReadPreference.PRIMARY.mode:
+        return 0
+    # Unbounded staleness (-1): assume MongoDB's minimum max staleness
+    return max(ANALYTICS_READS.max_staleness, 90)
+
+def routing_state():
+    return {
+        "analytics_read_preference": ANALYTICS_READS.name,
+        "analytics_max_staleness_seconds": ANALYTICS_READS.max_staleness if ANALYTICS_READS.mode else None,
+        "read_after_write_seconds": read_after_write_seconds(),
+        "write_concerns": {write_type: concern.document for write_type, concern in WRITE_CONCERNS.items()}
+    }
@@ -0,0 +1,240 @@
+import atexit
+import os
+import threading
+import time
+from concurrent.futures import Future
+from pymongo.errors import BulkWriteError, WriteError
+from .connection import db_connection
+from .routing import primary, COLLECTION_WRITE_TYPES
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# A flush starts when this many operations are pending, or when the oldest
+# pending operation has waited WRITE_BUFFER_MAX_DELAY_MS
+WRITE_BUFFER_MAX_OPS = int(os.getenv('WRITE_BUFFER_MAX_OPS', '500'))
+WRITE_BUFFER_MAX_DELAY_MS = float(os.getenv('WRITE_BUFFER_MAX_DELAY_MS', '50'))
+# false writes every submission directly, as before
+WRITE_BUFFER_ENABLED = os.getenv('WRITE_BUFFER', 'true').lower() == 'true'
+# How long a caller waits for the acknowledgement of its writes
+WRITE_ACK_TIMEOUT_SECONDS = float(os.getenv('WRITE_ACK_TIMEOUT_SECONDS', '10'))
+
+class WriteTicket:
+    """
+    Acknowledgement of one submission. wait() returns once all its
+    operations are written with the collection's write concern, and raises
+    the error if one of them failed (its later operations are skipped).
+    The future can be awaited from asyncio with asyncio.wrap_future().
+    """
+    __slots__ = ("future", "remaining")
+
+    def __init__(self, count):
+        self.future = Future()
+        self.remaining = count
+        if not count:
+            self.future.set_result(0)
+
+    def _ack(self, count):
+        self.remaining -= count
+        if self.remaining <= 0 and not self.future.done():
+            self.future.set_result(True)
+
+    def _fail(self, error):
+        if not self.future.done():
+            self.future.set_exception(error)
+
+    def on_success(self, callback):
+        """
+        Calls callback() once all operations are written (at once if they
+        already are); never when one failed.
+        """
+        self.future.add_done_callback(lambda future: future.exception() is None and callback())
+
+    def failed(self):
+        return self.future.done() and self.future.exception() is not None
+
+    def wait(self, timeout=WRITE_ACK_TIMEOUT_SECONDS):
+        return self.future.result(timeout)
+
+class WriteBuffer:
+    """
+    Write-behind buffer for MongoDB. Operations submitted by concurrent
+    requests are queued per collection and written by one background
+    thread as ordered bulk_write batches, so N requests cost one round
+    trip per collection instead of N. Callers that need durability wait on
+    the returned ticket; the others return at once.
+
+    Within a collection operations are written in submission order. When
+    one fails, the ones after it in the batch that belong to other
+    submissions are written in the next batch.
+    """
+    def __init__(self, get_collection, max_ops=WRITE_BUFFER_MAX_OPS, max_delay_ms=WRITE_BUFFER_MAX_DELAY_MS, enabled=WRITE_BUFFER_ENABLED):
+        self.get_collection = get_collection
+        self.max_ops = max_ops
+        self.max_delay = max_delay_ms / 1000
+        self.enabled = enabled
+        self._pending = []      # (collection name, operation, ticket)
+        self._oldest = None
+        self._cond = threading.Condition()
+        # Serializes writes, buffered or direct, so each collection's
+        # operations reach MongoDB in submission order. Reentrant: on_success
+        # callbacks run inside a flush and may submit direct writes
+        self._flush_lock = threading.RLock()
+        self._thread = None
+        self._stopping = False
+        self.submitted_total = 0
+        self.written_total = 0
+        self.failed_total = 0
+        self.round_trips = 0
+
+    def submit(self, collection_name, operations, wait=False):
+        """
+        Queues operations (pymongo InsertOne, UpdateOne, ...) for a
+        collection. Returns a WriteTicket, already acknowledged if wait.
+        """
+        operations = list(operations)
+        ticket = WriteTicket(len(operations))
+        if not operations:
+            return ticket
+        with self._cond:
+            self.submitted_total += len(operations)
+            direct = not self.enabled or self._stopping
+            if not direct:
+                first = not self._pending
+                if first:
+                    self._oldest = time.monotonic()
+                self._pending.extend((collection_name, operation, ticket) for operation in operations)
+                # Wake the flusher to start the delay timer, or to flush a full batch
+                if first or len(self._pending) >= self.max_ops:
+                    self._cond.notify()
+        if direct:
+            # After any flush in progress, which holds earlier submissions
+            with self._flush_lock:
+                self._write(collection_name, [(operation, ticket) for operation in operations])
+        elif self._thread is None:
+            self.start()
+        if wait:
+            ticket.wait()
+        return ticket
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="write-buffer", daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """
+        Writes everything pending; later submissions are written directly.
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(WRITE_ACK_TIMEOUT_SECONDS)
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                # A direct flush() may empty the buffer while we wait
+                while self._pending and len(self._pending) < self.max_ops and not self._stopping:
+                    remaining = self._oldest + self.max_delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("Write buffer flush failed: %s", e)
+
+    def flush(self):
+        """
+        Writes all pending operations now. Returns the number written.
+        """
+        with self._flush_lock:
+            with self._cond:
+                pending, self._pending = self._pending, []
+                self._oldest = None
+            by_collection = {}
+            for collection_name, operation, ticket in pending:
+                by_collection.setdefault(collection_name, []).append((operation, ticket))
+            written = 0
+            for collection_name, entries in by_collection.items():
+                written += self._write(collection_name, entries)
+            return written
+
+    def _write(self, collection_name, entries):
+        try:
+            collection = self.get_collection(collection_name)
+        except Exception as e:
+            self._fail_batch(collection_name, entries, e)
+            return 0
+
+        written = 0
+        while entries:
+            batch, entries = entries[:self.max_ops], entries[self.max_ops:]
+            # Submissions that failed earlier in this flush are skipped
+            batch = [(operation, ticket) for operation, ticket in batch if not ticket.failed()]
+            if not batch:
+                continue
+            self.round_trips += 1
+            try:
+                collection.bulk_write([operation for operation, _ in batch], ordered=True)
+                failed_at = len(batch)
+            except BulkWriteError as e:
+                write_errors = e.details.get('writeErrors') or []
+                if not write_errors:
+                    # Only a write concern error: none of the batch is known durable
+                    self._fail_batch(collection_name, batch, e)
+                    continue
+                failed_at = write_errors[0]['index']
+            except Exception as e:
+                self._fail_batch(collection_name, batch, e)
+                continue
+
+            for _, ticket in batch[:failed_at]:
+                ticket._ack(1)
+            written += failed_at
+            if failed_at < len(batch):
+                error = write_errors[0]
+                batch[failed_at][1]._fail(WriteError(error.get('errmsg'), error.get('code'), error))
+                self.failed_total += 1
+                logger.warning("Buffered write to %s failed: %s", collection_name, error.get('errmsg'))
+                # The rest of the batch was not attempted
+                entries = batch[failed_at + 1:] + entries
+        self.written_total += written
+        return written
+
+    def _fail_batch(self, collection_name, batch, error):
+        for _, ticket in batch:
+            ticket._fail(error)
+        self.failed_total += len(batch)
+        logger.error("Buffered writes to %s failed: %s", collection_name, error, extra={"operations": len(batch)})
+
+    def stats(self):
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "enabled": self.enabled,
+            "pending": pending,
+            "submitted_total": self.submitted_total,
+            "written_total": self.written_total,
+            "failed_total": self.failed_total,
+            "round_trips": self.round_trips,
+            "ops_per_round_trip": round(self.written_total / self.round_trips, 1) if self.round_trips else None,
+            "max_ops": self.max_ops,
+            "max_delay_ms": self.max_delay * 1000
+        }
+
+def write_collection(collection_name):
+    # With the write concern of the collection's write type
+    return primary(db_connection.get_collection(collection_name), COLLECTION_WRITE_TYPES.get(collection_name, 'product'))
+
+write_buffer = WriteBuffer(write_collection)
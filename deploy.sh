@@ -116,7 +116,14 @@ prepare_vps() {
     cp -r database deployment/
     cp -r scraper deployment/
     cp -r sentiment deployment/
-    cp app.py deployment/
+    # Every top-level module: the servers, the worker, the maintenance
+    # scripts and the modules they import (tests stay behind)
+    for module in *.py; do
+        case "$module" in
+            test_*) ;;
+            *) cp "$module" deployment/ ;;
+        esac
+    done
     cp requirements.txt deployment/
     cp Procfile deployment/
     cp ecosystem.config.js deployment/
@@ -138,6 +145,8 @@ npm install -g pm2
 
 # Install dependencies
 pip3 install -r requirements.txt
+# Precompiled VADER lexicon, matched to the installed vaderSentiment
+python3 -m sentiment.lexicon_artifact
 cd frontend && npm install
 
 # Start services with PM2
@@ -2,8 +2,9 @@ module.exports = {
   apps: [
     {
       name: 'sentiment-backend',
-      script: 'app.py',
-      interpreter: 'python3',
+      script: 'python3',
+      args: '-m uvicorn asgi:app --host 0.0.0.0 --port 5001',
+      interpreter: 'none',
       cwd: '/path/to/your/app',
       instances: 1,
       autorestart: true,
@@ -11,10 +12,42 @@ module.exports = {
       max_memory_restart: '1G',
       env: {
         NODE_ENV: 'production',
+        ANALYZE_MODE: 'queue',
         MONGODB_CONNECTION_STRING: 'your-mongo-atlas-uri',
         DB_NAME: 'your-db-name'
       }
     },
+    {
+      name: 'sentiment-refresh',
+      script: 'refresh_scheduler.py',
+      interpreter: 'python3',
+      cwd: '/path/to/your/app',
+      instances: 1,
+      autorestart: true,
+      watch: false,
+      env: {
+        MONGODB_CONNECTION_STRING: 'your-mongo-atlas-uri',
+        DB_NAME: 'your-db-name',
+        REFRESH_BUDGET_PER_HOUR: 30,
+        REFRESH_MAX_AGE_HOURS: 24,
+        REFRESH_MAX_REVIEWS: 20
+      }
+    },
+    {
+      name: 'sentiment-worker',
+      script: 'worker.py',
+      interpreter: 'python3',
+      cwd: '/path/to/your/app',
+      instances: 2,
+      autorestart: true,
+      watch: false,
+      max_memory_restart: '1G',
+      env: {
+        MONGODB_CONNECTION_STRING: 'your-mongo-atlas-uri',
+        DB_NAME: 'your-db-name',
+        WORKER_CONCURRENCY: 2
+      }
+    },
     {
       name: 'sentiment-frontend',
       script: 'npm start',
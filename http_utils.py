@@ -0,0 +1,219 @@
+"""
+Response helpers shared by the Flask app (app.py) and the ASGI server
+(asgi.py): negotiated compression, review list options and JSON-safe
+documents.
+"""
+import gzip
+import os
+from datetime import datetime
+import numpy as np
+from bson.objectid import ObjectId
+from sentiment.review_batch import ReviewBatch
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '5'))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+REVIEW_MODES = ("all", "none", "top")
+DEFAULT_TOP_REVIEWS = 5
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Picks br or gzip from an Accept-Encoding header (q=0 excluded),
+    preferring brotli when both are acceptable.
+    """
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        if not part.strip():
+            continue
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    def acceptable(encoding):
+        return accepted.get(encoding, accepted.get("*", 0)) > 0
+
+    if brotli is not None and acceptable("br"):
+        return "br"
+    if acceptable("gzip"):
+        return "gzip"
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def should_compress(status, content_type, content_encoding, size):
+    return (
+        status == 200
+        and not content_encoding
+        and size >= COMPRESSION_MIN_SIZE
+        and any((content_type or "").startswith(prefix) for prefix in COMPRESSIBLE_TYPES)
+    )
+
+
+def register_compression(app):
+    """
+    Compresses Flask responses according to the client's Accept-Encoding.
+    """
+    from flask import request
+
+    @app.after_request
+    def compress_response(response):
+        if response.direct_passthrough:
+            return response
+        response.vary.add("Accept-Encoding")
+        if not should_compress(response.status_code, response.content_type, response.content_encoding, response.calculate_content_length() or 0):
+            return response
+        encoding = negotiate_encoding(request.headers.get("Accept-Encoding"))
+        if not encoding:
+            return response
+        response.set_data(compress(response.get_data(), encoding))
+        response.content_encoding = encoding
+        # The compressed bytes differ from the identity representation
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    return app
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware doing the same negotiation for the async endpoints.
+    Buffers the response, which is fine for our non-streaming JSON bodies.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        encoding = negotiate_encoding(headers.get("accept-encoding"))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start = {}
+        chunks = []
+
+        async def buffered_send(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body"):
+                return
+
+            body = b"".join(chunks)
+            response_headers = [(key, value) for key, value in start.get("headers", []) if key.lower() != b"content-length"]
+            header_map = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in response_headers}
+            if should_compress(start["status"], header_map.get("content-type"), header_map.get("content-encoding"), len(body)):
+                body = compress(body, encoding)
+                response_headers = [
+                    (key, b"W/" + value if key.lower() == b"etag" and not value.startswith(b"W/") else value)
+                    for key, value in response_headers
+                ]
+                response_headers.append((b"content-encoding", encoding.encode("latin-1")))
+            if "vary" not in header_map:
+                response_headers.append((b"vary", b"Accept-Encoding"))
+            response_headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            await send(dict(start, headers=response_headers))
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, buffered_send)
+
+
+def json_safe(value):
+    """
+    Copy of a MongoDB document (or list of them) with ObjectIds and
+    datetimes as strings, for JSON encoders that don't know them
+    (Starlette's JSONResponse). Cached documents are not modified.
+    """
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    if isinstance(value, (datetime, ObjectId)):
+        return str(value)
+    return value
+
+
+def parse_review_options(args):
+    """
+    Reads ?reviews=all|none|top, &limit=, &offset= and &truncate= from the
+    query string. Returns (options, error message).
+    """
+    mode = args.get("reviews", "all")
+    if mode not in REVIEW_MODES:
+        return None, f"Invalid reviews option. Must be one of: {', '.join(REVIEW_MODES)}"
+    try:
+        limit = int(args["limit"]) if args.get("limit") not in (None, "") else None
+        offset = int(args.get("offset") or 0)
+        truncate = int(args["truncate"]) if args.get("truncate") not in (None, "") else None
+    except ValueError:
+        return None, "limit, offset and truncate must be integers"
+    if (limit is not None and limit < 0) or offset < 0 or (truncate is not None and truncate < 1):
+        return None, "limit and offset must be >= 0 and truncate >= 1"
+    if mode == "top" and limit is None:
+        limit = DEFAULT_TOP_REVIEWS
+    return {"mode": mode, "limit": limit, "offset": offset, "truncate": truncate}, None
+
+
+def review_options_tag(options):
+    """
+    Suffix distinguishing ETags of the different review list variants.
+    """
+    if options["mode"] == "all" and options["limit"] is None and not options["offset"] and options["truncate"] is None:
+        return ""
+    return f"-{options['mode']}.{options['limit']}.{options['offset']}.{options['truncate']}"
+
+
+def apply_review_options(reviews, options):
+    """
+    Returns the slice of reviews a caller asked for. "top" orders by the
+    strength of the compound score, so the most opinionated reviews come first.
+    """
+    if options["mode"] == "none":
+        return []
+    end = None if options["limit"] is None else options["offset"] + options["limit"]
+    if isinstance(reviews, ReviewBatch):
+        # Select on the arrays; only the returned rows become dicts
+        order = np.arange(len(reviews))
+        if options["mode"] == "top":
+            order = np.argsort(-np.abs(np.nan_to_num(reviews.compounds())), kind="stable")
+        selected = reviews.take(order[options["offset"]:end]).to_documents()
+    else:
+        if options["mode"] == "top":
+            reviews = sorted(reviews, key=lambda r: abs(r["scores"][3]) if r.get("scores") else 0, reverse=True)
+        selected = reviews[options["offset"]:end]
+    if options["truncate"]:
+        selected = [
+            dict(r, text=r["text"][:options["truncate"]] + "…") if len(r["text"]) > options["truncate"] else r
+            for r in selected
+        ]
+    return selected
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Load Test Script
+Fires many concurrent /analyze-product requests at a running backend and
+reports throughput and latency, so the Flask dev server (python app.py)
+and the ASGI server (uvicorn asgi:app) can be compared.
+
+Usage:
+    python load_test.py --base-url http://localhost:5001 --concurrency 200 --requests 1000
+    python load_test.py --base-url http://localhost:8000 --concurrency 200 --requests 1000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+async def run_load_test(base_url, endpoint, total_requests, concurrency, url_template, timeout):
+    latencies = []
+    statuses = {}
+    slots = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def one_request(i):
+            async with slots:
+                payload = {"url": url_template.format(i=i)}
+                start = time.perf_counter()
+                try:
+                    if endpoint == "/analyze-product":
+                        response = await client.post(endpoint, json=payload)
+                    else:
+                        response = await client.get(endpoint)
+                    status = response.status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one_request(i) for i in range(total_requests)))
+        elapsed = time.perf_counter() - started
+
+    return latencies, statuses, elapsed
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for the sentiment backend")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--endpoint", default="/analyze-product")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--url-template", default="https://example.com/product-{i}",
+                        help="Product URL sent to /analyze-product; {i} is the request number")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    print(f"🚀 Load test: {args.requests} requests, {args.concurrency} concurrent -> {args.base_url}{args.endpoint}")
+    latencies, statuses, elapsed = asyncio.run(run_load_test(
+        args.base_url, args.endpoint, args.requests, args.concurrency, args.url_template, args.timeout
+    ))
+
+    print("\n📊 Results:")
+    print("=" * 30)
+    print(f"Total time:  {elapsed:.2f}s")
+    print(f"Throughput:  {len(latencies) / elapsed:.1f} req/s")
+    print(f"Latency p50: {percentile(latencies, 50) * 1000:.0f} ms")
+    print(f"Latency p95: {percentile(latencies, 95) * 1000:.0f} ms")
+    print(f"Latency p99: {percentile(latencies, 99) * 1000:.0f} ms")
+    print(f"Latency avg: {statistics.mean(latencies) * 1000:.0f} ms")
+    print(f"Status codes: {statuses}")
+
+if __name__ == "__main__":
+    main()
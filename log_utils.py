@@ -0,0 +1,252 @@
+"""
+Structured, non-blocking logging shared by the Flask app, the ASGI server
+and background jobs. Entry points (app.py, asgi.py, worker.py,
+refresh_scheduler.py) call configure_logging() once; modules only
+get_logger(), so importing them leaves the root logger alone.
+
+Log calls only format the message and put the record on a queue; a
+QueueListener thread does the actual writing to stdout. Every record
+carries the id of the request it was logged under.
+
+Configuration (environment variables):
+    LOG_LEVEL        root level (default INFO)
+    LOG_LEVELS       per-logger levels, e.g. scraper=DEBUG,database=WARNING
+    LOG_FORMAT       json (default) or text
+    LOG_SAMPLE_RATE  share of requests whose DEBUG/INFO lines are kept
+                     (default 1.0); warnings and errors are always kept
+    LOG_QUEUE_SIZE   records buffered before new ones are dropped
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '1.0'))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Ids sent by clients are used only when they match; others are replaced
+_VALID_REQUEST_ID = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+# Id of the request (or background job) the current code runs for
+request_id_var = ContextVar("request_id", default="-")
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+_listener = None
+
+
+def new_request_id():
+    return uuid.uuid4().hex[:16]
+
+
+def valid_request_id(value):
+    """
+    value if it is a usable request id (up to 64 of [A-Za-z0-9_-]), else
+    None. Request ids end up in log lines and profile file names.
+    """
+    return value if value and _VALID_REQUEST_ID.fullmatch(value) else None
+
+
+def set_request_id(value=None):
+    """
+    Sets the request id for the current context (a new one if value is
+    empty or not a valid request id). Returns the token for
+    request_id_var.reset().
+    """
+    return request_id_var.set(valid_request_id(value) or new_request_id())
+
+
+def get_request_id():
+    return request_id_var.get()
+
+
+def sampled(request_id, rate=None):
+    """
+    Whether DEBUG/INFO lines of this request are kept. Decided by the
+    request id, so a request is logged completely or not at all.
+    """
+    rate = LOG_SAMPLE_RATE if rate is None else rate
+    if rate >= 1.0:
+        return True
+    if request_id == "-":
+        return random.random() < rate
+    return zlib.crc32(request_id.encode()) / 2 ** 32 < rate
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Stamps the request id on the record and applies sampling. Runs in the
+    thread that logs, where the request context is available.
+    """
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return record.levelno >= logging.WARNING or sampled(record.request_id)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler on a bounded queue that drops records instead of blocking
+    (or raising) when the listener falls behind.
+    """
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Resolve the message now (args may change after the call) but
+        # leave the formatting to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, request id, message and
+    any fields passed with extra=.
+    """
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage()
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_FIELDS})
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def parse_levels(value):
+    """
+    "scraper=DEBUG,database=WARNING" -> {"scraper": "DEBUG", ...}
+    """
+    levels = {}
+    for part in value.split(","):
+        name, _, level = part.strip().partition("=")
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging():
+    """
+    Routes all logging through the queue handler. Safe to call repeatedly.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "text":
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+    else:
+        output.setFormatter(JsonFormatter())
+
+    handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    for name, level in parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(handler.queue, output)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def get_logger(name):
+    return logging.getLogger(name)
+
+
+def dropped_records():
+    """
+    Records dropped because the log queue was full.
+    """
+    return sum(getattr(h, "dropped", 0) for h in logging.getLogger().handlers)
+
+
+def register_request_id(app):
+    """
+    Gives every Flask request an id (the caller's X-Request-ID if sent and
+    valid) for its log lines, and returns it in the response header.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_request():
+        g.request_id_token = set_request_id(request.headers.get(REQUEST_ID_HEADER))
+
+    @app.after_request
+    def _add_request_id(response):
+        response.headers[REQUEST_ID_HEADER] = get_request_id()
+        return response
+
+    @app.teardown_request
+    def _end_request(exc):
+        token = g.pop("request_id_token", None)
+        if token is not None:
+            request_id_var.reset(token)
+
+
+class RequestIdMiddleware:
+    """
+    ASGI version of register_request_id. The id is also written into the
+    request headers so the mounted Flask app logs under the same one.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header = REQUEST_ID_HEADER.lower().encode("latin-1")
+        request_id = next((value.decode("latin-1") for key, value in scope["headers"] if key.lower() == header), None)
+        token = set_request_id(request_id)
+        if valid_request_id(request_id) is None:
+            headers = [(key, value) for key, value in scope["headers"] if key.lower() != header]
+            scope = dict(scope, headers=headers + [(header, get_request_id().encode("latin-1"))])
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                if not any(key.lower() == header for key, _ in headers):
+                    headers.append((header, get_request_id().encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
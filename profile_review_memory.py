@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Review Memory Profile
+Compares the memory held by the analysis path for N reviews using the
+previous dict-per-review representation and the columnar ReviewBatch.
+
+Usage:
+    python profile_review_memory.py --reviews 10000
+"""
+import argparse
+import tracemalloc
+
+from sentiment.sentiment import score_sentiment, compound_statistics
+from sentiment.review_batch import ReviewBatch
+from scraper.synthetic import generate_reviews
+
+def sample_texts(count):
+    return [r["text"] for r in generate_reviews(count, seed=42)]
+
+def dict_pipeline(texts, results):
+    # Scraper output, scored copies, and the reviews_data wrapper
+    scraped = [{"text": text} for text in texts]
+    final_reviews = []
+    summary = {"Positive": 0, "Negative": 0, "Neutral": 0}
+    for r, result in zip(scraped, results):
+        summary[result["label"]] += 1
+        final_reviews.append({
+            "text": r["text"],
+            "sentiment": result["label"],
+            "scores": [result["neg"], result["neu"], result["pos"], result["compound"]],
+            "rule": result["rule"]
+        })
+    reviews_data = {"summary": summary, "reviews": final_reviews, "score_stats": compound_statistics([r["scores"][3] for r in final_reviews])}
+    return scraped, reviews_data
+
+def batch_pipeline(texts, results):
+    batch = ReviewBatch.from_texts(texts)
+    for i, result in enumerate(results):
+        batch.set_result(i, result)
+    return {"summary": batch.summary(), "reviews": batch, "score_stats": compound_statistics(batch.compounds())}
+
+def measure(fn, *args):
+    tracemalloc.start()
+    retained = fn(*args)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del retained
+    return current, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory profile of review representations")
+    parser.add_argument("--reviews", type=int, default=10000)
+    args = parser.parse_args()
+
+    texts = sample_texts(args.reviews)
+    # Score once up front so both runs measure only the representation
+    results = [score_sentiment(text) for text in texts]
+
+    print(f"🧪 Memory profile for {args.reviews} reviews (text strings shared by both runs)")
+    print("=" * 60)
+    dict_current, dict_peak = measure(dict_pipeline, texts, results)
+    batch_current, batch_peak = measure(batch_pipeline, texts, results)
+    print(f"dict per review:  retained {dict_current / 1024:9.1f} KiB   peak {dict_peak / 1024:9.1f} KiB")
+    print(f"ReviewBatch:      retained {batch_current / 1024:9.1f} KiB   peak {batch_peak / 1024:9.1f} KiB")
+    print(f"Reduction:        {dict_current / max(batch_current, 1):.1f}x retained, {dict_peak / max(batch_peak, 1):.1f}x peak")
+
+if __name__ == "__main__":
+    main()
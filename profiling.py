@@ -0,0 +1,260 @@
+"""
+Opt-in request profiling for the Flask app and the ASGI endpoints.
+
+A request is profiled when it sends X-Profile: <PROFILE_TOKEN>, or when it
+is drawn at PROFILE_SAMPLE_RATE. The profile is written to PROFILE_DIR as
+a cProfile .pstats file (snakeviz, pstats) or as collapsed stacks
+(flamegraph.pl, speedscope). Every request is timed; the slowest recent
+ones are kept in memory with the path of their profile, if any, and
+listed by /admin/slow-requests.
+
+When no request is profiled the cost is one header lookup, one random()
+call and two perf_counter() calls per request.
+
+Configuration (environment variables):
+    PROFILE_TOKEN        secret for the X-Profile header and the admin
+                         endpoints; both are disabled without it
+    PROFILE_SAMPLE_RATE  share of requests profiled (default 0)
+    PROFILE_MODE         pstats (default) or stacks
+    PROFILE_DIR          where profiles are written (default profiles)
+    PROFILE_KEEP         profiles kept on disk, oldest removed first
+    PROFILE_STACK_INTERVAL_MS  sampling interval of the stacks mode
+    SLOW_REQUEST_MS      requests at least this slow are listed
+    SLOW_REQUEST_KEEP    slow requests kept in memory
+"""
+import cProfile
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from log_utils import get_logger, get_request_id, valid_request_id, new_request_id
+
+logger = get_logger(__name__)
+
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'pstats').lower()
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '200'))
+PROFILE_STACK_INTERVAL_MS = float(os.getenv('PROFILE_STACK_INTERVAL_MS', '5'))
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', '1000'))
+SLOW_REQUEST_KEEP = int(os.getenv('SLOW_REQUEST_KEEP', '100'))
+
+PROFILE_HEADER = "X-Profile"
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+
+_slow_requests = deque(maxlen=SLOW_REQUEST_KEEP)
+# Held while a request is profiled. One profile at a time: since Python
+# 3.12 a second cProfile.Profile().enable() raises ValueError, even from
+# another thread, and concurrent requests would show up in each other's
+# profiles anyway. Requests drawn meanwhile are only timed.
+_profile_lock = threading.Lock()
+
+
+def token_matches(value):
+    return bool(PROFILE_TOKEN) and hmac.compare_digest(value or "", PROFILE_TOKEN)
+
+
+def should_profile(header_value):
+    """
+    Whether to profile a request that sent header_value in X-Profile.
+    """
+    if header_value:
+        return token_matches(header_value)
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread at a fixed interval from a background
+    thread and counts identical stacks (collapsed stack format).
+    """
+    def __init__(self, thread_id, interval=PROFILE_STACK_INTERVAL_MS / 1000):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def enable(self):
+        self._thread.start()
+
+    def disable(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def dump_stats(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _profile_path(method, path, request_id):
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    # The id may come from the client; never let it name another directory
+    request_id = valid_request_id(request_id) or new_request_id()
+    method = re.sub(r'[^A-Za-z]+', '', method)[:10]
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', path).strip('-')[:60] or "root"
+    extension = "collapsed" if PROFILE_MODE == "stacks" else "pstats"
+    return os.path.join(PROFILE_DIR, f"{stamp}-{request_id}-{method}-{slug}.{extension}")
+
+
+def _prune():
+    files = sorted(
+        (entry for entry in os.scandir(PROFILE_DIR) if entry.is_file()),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in files[:max(0, len(files) - PROFILE_KEEP)]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+@contextmanager
+def request_profile(method, path, header_value=None):
+    """
+    Times the enclosed request handling and, when should_profile says so
+    and no other request is being profiled, profiles it. Yields a dict the
+    caller may put the status code in.
+    """
+    info = {"status": None}
+    profiler = None
+    if should_profile(header_value) and _profile_lock.acquire(blocking=False):
+        try:
+            profiler = StackSampler(threading.get_ident()) if PROFILE_MODE == "stacks" else cProfile.Profile()
+            profiler.enable()
+        except Exception as e:
+            _profile_lock.release()
+            profiler = None
+            logger.warning("Could not start profiler: %s", e)
+
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        profile_file = None
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
+            try:
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                profile_path = _profile_path(method, path, get_request_id())
+                profiler.dump_stats(profile_path)
+                _prune()
+                profile_file = os.path.basename(profile_path)
+            except OSError as e:
+                logger.warning("Could not write profile: %s", e)
+            logger.info("Profiled %s %s in %.0fms", method, path, duration_ms,
+                        extra={"duration_ms": round(duration_ms, 1), "profile": profile_file})
+
+        if duration_ms >= SLOW_REQUEST_MS or profile_file:
+            _slow_requests.append({
+                "request_id": get_request_id(),
+                "method": method,
+                "path": path,
+                "status": info["status"],
+                "duration_ms": round(duration_ms, 1),
+                "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "slow": duration_ms >= SLOW_REQUEST_MS,
+                "profile": profile_file
+            })
+
+
+def slow_requests(limit=50, min_ms=0):
+    """
+    Recently timed slow or profiled requests, slowest first.
+    """
+    entries = [entry for entry in list(_slow_requests) if entry["duration_ms"] >= min_ms]
+    entries.sort(key=lambda entry: entry["duration_ms"], reverse=True)
+    return entries[:limit]
+
+
+def profiled(endpoint):
+    """
+    Decorator for Starlette endpoints: runs them under request_profile.
+    On the event loop the profile also covers other requests that were
+    running concurrently.
+    """
+    from functools import wraps
+
+    @wraps(endpoint)
+    async def wrapper(request):
+        with request_profile(request.method, request.url.path, request.headers.get(PROFILE_HEADER)) as info:
+            response = await endpoint(request)
+            info["status"] = response.status_code
+            return response
+    return wrapper
+
+
+def register_profiling(app):
+    """
+    Profiles Flask requests (see request_profile) and adds the admin
+    endpoints, which need the X-Admin-Token header to match PROFILE_TOKEN:
+        GET /admin/slow-requests?limit=&min_ms=
+        GET /admin/profiles/<name>
+    """
+    from flask import g, request, jsonify, send_from_directory, abort
+
+    @app.before_request
+    def _start_profile():
+        g.request_profile = request_profile(request.method, request.path, request.headers.get(PROFILE_HEADER))
+        g.request_profile_info = g.request_profile.__enter__()
+
+    @app.after_request
+    def _record_status(response):
+        info = g.get("request_profile_info")
+        if info is not None:
+            info["status"] = response.status_code
+        return response
+
+    @app.teardown_request
+    def _end_profile(exc):
+        profile = g.pop("request_profile", None)
+        if profile is not None:
+            profile.__exit__(None, None, None)
+
+    def _authorized():
+        return token_matches(request.headers.get(ADMIN_TOKEN_HEADER))
+
+    @app.route("/admin/slow-requests", methods=["GET"])
+    def admin_slow_requests():
+        if not _authorized():
+            return jsonify({"error": "Admin token required (set PROFILE_TOKEN and send X-Admin-Token)"}), 403
+        limit = request.args.get('limit', 50, type=int)
+        min_ms = request.args.get('min_ms', 0, type=float)
+        entries = slow_requests(limit, min_ms)
+        return jsonify({
+            "slow_request_ms": SLOW_REQUEST_MS,
+            "sample_rate": PROFILE_SAMPLE_RATE,
+            "mode": PROFILE_MODE,
+            "requests": entries,
+            "count": len(entries)
+        })
+
+    @app.route("/admin/profiles/<name>", methods=["GET"])
+    def admin_profile(name):
+        if not _authorized():
+            return jsonify({"error": "Admin token required (set PROFILE_TOKEN and send X-Admin-Token)"}), 403
+        if os.path.basename(name) != name:
+            abort(404)
+        return send_from_directory(os.path.abspath(PROFILE_DIR), name, as_attachment=True)
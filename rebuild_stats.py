@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Rebuild Sentiment Statistics
+Recomputes the materialized aggregates in the sentiment_stats collection
+from the raw product documents. Products stored before domain/product_type
+were recorded are backfilled first.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database.connection import db_connection
+from database.aggregates import product_domain
+
+def backfill_products(products):
+    from scraper.scraper import detect_product_type
+    updated = 0
+    missing = products.find(
+        {'$or': [{'domain': {'$exists': False}}, {'product_type': {'$exists': False}}]},
+        {'product_url': 1, 'product_name': 1}
+    )
+    for product in missing:
+        products.update_one({'_id': product['_id']}, {'$set': {
+            'domain': product_domain(product.get('product_url', '')),
+            'product_type': detect_product_type(product.get('product_url', ''), product.get('product_name', ''))
+        }})
+        updated += 1
+    return updated
+
+def main():
+    print("📊 Rebuilding sentiment statistics")
+    print("=" * 50)
+    
+    if not db_connection.connect():
+        print("❌ Database is NOT connected")
+        return False
+    
+    from database.models import product_model, stats_model
+    
+    updated = backfill_products(product_model.collection)
+    print(f"✅ Backfilled domain/product_type on {updated} products")
+    
+    counts = stats_model.rebuild()
+    for scope, count in counts.items():
+        print(f"✅ {scope}: {count} buckets")
+    
+    db_connection.disconnect()
+    return True
+
+if __name__ == "__main__":
+    main()
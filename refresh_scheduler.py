@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Background Refresh Scheduler
+Re-analyzes stored products that are stale and in demand, so reads of
+/analyze-product and /products/<id> keep hitting fresh cached data.
+
+Products are ranked by requests since their last analysis times hours
+since that analysis. Scrapes are limited to REFRESH_BUDGET_PER_HOUR and
+run at background priority in the fetch scheduler, behind user requests.
+A product whose refresh failed is skipped with exponential backoff.
+The scrapes of the last hour are kept in the refresh_state document, so a
+restart does not reset the budget.
+
+Run as its own process:
+    python refresh_scheduler.py
+"""
+import sys
+import os
+import time
+from collections import deque
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database.connection import db_connection
+from log_utils import configure_logging, get_logger, set_request_id
+
+REFRESH_BUDGET_PER_HOUR = int(os.getenv('REFRESH_BUDGET_PER_HOUR', '30'))
+# Products analyzed longer ago than this are stale
+REFRESH_MAX_AGE_HOURS = float(os.getenv('REFRESH_MAX_AGE_HOURS', '24'))
+# Seconds between scheduling passes
+REFRESH_INTERVAL = float(os.getenv('REFRESH_INTERVAL', '60'))
+# Minimum requests since the last analysis for a product to be refreshed
+REFRESH_MIN_REQUESTS = int(os.getenv('REFRESH_MIN_REQUESTS', '1'))
+REFRESH_QUEUE_SIZE = int(os.getenv('REFRESH_QUEUE_SIZE', '20'))
+# After a failed refresh a product is skipped for this long, doubling with
+# each consecutive failure up to the maximum
+REFRESH_FAILURE_BACKOFF_MINUTES = float(os.getenv('REFRESH_FAILURE_BACKOFF_MINUTES', '30'))
+REFRESH_FAILURE_BACKOFF_MAX_HOURS = float(os.getenv('REFRESH_FAILURE_BACKOFF_MAX_HOURS', '24'))
+# Reviews kept per product, newest first: the reviews of a first analysis
+# (the scraper's max_reviews), so refreshes don't grow the document
+REFRESH_MAX_REVIEWS = int(os.getenv('REFRESH_MAX_REVIEWS', '20'))
+
+STATE_ID = 'refresh_scheduler'
+
+logger = get_logger(__name__)
+
+class RefreshScheduler:
+    def __init__(self, product_model, state_collection, budget_per_hour=REFRESH_BUDGET_PER_HOUR, max_age_hours=REFRESH_MAX_AGE_HOURS):
+        self.product_model = product_model
+        self.state_collection = state_collection
+        self.budget_per_hour = budget_per_hour
+        self.max_age = timedelta(hours=max_age_hours)
+        # Start times of the scrapes of the last hour, persisted by save_state()
+        state = state_collection.find_one({'_id': STATE_ID}, {'scrape_times': 1}) or {}
+        self.scrape_times = deque(sorted(state.get('scrape_times', [])))
+        self.in_progress = None
+        self.last_result = None
+        self.refreshed_total = 0
+        self.failed_total = 0
+
+    def budget_remaining(self):
+        cutoff = time.time() - 3600
+        while self.scrape_times and self.scrape_times[0] < cutoff:
+            self.scrape_times.popleft()
+        return max(0, self.budget_per_hour - len(self.scrape_times))
+
+    def queue(self):
+        """
+        Stale, requested products in refresh order.
+        """
+        now = datetime.utcnow()
+        candidates = self.product_model.get_refresh_candidates(now - self.max_age, REFRESH_QUEUE_SIZE * 5, REFRESH_MIN_REQUESTS)
+        for product in candidates:
+            age_hours = (now - product['updated_at']).total_seconds() / 3600
+            product['age_hours'] = round(age_hours, 2)
+            product['score'] = round(product.get('requests_since_refresh', 0) * age_hours, 2)
+        candidates.sort(key=lambda product: product['score'], reverse=True)
+        return candidates[:REFRESH_QUEUE_SIZE]
+
+    def failure_backoff(self, failures):
+        """
+        How long a product is skipped after its failures-th failed refresh in a row.
+        """
+        delay = timedelta(minutes=REFRESH_FAILURE_BACKOFF_MINUTES) * 2 ** min(failures - 1, 20)
+        return min(delay, timedelta(hours=REFRESH_FAILURE_BACKOFF_MAX_HOURS))
+
+    def refresh(self, product):
+        """
+        Scrape, score and store again through the same path as
+        /analyze-product. Reviews already stored are kept and not rescored,
+        up to REFRESH_MAX_REVIEWS reviews in all; the oldest are dropped.
+        """
+        from scraper.scraper import get_reviews
+        from scraper.dedupe import dedupe_reviews
+        from scraper.fetch_scheduler import PRIORITY_BACKGROUND
+        from sentiment.sentiment import summarize_reviews
+
+        product_id = str(product['_id'])
+        # Scraper log lines of this refresh share one id
+        set_request_id(f"refresh-{product_id}")
+        reviews, _, page_data = get_reviews(product['product_url'], max_reviews=REFRESH_MAX_REVIEWS, priority=PRIORITY_BACKGROUND)
+        # Never overwrite stored reviews with mock data
+        if page_data['extraction'] == 'mock':
+            raise Exception(f"No real reviews ({page_data.get('block_reason') or page_data.get('mock_reason')})")
+        new_reviews = dedupe_reviews(reviews, self.product_model.get_seen_review_hashes(product_id))
+
+        # Archived reviews are read back and become hot again with this update.
+        # Stored reviews are oldest first; new ones are appended after them
+        keep = max(0, REFRESH_MAX_REVIEWS - len(new_reviews))
+        previous_reviews = self.product_model.get_stored_reviews(product_id)
+        previous_reviews = previous_reviews[len(previous_reviews) - keep:] if keep else []
+        reviews_data = summarize_reviews(new_reviews, previous_reviews=previous_reviews)
+        reviews_data['rating'] = page_data.get('rating')
+        self.product_model.update_product_sentiment(product_id, reviews_data)
+        return len(new_reviews)
+
+    def run_once(self):
+        from scraper.circuit_breaker import circuit_breaker
+
+        queue = self.queue()
+        for product in queue:
+            if self.budget_remaining() <= 0:
+                break
+            # Don't spend budget on sites that are currently blocking us
+            if circuit_breaker.retry_after(product['product_url']) > 0:
+                continue
+            self.scrape_times.append(time.time())
+            self.in_progress = {'product_id': str(product['_id']), 'product_url': product['product_url'], 'started_at': datetime.utcnow()}
+            self.save_state(queue)
+            try:
+                added = self.refresh(product)
+                self.refreshed_total += 1
+                self.last_result = dict(self.in_progress, finished_at=datetime.utcnow(), new_reviews=added, status='ok')
+                logger.info("Refreshed %s (+%d new reviews)", product['product_url'], added)
+            except Exception as e:
+                self.failed_total += 1
+                self.last_result = dict(self.in_progress, finished_at=datetime.utcnow(), status='failed', error=str(e))
+                # Back off so failing products don't use up the budget on every pass
+                failures = product.get('refresh_failures', 0) + 1
+                self.product_model.record_refresh_failure(str(product['_id']), datetime.utcnow() + self.failure_backoff(failures), str(e))
+                logger.warning("Refresh failed for %s: %s", product['product_url'], e)
+            self.in_progress = None
+        self.save_state(self.queue())
+
+    def save_state(self, queue):
+        self.state_collection.replace_one({'_id': STATE_ID}, {
+            '_id': STATE_ID,
+            'budget_per_hour': self.budget_per_hour,
+            'budget_remaining': self.budget_remaining(),
+            'scrape_times': list(self.scrape_times),
+            'max_age_hours': self.max_age.total_seconds() / 3600,
+            'in_progress': self.in_progress,
+            'last_result': self.last_result,
+            'refreshed_total': self.refreshed_total,
+            'failed_total': self.failed_total,
+            'queue': [
+                {
+                    'product_id': str(product['_id']),
+                    'product_url': product['product_url'],
+                    'requests_since_refresh': product.get('requests_since_refresh', 0),
+                    'refresh_failures': product.get('refresh_failures', 0),
+                    'age_hours': product['age_hours'],
+                    'score': product['score']
+                }
+                for product in queue
+            ],
+            'updated_at': datetime.utcnow()
+        }, upsert=True)
+
+    def run_forever(self, interval=REFRESH_INTERVAL):
+        print(f"🔄 Refresh scheduler running (budget {self.budget_per_hour}/hour, stale after {self.max_age})")
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.exception("Refresh pass failed: %s", e)
+            time.sleep(interval)
+
+def main():
+    configure_logging()
+    if not db_connection.connect():
+        print("❌ Database is NOT connected")
+        return False
+
+    from database.models import product_model
+    scheduler = RefreshScheduler(product_model, db_connection.get_collection('refresh_state'))
+    scheduler.run_forever()
+
+if __name__ == "__main__":
+    main()
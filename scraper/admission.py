@@ -0,0 +1,162 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager, asynccontextmanager
+
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Scrapes (fetch, browser fallback and scoring) run at once per process
+ADMISSION_MAX_SCRAPES = int(os.getenv('ADMISSION_MAX_SCRAPES', '4'))
+# Requests that may wait for a scrape slot; more are rejected at once
+ADMISSION_QUEUE_SIZE = int(os.getenv('ADMISSION_QUEUE_SIZE', '16'))
+# Seconds a request may wait for a slot before it is rejected
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT_SECONDS', '30'))
+
+# Retry-After bounds, in seconds
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 300
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Too many analyses in progress ({reason}); retry in {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Admission control for expensive requests. At most max_active run at
+    once; up to queue_size more wait in FIFO order for queue_timeout
+    seconds. A request arriving to a full queue, or still waiting at its
+    deadline, gets AdmissionRejected with a Retry-After estimate from the
+    recent run times, instead of piling up more Chrome instances.
+
+    Works from threads (admit) and from asyncio (async_admit); both share
+    the same slots.
+    """
+    def __init__(self, max_active=ADMISSION_MAX_SCRAPES, queue_size=ADMISSION_QUEUE_SIZE, queue_timeout=ADMISSION_QUEUE_TIMEOUT):
+        self.max_active = max_active
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = deque()
+        self.average_seconds = 10.0   # moving average of run times
+        self.admitted_total = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self._lock = threading.Lock()
+
+    def retry_after(self):
+        """
+        Seconds until a new request would likely be admitted.
+        """
+        backlog = len(self.waiting) + 1
+        estimate = self.average_seconds * backlog / max(self.max_active, 1)
+        return int(min(MAX_RETRY_AFTER, max(MIN_RETRY_AFTER, math.ceil(estimate))))
+
+    def _enter(self):
+        """
+        None when admitted at once, else a Future granted when a slot frees.
+        """
+        with self._lock:
+            if self.active < self.max_active:
+                self.active += 1
+                self.admitted_total += 1
+                return None
+            if len(self.waiting) >= self.queue_size:
+                self.rejected_full += 1
+                raise AdmissionRejected("queue full", self.retry_after())
+            future = Future()
+            self.waiting.append(future)
+            return future
+
+    def _give_up(self, future):
+        """
+        Called when a waiter hits its deadline.
+        """
+        with self._lock:
+            if future.cancel():
+                try:
+                    self.waiting.remove(future)
+                except ValueError:
+                    pass
+                self.rejected_timeout += 1
+                return AdmissionRejected("queue timeout", self.retry_after())
+        # Granted just as the wait timed out: hand the slot on
+        self._release(None)
+        with self._lock:
+            self.rejected_timeout += 1
+            return AdmissionRejected("queue timeout", self.retry_after())
+
+    def _release(self, seconds):
+        with self._lock:
+            if seconds is not None:
+                self.average_seconds = 0.8 * self.average_seconds + 0.2 * seconds
+            while self.waiting:
+                future = self.waiting.popleft()
+                if future.set_running_or_notify_cancel():
+                    # The slot passes to the waiter; active is unchanged
+                    self.admitted_total += 1
+                    future.set_result(True)
+                    return
+            self.active -= 1
+
+    @contextmanager
+    def admit(self):
+        """
+        Blocking context manager holding a slot; raises AdmissionRejected.
+        """
+        future = self._enter()
+        if future is not None:
+            try:
+                future.result(self.queue_timeout)
+            except TimeoutError:
+                raise self._give_up(future) from None
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - start)
+
+    @asynccontextmanager
+    async def async_admit(self):
+        """
+        asyncio version of admit(); waiting yields to the event loop.
+        """
+        future = self._enter()
+        if future is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise self._give_up(future) from None
+            except asyncio.CancelledError:
+                # Client went away while queued
+                self._give_up(future)
+                raise
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - start)
+
+    def state(self):
+        with self._lock:
+            return {
+                "active": self.active,
+                "max_active": self.max_active,
+                "waiting": len(self.waiting),
+                "queue_size": self.queue_size,
+                "queue_timeout_seconds": self.queue_timeout,
+                "average_seconds": round(self.average_seconds, 1),
+                "retry_after": self.retry_after(),
+                "admitted_total": self.admitted_total,
+                "rejected_full": self.rejected_full,
+                "rejected_timeout": self.rejected_timeout
+            }
+
+scrape_admission = AdmissionController()
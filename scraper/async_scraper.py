@@ -0,0 +1,108 @@
+import asyncio
+import contextvars
+import os
+import random
+import httpx
+from bs4 import BeautifulSoup
+from scraper.scraper import extract_product_page, get_reviews, mock_result
+from scraper.block_detection import detect_block
+from scraper.circuit_breaker import circuit_breaker, CircuitOpen
+from scraper.fetch_scheduler import fetch_scheduler, FetchQueueTimeout, PRIORITY_INTERACTIVE
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Fetch timeout for the plain-HTTP fast path (seconds)
+FETCH_TIMEOUT = float(os.getenv('ASYNC_FETCH_TIMEOUT', '15'))
+
+# Selenium scrapes that cannot run on the event loop are limited to this many threads
+BROWSER_THREADS = int(os.getenv('BROWSER_THREADS', '4'))
+
+user_agents = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+]
+
+_client = None
+_browser_slots = None
+
+def get_client():
+    """
+    Shared AsyncClient so connections are pooled across requests
+    """
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=FETCH_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=500, max_keepalive_connections=100)
+        )
+    return _client
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def fetch_page(product_url, priority=PRIORITY_INTERACTIVE):
+    """
+    Download a product page without a browser. Returns (status, HTML), or
+    (None, None) when the request failed.
+    """
+    try:
+        async with fetch_scheduler.async_slot(product_url, priority):
+            response = await get_client().get(product_url, headers={
+                "User-Agent": random.choice(user_agents),
+                "Accept-Language": "en-US,en;q=0.9"
+            })
+        if response.status_code != 200:
+            logger.info("Async fetch returned status %d for %s", response.status_code, product_url,
+                        extra={"url": product_url, "status": response.status_code})
+        return response.status_code, response.text
+    except (httpx.HTTPError, FetchQueueTimeout) as e:
+        logger.warning("Async fetch failed: %s", e, extra={"url": product_url})
+        return None, None
+
+async def get_reviews_async(product_url, max_reviews=20, executor=None, priority=PRIORITY_INTERACTIVE):
+    """
+    Async version of get_reviews. Tries a plain HTTP fetch first and only
+    falls back to the Selenium scraper (in a thread) when the static page
+    has no reviews, e.g. because they are rendered by JavaScript. A block
+    page or an open circuit breaker returns mock data without starting a
+    browser.
+    """
+    global _browser_slots
+    try:
+        circuit_breaker.before_fetch(product_url)
+    except CircuitOpen as e:
+        logger.warning("%s, using mock data", e, extra={"url": product_url, "retry_after": round(e.retry_after)})
+        return mock_result(product_url, max_reviews, "circuit-open", retry_after=round(e.retry_after))
+
+    status, html = await fetch_page(product_url, priority)
+    block_reason = detect_block(html)
+    if block_reason:
+        circuit_breaker.record_block(product_url, block_reason)
+        logger.warning("Blocked by the site (%s), using mock data", block_reason,
+                       extra={"url": product_url, "block_reason": block_reason, "status": status})
+        return mock_result(product_url, max_reviews, "blocked", block_reason=block_reason)
+    if status == 200:
+        circuit_breaker.record_success(product_url)
+        soup = BeautifulSoup(html, "html.parser")
+        reviews, product_name, page_data = extract_product_page(soup, product_url, max_reviews)
+        if reviews:
+            return reviews, product_name, page_data
+    else:
+        # Leave a half-open breaker's trial to the browser fallback
+        circuit_breaker.release(product_url)
+
+    # Fallback: the blocking browser scrape, bounded so a burst of requests
+    # cannot start an unbounded number of Chrome instances
+    if _browser_slots is None:
+        _browser_slots = asyncio.Semaphore(BROWSER_THREADS)
+    async with _browser_slots:
+        loop = asyncio.get_running_loop()
+        # Run in a copy of this context so the scrape logs under the request id
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(executor, context.run, get_reviews, product_url, max_reviews, priority)
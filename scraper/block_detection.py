@@ -0,0 +1,29 @@
+import re
+
+# (reason, pattern) checked against the lowercased start of the page
+BLOCK_MARKERS = [
+    ("amazon-captcha", re.compile(r'/errors/validatecaptcha|enter the characters you see below|<title[^>]*>\s*robot check')),
+    ("amazon-503", re.compile(r'to discuss automated access to amazon data')),
+    ("cloudflare", re.compile(r'<title[^>]*>\s*(just a moment\.\.\.|attention required! \| cloudflare)|cf-browser-verification|challenges\.cloudflare\.com/turnstile')),
+    ("akamai", re.compile(r'<title[^>]*>\s*access denied\s*</title>.*you don.t have permission to access', re.S)),
+    ("perimeterx", re.compile(r'id="px-captcha"|<title[^>]*>\s*access to this page has been denied')),
+    ("datadome", re.compile(r'captcha-delivery\.com|geo\.captcha-delivery')),
+    ("recaptcha", re.compile(r'<title[^>]*>[^<]*(captcha|are you a robot|verify you are human)')),
+    ("rate-limited", re.compile(r'<title[^>]*>[^<]*(too many requests|rate limit)')),
+]
+
+# Block pages are small; product pages with reviews are not
+SCAN_CHARS = 60000
+
+def detect_block(html):
+    """
+    Reason string when the page is a CAPTCHA, bot challenge or access
+    denied page instead of the product, else None. Cheap enough to run on
+    every page before any scrolling or selector work. The HTTP status is
+    not used: a 403 to a plain HTTP client may still work in the browser.
+    """
+    head = (html or "")[:SCAN_CHARS].lower()
+    for reason, pattern in BLOCK_MARKERS:
+        if pattern.search(head):
+            return reason
+    return None
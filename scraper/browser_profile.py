@@ -0,0 +1,168 @@
+import os
+import random
+
+from selenium.webdriver.chrome.options import Options
+
+from scraper.fetch_scheduler import fetch_domain
+
+# Lean profile: no images, fonts, media or tracker scripts, DOMContentLoaded
+# instead of the full load event. BROWSER_LEAN_PROFILE=false restores the
+# plain headless profile.
+LEAN_PROFILE = os.getenv('BROWSER_LEAN_PROFILE', 'true').lower() == 'true'
+PAGE_LOAD_STRATEGY = os.getenv('BROWSER_PAGE_LOAD_STRATEGY', 'eager')
+# Extra URL patterns to block, comma separated ("*" wildcards)
+EXTRA_BLOCKED_URLS = os.getenv('BROWSER_BLOCKED_URLS', '')
+# Blocked patterns a site still needs, e.g.
+# "example.com=*bazaarvoice.com*|*.woff2,shop.example.org=*cdn.shop.net*"
+SCRIPT_ALLOWLIST = os.getenv('BROWSER_SCRIPT_ALLOWLIST', '')
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+]
+
+# Resource types reviews never depend on, by file extension
+BLOCKED_RESOURCES = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.m3u8", "*.mp3", "*.ogg"
+]
+
+# Analytics, ads, tag managers, session replay, chat and social widgets
+BLOCKED_THIRD_PARTY = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*googlesyndication.com*",
+    "*googleadservices.com*", "*doubleclick.net*", "*adservice.google.*",
+    "*amazon-adsystem.com*", "*facebook.net*", "*connect.facebook.com*",
+    "*criteo.com*", "*criteo.net*", "*taboola.com*", "*outbrain.com*",
+    "*scorecardresearch.com*", "*quantserve.com*", "*hotjar.com*", "*clarity.ms*",
+    "*mouseflow.com*", "*fullstory.com*", "*newrelic.com*", "*nr-data.net*",
+    "*optimizely.com*", "*segment.com*", "*segment.io*", "*mixpanel.com*",
+    "*branch.io*", "*moengage.com*", "*clevertap*", "*webengage.com*",
+    "*intercom.io*", "*zopim.com*", "*tawk.to*", "*twitter.com/widgets*",
+    "*platform.twitter.com*", "*linkedin.com/px*", "*snap.licdn.com*",
+    "*pinterest.com/ct*", "*tiktok.com/i18n/pixel*", "*bat.bing.com*"
+]
+
+# Chrome features that fetch or run things in the background
+LEAN_ARGUMENTS = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-domain-reliability",
+    "--disable-client-side-phishing-detection",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,InterestFeedContentSuggestions",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--mute-audio",
+    "--blink-settings=imagesEnabled=false"
+]
+
+LEAN_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.default_content_setting_values.notifications": 2,
+    "profile.default_content_setting_values.geolocation": 2,
+    "profile.default_content_setting_values.media_stream": 2
+}
+
+def parse_allowlist(spec):
+    """
+    Per-domain allowlist from BROWSER_SCRIPT_ALLOWLIST, e.g.
+    "example.com=*bazaarvoice.com*|*.woff2" -> {"example.com": [...]}.
+    """
+    allowlist = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        domain, patterns = item.split("=", 1)
+        allowlist.setdefault(domain.strip().lower(), []).extend(
+            p.strip() for p in patterns.split("|") if p.strip()
+        )
+    return allowlist
+
+_allowlist = parse_allowlist(SCRIPT_ALLOWLIST)
+_extra_blocked = [p.strip() for p in EXTRA_BLOCKED_URLS.split(",") if p.strip()]
+
+def allowed_patterns(url, allowlist=None):
+    """
+    Allowlisted patterns for the site of url (also matches subdomains of a
+    listed domain).
+    """
+    allowlist = _allowlist if allowlist is None else allowlist
+    domain = fetch_domain(url)
+    return [
+        pattern for listed, patterns in allowlist.items()
+        if domain == listed or domain.endswith("." + listed)
+        for pattern in patterns
+    ]
+
+def blocked_urls(url, allowlist=None):
+    """
+    URL patterns to block while scraping url. A block pattern is dropped
+    when an allowlisted pattern for the site equals it or names a host it
+    covers (e.g. "*bazaarvoice.com*" keeps that vendor's scripts).
+    """
+    allowed = [p.strip("*") for p in allowed_patterns(url, allowlist)]
+    patterns = BLOCKED_RESOURCES + BLOCKED_THIRD_PARTY + _extra_blocked
+    return [
+        pattern for pattern in patterns
+        if not any(a and (a == pattern.strip("*") or a in pattern) for a in allowed)
+    ]
+
+def chrome_options(lean=LEAN_PROFILE):
+    """
+    Headless Chrome options with the anti-detection flags and, when lean,
+    the eager page load strategy and background features switched off.
+    """
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    options.add_argument(f"user-agent={random.choice(USER_AGENTS)}")
+
+    if lean:
+        options.page_load_strategy = PAGE_LOAD_STRATEGY
+        for argument in LEAN_ARGUMENTS:
+            options.add_argument(argument)
+        options.add_experimental_option("prefs", LEAN_PREFS)
+    return options
+
+def block_requests(driver, url, lean=LEAN_PROFILE):
+    """
+    Blocks images, fonts, media and tracker URLs for this driver through
+    the DevTools protocol (minus the site's allowlist). Call before
+    driver.get(url).
+    """
+    if not lean:
+        return []
+    patterns = blocked_urls(url)
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    return patterns
+
+# Resource count, bytes transferred and timings from the Performance API
+_PAGE_METRICS_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0] || {};
+const resources = performance.getEntriesByType('resource');
+return {
+    resources: resources.length,
+    transfer_bytes: resources.reduce((sum, r) => sum + (r.transferSize || 0), nav.transferSize || 0),
+    dom_content_loaded_ms: Math.round(nav.domContentLoadedEventEnd || 0),
+    load_ms: Math.round(nav.loadEventEnd || 0),
+    js_heap_bytes: (performance.memory || {}).usedJSHeapSize || 0
+};
+"""
+
+def page_metrics(driver):
+    """
+    What the page cost to load, for the scrape log line. Empty if the page
+    does not allow it.
+    """
+    try:
+        return driver.execute_script(_PAGE_METRICS_SCRIPT) or {}
+    except Exception:
+        return {}
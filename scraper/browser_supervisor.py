@@ -0,0 +1,355 @@
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Per-scrape budgets: wall time from launch, and RSS of the chromedriver +
+# Chrome process tree. A session over budget is killed by the supervisor.
+SCRAPE_TIME_BUDGET_SECONDS = float(os.getenv('SCRAPE_TIME_BUDGET_SECONDS', '120'))
+SCRAPE_MEMORY_BUDGET_MB = float(os.getenv('SCRAPE_MEMORY_BUDGET_MB', '768'))
+# Seconds between supervisor sweeps (budgets and orphaned processes)
+SUPERVISOR_INTERVAL = float(os.getenv('BROWSER_SUPERVISOR_INTERVAL', '5'))
+
+# Process names (/proc/<pid>/comm) of the browser and its driver
+BROWSER_PROCESS_NAMES = ("chromedriver", "chrome", "chromium", "chromium-browse", "google-chrome", "chrome_crashpad")
+
+PROC_AVAILABLE = os.path.isdir("/proc/self")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+MB = 1024 * 1024
+
+class ScrapeBudgetExceeded(Exception):
+    pass
+
+# /proc helpers (Linux). Elsewhere they report nothing and the supervisor
+# only runs the budget timer.
+
+def process_table():
+    """
+    {pid: (ppid, name)} for all live processes of this user.
+    """
+    table = {}
+    if not PROC_AVAILABLE:
+        return table
+    uid = os.getuid()
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            if os.stat(f"/proc/{entry}").st_uid != uid:
+                continue
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The name is in parentheses and may itself contain spaces
+        name = stat[stat.index("(") + 1:stat.rindex(")")]
+        state, ppid = stat[stat.rindex(")") + 2:].split()[:2]
+        # Zombies hold no memory and cannot be killed, only waited for
+        if state != "Z":
+            table[int(entry)] = (int(ppid), name)
+    return table
+
+def descendants(pid, table):
+    children = {}
+    for child, (ppid, _) in table.items():
+        children.setdefault(ppid, []).append(child)
+    found, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+def rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def tree_rss(pid, table=None):
+    """
+    RSS of pid and all its descendants, in bytes.
+    """
+    if not pid or not PROC_AVAILABLE:
+        return 0
+    table = process_table() if table is None else table
+    return sum(rss_bytes(p) for p in [pid] + descendants(pid, table))
+
+def kill_tree(pid, table=None):
+    """
+    SIGKILLs pid and its descendants (collected first, since children are
+    reparented once their parent dies). Returns the number signalled.
+    """
+    table = process_table() if table is None else table
+    killed = 0
+    for target in reversed([pid] + descendants(pid, table)):
+        try:
+            os.kill(target, signal.SIGKILL)
+            killed += 1
+        except (ProcessLookupError, PermissionError):
+            pass
+    return killed
+
+def process_name(pid):
+    try:
+        with open(f"/proc/{pid}/comm") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def is_automation_process(pid, name):
+    """
+    chromedriver, or a headless Chrome: never a person's desktop browser.
+    """
+    if name == "chromedriver":
+        return True
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return b"--headless" in f.read()
+    except OSError:
+        return False
+
+def kill_browser_processes(pids):
+    """
+    SIGKILLs those of pids that are still running browser processes (a
+    pid may have been reused since it was collected).
+    """
+    killed = 0
+    for pid in pids:
+        if process_name(pid) in BROWSER_PROCESS_NAMES:
+            try:
+                os.kill(pid, signal.SIGKILL)
+                killed += 1
+            except (ProcessLookupError, PermissionError):
+                pass
+    return killed
+
+class BrowserSession:
+    """
+    One Selenium scrape: the driver, its process tree and its budgets.
+    Call stage(name) after each step to record RSS and check the budgets.
+    """
+    def __init__(self, driver, url, time_budget, memory_budget_mb):
+        self.driver = driver
+        self.url = url
+        self.pid = getattr(getattr(getattr(driver, "service", None), "process", None), "pid", None)
+        self.started = time.monotonic()
+        self.deadline = self.started + time_budget
+        self.memory_budget = memory_budget_mb * MB
+        self.stages = []
+        self.peak_rss = 0
+        self.killed_reason = None
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def browser_rss(self):
+        return tree_rss(self.pid)
+
+    def over_budget(self, browser_rss=None):
+        """
+        Why the session is over budget, or None.
+        """
+        if time.monotonic() > self.deadline:
+            return f"time budget of {self.deadline - self.started:.0f}s exceeded"
+        browser_rss = self.browser_rss() if browser_rss is None else browser_rss
+        if self.memory_budget and browser_rss > self.memory_budget:
+            return f"browser RSS {browser_rss / MB:.0f}MB over budget of {self.memory_budget / MB:.0f}MB"
+        return None
+
+    def stage(self, name):
+        browser_rss = self.browser_rss()
+        self.peak_rss = max(self.peak_rss, browser_rss)
+        self.stages.append({
+            "stage": name,
+            "elapsed_ms": round(self.elapsed() * 1000),
+            "browser_rss_mb": round(browser_rss / MB, 1),
+            "process_rss_mb": round(rss_bytes(os.getpid()) / MB, 1)
+        })
+        reason = self.killed_reason or self.over_budget(browser_rss)
+        if reason:
+            raise ScrapeBudgetExceeded(reason)
+
+class BrowserSupervisor:
+    """
+    Tracks live browser sessions and, from a background thread, kills
+    sessions over their time or memory budget (a hung driver call cannot
+    check its own budget) and reaps orphaned chromedriver/Chrome
+    processes left by sessions that were never quit.
+
+    A chromedriver or headless Chrome is an orphan when its parent is init
+    or this process (which, as PID 1 in a container, is where orphans are
+    reparented) and it does not belong to a live session. It is killed
+    once it has been seen as an orphan in two sweeps in a row, and never
+    while a driver of this process is starting.
+    """
+    def __init__(self, interval=SUPERVISOR_INTERVAL):
+        self.interval = interval
+        self.sessions = {}
+        self.starting = 0
+        self.suspects = set()
+        self.killed_pids = set()
+        self.reaped_total = 0
+        self.killed_total = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="browser-supervisor", daemon=True)
+            self._thread.start()
+
+    def register(self, session):
+        with self._lock:
+            self.sessions[id(session)] = session
+        if self._thread is None:
+            self.start()
+
+    @contextmanager
+    def launching(self):
+        """
+        Marks a driver start, whose processes are not in a session yet.
+        """
+        with self._lock:
+            self.starting += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.starting -= 1
+
+    def unregister(self, session):
+        with self._lock:
+            self.sessions.pop(id(session), None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.warning("Browser supervisor sweep failed: %s", e)
+
+    def sweep(self):
+        table = process_table()
+        with self._lock:
+            sessions = list(self.sessions.values())
+
+        for session in sessions:
+            if session.killed_reason:
+                continue
+            reason = session.over_budget(tree_rss(session.pid, table))
+            if reason:
+                session.killed_reason = reason
+                self.killed_total += 1
+                logger.warning("Killing browser session: %s", reason, extra={"url": session.url, "pid": session.pid})
+                if session.pid:
+                    kill_tree(session.pid, table)
+
+        return self.reap_orphans(table, sessions)
+
+    def reap_orphans(self, table, sessions=()):
+        owned = set()
+        for session in sessions:
+            if session.pid:
+                owned.add(session.pid)
+                owned.update(descendants(session.pid, table))
+        me = os.getpid()
+        parents = {1} if self.starting else {1, me}
+        orphans = {
+            pid for pid, (ppid, name) in table.items()
+            if ppid in parents and name in BROWSER_PROCESS_NAMES and pid not in owned
+            and is_automation_process(pid, name)
+        }
+        confirmed, self.suspects = orphans & self.suspects, orphans - self.suspects
+        reaped = 0
+        for pid in confirmed:
+            tree = [pid] + descendants(pid, table)
+            reaped += kill_tree(pid, table)
+            self.killed_pids.update(tree)
+        self._collect()
+        if reaped:
+            self.reaped_total += reaped
+            logger.warning("Reaped %d orphaned browser processes", reaped, extra={"pids": sorted(confirmed)})
+        return reaped
+
+    def _collect(self):
+        # Killed processes that are our children (or, as PID 1, anyone's)
+        # stay zombies until waited for
+        for pid in list(self.killed_pids):
+            try:
+                if os.waitpid(pid, os.WNOHANG)[0] == 0:
+                    continue
+            except ChildProcessError:
+                pass
+            self.killed_pids.discard(pid)
+
+    def state(self):
+        with self._lock:
+            sessions = list(self.sessions.values())
+        return {
+            "active_sessions": [
+                {
+                    "url": session.url,
+                    "pid": session.pid,
+                    "elapsed_seconds": round(session.elapsed(), 1),
+                    "browser_rss_mb": round(session.browser_rss() / MB, 1)
+                }
+                for session in sessions
+            ],
+            "time_budget_seconds": SCRAPE_TIME_BUDGET_SECONDS,
+            "memory_budget_mb": SCRAPE_MEMORY_BUDGET_MB,
+            "killed_total": self.killed_total,
+            "reaped_total": self.reaped_total
+        }
+
+browser_supervisor = BrowserSupervisor()
+
+@contextmanager
+def browser_session(create_driver, url, time_budget=SCRAPE_TIME_BUDGET_SECONDS, memory_budget_mb=SCRAPE_MEMORY_BUDGET_MB):
+    """
+    Runs create_driver() and yields a BrowserSession that is always torn
+    down: driver.quit(), then a kill of whatever is left of its process
+    tree. If the supervisor killed the session, the error raised by the
+    interrupted driver call becomes ScrapeBudgetExceeded.
+    """
+    with browser_supervisor.launching():
+        driver = create_driver()
+    session = BrowserSession(driver, url, time_budget, memory_budget_mb)
+    browser_supervisor.register(session)
+    try:
+        session.stage("launch")
+        yield session
+    except ScrapeBudgetExceeded:
+        raise
+    except Exception as e:
+        if session.killed_reason:
+            raise ScrapeBudgetExceeded(session.killed_reason) from e
+        raise
+    finally:
+        browser_supervisor.unregister(session)
+        # Collect the tree first: after quit() the survivors are reparented
+        tree = [session.pid] + descendants(session.pid, process_table()) if session.pid else []
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning("driver.quit() failed: %s", e, extra={"url": url})
+        if tree:
+            leftover = kill_browser_processes(tree)
+            if leftover:
+                logger.info("Killed %d browser processes left after quit", leftover, extra={"url": url})
+        logger.info("Browser session finished", extra={
+            "url": url,
+            "elapsed_ms": round(session.elapsed() * 1000),
+            "peak_browser_rss_mb": round(session.peak_rss / MB, 1),
+            "stages": session.stages,
+            "killed_reason": session.killed_reason
+        })
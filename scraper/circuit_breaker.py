@@ -0,0 +1,133 @@
+import os
+import random
+import threading
+import time
+
+from scraper.fetch_scheduler import fetch_domain
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Block pages in a row that open a domain's breaker
+BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', '1'))
+# First open period, doubled each time the domain blocks us again, up to the max
+BREAKER_BASE_SECONDS = float(os.getenv('BREAKER_BASE_SECONDS', '60'))
+BREAKER_MAX_SECONDS = float(os.getenv('BREAKER_MAX_SECONDS', '3600'))
+
+class CircuitOpen(Exception):
+    def __init__(self, domain, retry_after):
+        super().__init__(f"Scraping {domain} is paused for {retry_after:.0f}s after block pages")
+        self.domain = domain
+        self.retry_after = retry_after
+
+class DomainBreaker:
+    def __init__(self):
+        self.failures = 0      # block pages in a row
+        self.trips = 0         # times opened without a success in between
+        self.open_until = 0.0
+        self.probing = False   # a half-open trial request is running
+        self.last_reason = None
+
+class CircuitBreaker:
+    """
+    Per-domain circuit breaker for scraping.
+
+    A block page (CAPTCHA, bot challenge) counts against its domain; after
+    BREAKER_THRESHOLD in a row the breaker opens and fetches for that
+    domain fail fast. The open period doubles with every trip (with
+    jitter). When it ends, one trial fetch is let through: a normal page
+    closes the breaker, another block page opens it again for longer.
+    """
+    def __init__(self, threshold=BREAKER_THRESHOLD, base_seconds=BREAKER_BASE_SECONDS, max_seconds=BREAKER_MAX_SECONDS):
+        self.threshold = threshold
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.domains = {}
+        self._lock = threading.Lock()
+
+    def _breaker(self, domain):
+        breaker = self.domains.get(domain)
+        if breaker is None:
+            breaker = self.domains[domain] = DomainBreaker()
+        return breaker
+
+    def retry_after(self, url):
+        """
+        Seconds until url's domain may be fetched again; 0 if it may now.
+        """
+        with self._lock:
+            breaker = self.domains.get(fetch_domain(url))
+            if breaker is None:
+                return 0.0
+            remaining = breaker.open_until - time.monotonic()
+            if remaining > 0:
+                return remaining
+            # Half-open: only one trial at a time
+            return self.base_seconds if breaker.probing else 0.0
+
+    def before_fetch(self, url):
+        """
+        Raises CircuitOpen while the domain's breaker is open; otherwise
+        registers the fetch (as the trial fetch if half-open).
+        """
+        domain = fetch_domain(url)
+        with self._lock:
+            breaker = self.domains.get(domain)
+            if breaker is None or breaker.trips == 0:
+                return
+            remaining = breaker.open_until - time.monotonic()
+            if remaining > 0 or breaker.probing:
+                raise CircuitOpen(domain, max(remaining, 1.0))
+            breaker.probing = True
+
+    def record_block(self, url, reason):
+        domain = fetch_domain(url)
+        with self._lock:
+            breaker = self._breaker(domain)
+            breaker.failures += 1
+            breaker.probing = False
+            breaker.last_reason = reason
+            if breaker.failures < self.threshold and breaker.trips == 0:
+                return
+            breaker.trips += 1
+            delay = min(self.max_seconds, self.base_seconds * 2 ** (breaker.trips - 1))
+            delay *= random.uniform(0.8, 1.2)
+            breaker.open_until = time.monotonic() + delay
+        logger.warning("Circuit opened for %s (%s) for %.0fs", domain, reason, delay,
+                       extra={"domain": domain, "reason": reason, "open_seconds": round(delay), "trips": breaker.trips})
+
+    def record_success(self, url):
+        domain = fetch_domain(url)
+        with self._lock:
+            breaker = self.domains.get(domain)
+            if breaker is None:
+                return
+            was_open = breaker.trips > 0
+            self.domains.pop(domain)
+        if was_open:
+            logger.info("Circuit closed for %s", domain, extra={"domain": domain})
+
+    def release(self, url):
+        """
+        Ends a trial fetch that produced no verdict (e.g. a network error).
+        """
+        with self._lock:
+            breaker = self.domains.get(fetch_domain(url))
+            if breaker is not None:
+                breaker.probing = False
+
+    def state(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                domain: {
+                    "state": "open" if breaker.open_until > now else ("half-open" if breaker.trips else "closed"),
+                    "retry_after": round(max(0.0, breaker.open_until - now), 1),
+                    "consecutive_blocks": breaker.failures,
+                    "trips": breaker.trips,
+                    "last_reason": breaker.last_reason
+                }
+                for domain, breaker in self.domains.items()
+            }
+
+circuit_breaker = CircuitBreaker()
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import re
+import numpy as np
+from sentiment.review_batch import ReviewBatch
+
+# Reviews whose estimated Jaccard similarity reaches this are near-duplicates
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv('DEDUPE_SIMILARITY_THRESHOLD', '0.7'))
+# A text is a container (a parent element matched with its review children)
+# only when kept reviews inside it make up at least this share of its text
+CONTAINMENT_MIN_COVERAGE = float(os.getenv('DEDUPE_CONTAINMENT_COVERAGE', '0.8'))
+
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+
+# Universal hashing mod a 31-bit prime keeps (a * h + b) inside uint64
+_MERSENNE_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, _MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.int64).astype(np.uint64)
+_PERM_B = _rng.randint(0, _MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.int64).astype(np.uint64)
+
+def normalize_text(text):
+    """
+    Lowercase and strip punctuation/whitespace differences so trivially
+    different copies of a review compare equal.
+    """
+    return ' '.join(re.sub(r'[^\w\s]', ' ', text.lower()).split())
+
+def review_hash(text):
+    """
+    Short stable fingerprint of a review, persisted per product so
+    re-scrapes can skip reviews already stored.
+    """
+    return hashlib.blake2b(normalize_text(text).encode('utf-8'), digest_size=8).hexdigest()
+
+def minhash_signature(normalized):
+    words = normalized.split()
+    if len(words) < SHINGLE_SIZE:
+        shingles = {normalized}
+    else:
+        shingles = {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little') % _MERSENNE_PRIME for s in shingles),
+        dtype=np.uint64, count=len(shingles)
+    )
+    # All permutations at once: (a * h + b) mod p, minimum per permutation
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % np.uint64(_MERSENNE_PRIME)
+    return permuted.min(axis=0)
+
+def is_container(normalized, kept_texts):
+    """
+    True when whole-word occurrences of kept texts cover at least
+    CONTAINMENT_MIN_COVERAGE of normalized.
+    """
+    padded = f" {normalized} "
+    covered = sum(len(text) for text in kept_texts if f" {text} " in padded)
+    return covered >= CONTAINMENT_MIN_COVERAGE * len(normalized)
+
+def dedupe_reviews(reviews, seen_hashes=None):
+    """
+    Drop duplicate reviews before they are scored and stored:
+    - exact duplicates (same normalized text) and reviews in seen_hashes,
+    - containers made up mostly of already kept reviews (the parent
+      elements matched together with their children); a longer review
+      that merely quotes a short one is kept,
+    - near-duplicates found with MinHash over word shingles (LSH banding
+      keeps this roughly linear in the number of reviews).
+    Accepts a ReviewBatch or a list of review dicts and returns the same
+    kind. Order of first occurrence is preserved.
+    """
+    if isinstance(reviews, ReviewBatch):
+        return reviews.take(unique_indices(reviews.texts, seen_hashes))
+    return [reviews[i] for i in unique_indices([r["text"] for r in reviews], seen_hashes)]
+
+def unique_indices(texts, seen_hashes=None):
+    seen = set(seen_hashes or ())
+    candidates = []
+    for index, text in enumerate(texts):
+        normalized = normalize_text(text)
+        if not normalized:
+            continue
+        digest = review_hash(text)
+        if digest in seen:
+            continue
+        seen.add(digest)
+        candidates.append((index, normalized))
+
+    # Shortest first, so a parent is always compared against its children
+    kept_texts = []
+    contained = set()
+    for index, normalized in sorted(candidates, key=lambda c: len(c[1])):
+        if is_container(normalized, kept_texts):
+            contained.add(index)
+        else:
+            kept_texts.append(normalized)
+
+    unique = []
+    buckets = {}
+    signatures = []
+    for index, normalized in candidates:
+        if index in contained:
+            continue
+        signature = minhash_signature(normalized)
+        duplicate = False
+        band_keys = [(band, signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes()) for band in range(LSH_BANDS)]
+        for key in band_keys:
+            for other in buckets.get(key, ()):
+                if np.mean(signatures[other] == signature) >= NEAR_DUPLICATE_THRESHOLD:
+                    duplicate = True
+                    break
+            if duplicate:
+                break
+        if duplicate:
+            continue
+        for key in band_keys:
+            buckets.setdefault(key, []).append(len(signatures))
+        signatures.append(signature)
+        unique.append(index)
+
+    return unique
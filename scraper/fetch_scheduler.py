@@ -0,0 +1,219 @@
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager, asynccontextmanager
+from urllib.parse import urlparse
+
+# Defaults per domain: sustained requests/second, burst size, parallel fetches
+DEFAULT_RATE = float(os.getenv('FETCH_DOMAIN_RATE', '0.5'))
+DEFAULT_BURST = float(os.getenv('FETCH_DOMAIN_BURST', '2'))
+DEFAULT_CONCURRENCY = int(os.getenv('FETCH_DOMAIN_CONCURRENCY', '2'))
+# Fetches in flight across all domains
+MAX_CONCURRENCY = int(os.getenv('FETCH_MAX_CONCURRENCY', '16'))
+# Seconds a fetch may wait for a slot before giving up
+QUEUE_TIMEOUT = float(os.getenv('FETCH_QUEUE_TIMEOUT', '120'))
+
+# Priorities (lower runs first)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+class FetchQueueTimeout(Exception):
+    pass
+
+def fetch_domain(url):
+    netloc = urlparse(url).netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+def parse_domain_limits(spec):
+    """
+    Per-domain overrides from FETCH_DOMAIN_LIMITS, e.g.
+    "amazon.in=0.2:1:1,flipkart.com=1:3:2" (rate:burst:concurrency).
+    """
+    limits = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        domain, values = item.split("=", 1)
+        rate, burst, concurrency = (values.split(":") + ["", ""])[:3]
+        limits[domain.strip().lower()] = (
+            float(rate),
+            float(burst) if burst else DEFAULT_BURST,
+            int(concurrency) if concurrency else DEFAULT_CONCURRENCY
+        )
+    return limits
+
+class DomainState:
+    def __init__(self, rate, burst, concurrency):
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.tokens = burst
+        self.last_refill = time.monotonic()
+        self.active = 0
+        self.waiting = []  # heap of (priority, seq, future)
+        self.granted = 0
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def ready(self):
+        return self.active < self.concurrency and self.tokens >= 1
+
+    def seconds_until_token(self):
+        if self.tokens >= 1 or self.rate <= 0:
+            return None
+        return (1 - self.tokens) / self.rate
+
+class FetchScheduler:
+    """
+    Central politeness scheduler for outbound page fetches.
+
+    Each domain has a token bucket (rate, burst) and a concurrency cap, and
+    there is a global cap on fetches in flight. Callers ask for a slot and
+    are granted one in priority order among the domains that are currently
+    allowed to fetch, so a request waiting on a throttled domain never
+    holds up fetches to other domains.
+    """
+    def __init__(self, domain_limits=None, max_concurrency=MAX_CONCURRENCY):
+        self.domain_limits = domain_limits if domain_limits is not None else parse_domain_limits(os.getenv('FETCH_DOMAIN_LIMITS'))
+        self.max_concurrency = max_concurrency
+        self.domains = {}
+        self.active = 0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._dispatcher = None
+
+    def _domain(self, domain):
+        state = self.domains.get(domain)
+        if state is None:
+            rate, burst, concurrency = self.domain_limits.get(domain, (DEFAULT_RATE, DEFAULT_BURST, DEFAULT_CONCURRENCY))
+            state = DomainState(rate, burst, concurrency)
+            self.domains[domain] = state
+        return state
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name="fetch-scheduler", daemon=True)
+            self._dispatcher.start()
+
+    def request(self, url, priority=PRIORITY_INTERACTIVE):
+        """
+        Queue a request for a fetch slot. Returns a Future that resolves to
+        the domain once the slot is granted; the caller must release() it.
+        """
+        domain = fetch_domain(url)
+        future = Future()
+        with self._cond:
+            heapq.heappush(self._domain(domain).waiting, (priority, next(self._seq), future))
+            self._ensure_dispatcher()
+            self._cond.notify()
+        return future
+
+    def release(self, domain):
+        with self._cond:
+            self.active -= 1
+            self._domain(domain).active -= 1
+            self._cond.notify()
+
+    def _dispatch_loop(self):
+        with self._cond:
+            while True:
+                timeout = self._grant_ready()
+                self._cond.wait(timeout)
+
+    def _grant_ready(self):
+        """
+        Grant as many slots as the limits allow. Returns how long to sleep
+        before a throttled domain can be served again (None = until notified).
+        """
+        while self.active < self.max_concurrency:
+            now = time.monotonic()
+            best = None
+            for domain, state in self.domains.items():
+                # Drop requests whose callers stopped waiting
+                while state.waiting and state.waiting[0][2].cancelled():
+                    heapq.heappop(state.waiting)
+                if not state.waiting:
+                    continue
+                state.refill(now)
+                if state.ready() and (best is None or state.waiting[0][:2] < best[1].waiting[0][:2]):
+                    best = (domain, state)
+            if best is None:
+                break
+
+            domain, state = best
+            _, _, future = heapq.heappop(state.waiting)
+            if not future.set_running_or_notify_cancel():
+                continue
+            state.tokens -= 1
+            state.active += 1
+            state.granted += 1
+            self.active += 1
+            future.set_result(domain)
+
+        waits = [
+            state.seconds_until_token()
+            for state in self.domains.values()
+            if state.waiting and state.active < state.concurrency
+        ]
+        waits = [wait for wait in waits if wait is not None]
+        return min(waits) if waits else None
+
+    @contextmanager
+    def slot(self, url, priority=PRIORITY_INTERACTIVE, timeout=QUEUE_TIMEOUT):
+        """
+        Blocking context manager holding a fetch slot for url's domain.
+        """
+        future = self.request(url, priority)
+        try:
+            domain = future.result(timeout)
+        except TimeoutError:
+            if not future.cancel():
+                # Granted just as the wait timed out
+                self.release(future.result())
+            raise FetchQueueTimeout(f"No fetch slot for {fetch_domain(url)} within {timeout}s")
+        try:
+            yield domain
+        finally:
+            self.release(domain)
+
+    @asynccontextmanager
+    async def async_slot(self, url, priority=PRIORITY_INTERACTIVE, timeout=QUEUE_TIMEOUT):
+        """
+        asyncio version of slot(); waiting yields to the event loop.
+        """
+        future = self.request(url, priority)
+        try:
+            domain = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            if not future.cancel():
+                self.release(future.result())
+            raise FetchQueueTimeout(f"No fetch slot for {fetch_domain(url)} within {timeout}s")
+        try:
+            yield domain
+        finally:
+            self.release(domain)
+
+    def queue_state(self):
+        with self._cond:
+            return {
+                "active": self.active,
+                "max_concurrency": self.max_concurrency,
+                "domains": {
+                    domain: {
+                        "active": state.active,
+                        "waiting": sum(1 for entry in state.waiting if not entry[2].cancelled()),
+                        "granted": state.granted,
+                        "tokens": round(state.tokens, 2),
+                        "rate": state.rate,
+                        "burst": state.burst,
+                        "concurrency": state.concurrency
+                    }
+                    for domain, state in self.domains.items()
+                }
+            }
+
+fetch_scheduler = FetchScheduler()
@@ -1,5 +1,4 @@
 from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 from bs4 import BeautifulSoup
@@ -7,6 +6,17 @@ import time
 import random
 import re
 from urllib.parse import urlparse
+from scraper.dedupe import dedupe_reviews
+from scraper.structured_data import extract_structured_data
+from scraper.browser_profile import chrome_options, block_requests, page_metrics
+from scraper.block_detection import detect_block
+from scraper.circuit_breaker import circuit_breaker, CircuitOpen
+from scraper.browser_supervisor import browser_session, ScrapeBudgetExceeded
+from sentiment.review_batch import ReviewBatch
+from scraper.fetch_scheduler import fetch_scheduler, PRIORITY_INTERACTIVE
+from log_utils import get_logger
+
+logger = get_logger(__name__)
 
 def extract_product_name(soup, url):
     """
@@ -98,193 +108,313 @@ def clean_product_name(name):
     
     return name if name else "Unknown Product"
 
-def get_reviews(product_url, max_reviews=20):
+def extract_reviews(soup, max_reviews=20, generic=True):
     """
-    Attempts to scrape reviews and product name from a product URL.
-    If scraping fails, returns mock data for demonstration.
+    Extract review texts from a parsed product page using site selectors,
+    falling back to a generic text scan (unless generic is False).
+    Returns a ReviewBatch.
     """
-    print(f"Attempting to scrape reviews from: {product_url}")
+    reviews = []
+
+    # Enhanced selectors for multiple e-commerce sites
+    selectors = [
+        # Amazon
+        "span[data-hook='review-body']",
+        "div[data-hook='review-collapsed'] span",
+        "span.review-text-content span",
+        "div.review-text span",
+        "[data-hook='review-body'] span",
+        ".review-text",
+        ".a-size-base.review-text",
+        ".a-size-base.review-text-content",
+        # Flipkart
+        "div._1AtVbE div._27M-vq",
+        "div.t-ZTKy div",
+        "div.ZmyHeo div",
+        # Myntra
+        "div.user-review div.review-text",
+        "div[data-automationid='review-text']",
+        # Generic
+        ".review-content",
+        ".review-body",
+        ".customer-review",
+        ".product-review",
+        "[class*='review']",
+        "[id*='review']"
+    ]
     
-    try:
-        options = Options()
-        options.add_argument("--headless")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--disable-blink-features=AutomationControlled")
-        options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        options.add_experimental_option('useAutomationExtension', False)
+    logger.debug("Trying %d different selectors", len(selectors))
+    
+    for i, selector in enumerate(selectors):
+        review_divs = soup.select(selector)
+        logger.debug("Selector %d: '%s' found %d elements", i + 1, selector, len(review_divs))
         
-        # Set a realistic user agent
-        user_agents = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-            "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        ]
-        options.add_argument(f"user-agent={random.choice(user_agents)}")
-
-        driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()),
-            options=options
-        )
+        if review_divs:
+            for div in review_divs:
+                text = div.get_text(strip=True)
+                if len(text) > 10:  # Filter out very short texts
+                    reviews.append(text)
+            logger.debug("Successfully used selector: %s", selector, extra={"selector": selector})
+            break
+    
+    # If still no reviews, try a more generic approach
+    if not reviews and generic:
+        logger.debug("No specific selectors worked, trying generic approach")
+        # Look for any div or span containing review-like text
+        all_text_elements = soup.find_all(['div', 'span'])
+        logger.debug("Found %d total text elements", len(all_text_elements))
         
-        # Execute script to remove webdriver property
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-
-        driver.get(product_url)
-        time.sleep(random.uniform(3, 6))
+        for elem in all_text_elements:
+            text = elem.get_text(strip=True)
+            if len(text) > 50 and ('star' in text.lower() or 'good' in text.lower() or 'bad' in text.lower() or 'product' in text.lower() or 'review' in text.lower()):
+                reviews.append(text)
         
-        # Scroll to load more reviews with random delays
-        for _ in range(3):
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(random.uniform(1, 3))
+        logger.debug("Generic approach found %d potential reviews", len(reviews))
 
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        
-        # Extract product name
-        product_name = extract_product_name(soup, product_url)
-        
-        # Debug: Print page title to see what we got
-        page_title = soup.find('title')
-        if page_title:
-            print(f"Page title: {page_title.get_text(strip=True)}")
-        
-        driver.quit()
-
-        reviews = []
-
-        # Enhanced selectors for multiple e-commerce sites
-        selectors = [
-            # Amazon
-            "span[data-hook='review-body']",
-            "div[data-hook='review-collapsed'] span",
-            "span.review-text-content span",
-            "div.review-text span",
-            "[data-hook='review-body'] span",
-            ".review-text",
-            ".a-size-base.review-text",
-            ".a-size-base.review-text-content",
-            # Flipkart
-            "div._1AtVbE div._27M-vq",
-            "div.t-ZTKy div",
-            "div.ZmyHeo div",
-            # Myntra
-            "div.user-review div.review-text",
-            "div[data-automationid='review-text']",
-            # Generic
-            ".review-content",
-            ".review-body",
-            ".customer-review",
-            ".product-review",
-            "[class*='review']",
-            "[id*='review']"
-        ]
-        
-        print(f"Trying {len(selectors)} different selectors...")
+    return unique_reviews(reviews, max_reviews)
+
+def unique_reviews(texts, max_reviews):
+    """
+    Deduplicated ReviewBatch of at most max_reviews texts.
+    """
+    # Nested matches repeat the same review text; dedupe before capping
+    # so duplicates don't take the place of real reviews
+    batch = ReviewBatch.from_texts(texts)
+    unique = dedupe_reviews(batch)
+    if len(unique) < len(batch):
+        logger.debug("Removed %d duplicate reviews", len(batch) - len(unique))
+
+    return unique.take(range(min(max_reviews, len(unique))))
+
+def structured_data_complete(structured, max_reviews=20):
+    """
+    True when structured data alone has the product name, the rating and
+    enough reviews: max_reviews, or every review the rating count says
+    there is. The browser then has nothing to wait or scroll for.
+    """
+    if not structured or not structured.get("name") or not structured.get("rating"):
+        return False
+    found = len(unique_reviews(structured["reviews"], max_reviews))
+    count = structured["rating"].get("count")
+    return found >= max_reviews or (found > 0 and count is not None and count <= found)
+
+def extract_product_page(soup, url, max_reviews=20, structured=None):
+    """
+    Reviews, product name and page details from a parsed product page.
+    schema.org structured data (JSON-LD, microdata) is read first; the CSS
+    selector cascades only run for what it does not provide. Pages often
+    embed only their first few reviews, so fewer than max_reviews
+    structured reviews are completed from the review selectors.
+    Returns (ReviewBatch, product_name, page_data) where page_data holds the
+    star rating (or None) and which extraction produced the reviews.
+    Pass structured when extract_structured_data(soup) was already called.
+    """
+    if structured is None:
+        structured = extract_structured_data(soup) or {}
+    if structured:
+        logger.debug("Structured data (%s): name=%s rating=%s reviews=%d", structured["source"],
+                     bool(structured["name"]), structured["rating"], len(structured["reviews"]))
+
+    product_name = clean_product_name(structured["name"]) if structured.get("name") else extract_product_name(soup, url)
+    if structured.get("reviews"):
+        reviews, extraction = unique_reviews(structured["reviews"], max_reviews), structured["source"]
+        if len(reviews) < max_reviews:
+            selector_reviews = extract_reviews(soup, max_reviews, generic=False)
+            merged = unique_reviews(list(reviews.texts) + list(selector_reviews.texts), max_reviews)
+            if len(merged) > len(reviews):
+                reviews, extraction = merged, f"{structured['source']}+selectors"
+    else:
+        reviews, extraction = extract_reviews(soup, max_reviews), "selectors"
+
+    return reviews, product_name, {"rating": structured.get("rating"), "extraction": extraction}
+
+class PageBlocked(Exception):
+    def __init__(self, reason):
+        super().__init__(f"Blocked by the site ({reason})")
+        self.reason = reason
+
+def mock_result(product_url, max_reviews, reason, product_name=None, rating=None, **details):
+    """
+    (ReviewBatch, product_name, page_data) of mock reviews, for when the
+    page could not be scraped. page_data["extraction"] is "mock" and
+    mock_reason says why (blocked, circuit-open, no-reviews, budget,
+    error).
+    """
+    page_data = dict({"rating": rating, "extraction": "mock", "mock_reason": reason}, **details)
+    product_name = product_name or extract_product_name_from_url(product_url)
+    return (
+        ReviewBatch.from_reviews(get_mock_reviews(max_reviews, product_url, product_name)),
+        product_name,
+        page_data
+    )
+
+def mock_details(page_data):
+    """
+    Response fields telling clients whether the reviews are mock data.
+    """
+    details = {"mock_data": page_data.get("extraction") == "mock"}
+    details.update({key: page_data[key] for key in ("mock_reason", "block_reason", "retry_after") if key in page_data})
+    return details
+
+def get_reviews(product_url, max_reviews=20, priority=PRIORITY_INTERACTIVE):
+    """
+    Attempts to scrape reviews and product name from a product URL.
+    If scraping fails, returns mock data for demonstration (see mock_result).
+    Returns (ReviewBatch, product_name, page_data), see extract_product_page.
+    """
+    logger.info("Attempting to scrape reviews from: %s", product_url, extra={"url": product_url})
+
+    # Fail fast while the site keeps serving block pages
+    try:
+        circuit_breaker.before_fetch(product_url)
+    except CircuitOpen as e:
+        logger.warning("%s, using mock data", e, extra={"url": product_url, "retry_after": round(e.retry_after)})
+        return mock_result(product_url, max_reviews, "circuit-open", retry_after=round(e.retry_after))
+    
+    try:
+        options = chrome_options()
+
+        def create_driver():
+            return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+
+        # Hold a politeness slot for this domain while the browser is on the
+        # site; the session always quits the driver and kills what is left
+        with fetch_scheduler.slot(product_url, priority), browser_session(create_driver, product_url) as session:
+            driver = session.driver
         
-        for i, selector in enumerate(selectors):
-            review_divs = soup.select(selector)
-            print(f"Selector {i+1}: '{selector}' found {len(review_divs)} elements")
+            # Execute script to remove webdriver property
+            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            blocked = block_requests(driver, product_url)
+
+            driver.get(product_url)
+            session.stage("load")
+
+            # A CAPTCHA or bot check will not turn into reviews by waiting
+            page_source = driver.page_source
+            block_reason = detect_block(page_source)
+            if block_reason:
+                raise PageBlocked(block_reason)
+
+            # Structured data is in the served HTML: when it has everything,
+            # skip the waits and scrolls for lazily rendered reviews
+            soup = BeautifulSoup(page_source, "html.parser")
+            structured = extract_structured_data(soup) or {}
+            if not structured_data_complete(structured, max_reviews):
+                structured = None
+                time.sleep(random.uniform(3, 6))
             
-            if review_divs:
-                for div in review_divs[:max_reviews]:
-                    text = div.get_text(strip=True)
-                    if len(text) > 10:  # Filter out very short texts
-                        reviews.append({"text": text})
-                print(f"Successfully used selector: {selector}")
-                break
+                # Scroll to load more reviews with random delays
+                for _ in range(3):
+                    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                    time.sleep(random.uniform(1, 3))
+                session.stage("scroll")
+                soup = BeautifulSoup(driver.page_source, "html.parser")
+
+            logger.info("Page loaded", extra=dict(page_metrics(driver), url=product_url, blocked_patterns=len(blocked),
+                                                  structured_fast_path=structured is not None))
+            session.stage("parse")
         
-        # If still no reviews, try a more generic approach
-        if not reviews:
-            print("No specific selectors worked, trying generic approach...")
-            # Look for any div or span containing review-like text
-            all_text_elements = soup.find_all(['div', 'span'])
-            print(f"Found {len(all_text_elements)} total text elements")
-            
-            for elem in all_text_elements:
-                text = elem.get_text(strip=True)
-                if len(text) > 50 and ('star' in text.lower() or 'good' in text.lower() or 'bad' in text.lower() or 'product' in text.lower() or 'review' in text.lower()):
-                    if len(reviews) < max_reviews:
-                        reviews.append({"text": text})
-            
-            print(f"Generic approach found {len(reviews)} potential reviews")
+            # Debug: log page title to see what we got
+            page_title = soup.find('title')
+            if page_title:
+                logger.debug("Page title: %s", page_title.get_text(strip=True))
+
+        circuit_breaker.record_success(product_url)
+        reviews, product_name, page_data = extract_product_page(soup, product_url, max_reviews, structured)
 
         if reviews:
-            print(f"Successfully scraped {len(reviews)} reviews for: {product_name}")
-            return reviews, product_name
+            logger.info("Successfully scraped %d reviews for: %s", len(reviews), product_name,
+                        extra={"url": product_url, "reviews": len(reviews), "extraction": page_data["extraction"]})
+            return reviews, product_name, page_data
         else:
-            print("No reviews found, using mock data")
-            return get_mock_reviews(max_reviews), product_name
-            
+            logger.warning("No reviews found, using mock data", extra={"url": product_url})
+            return mock_result(product_url, max_reviews, "no-reviews", product_name, page_data["rating"])
+
+    except PageBlocked as e:
+        circuit_breaker.record_block(product_url, e.reason)
+        logger.warning("%s, using mock data", e, extra={"url": product_url, "block_reason": e.reason})
+        return mock_result(product_url, max_reviews, "blocked", block_reason=e.reason)
+    except ScrapeBudgetExceeded as e:
+        circuit_breaker.release(product_url)
+        logger.warning("Scrape stopped, using mock data: %s", e, extra={"url": product_url})
+        return mock_result(product_url, max_reviews, "budget")
     except Exception as e:
-        print(f"Scraping failed: {e}")
-        print("Using mock data")
-        return get_mock_reviews(max_reviews), extract_product_name_from_url(product_url)
+        circuit_breaker.release(product_url)
+        logger.warning("Scraping failed, using mock data: %s", e, extra={"url": product_url})
+        return mock_result(product_url, max_reviews, "error")
+
+# Mock review templates by product type
+REVIEW_TEMPLATES = {
+    "electronics": [
+        {"text": "Great sound quality for the price! The battery life is impressive - lasts about 8 hours of continuous use. Easy to pair with devices.", "sentiment": "Positive"},
+        {"text": "Decent headphones but the noise cancellation could be better. Works well for calls but music quality is just average.", "sentiment": "Neutral"},
+        {"text": "Stopped working after 3 months of light use. The build quality feels cheap and customer service was unhelpful with warranty.", "sentiment": "Negative"},
+        {"text": "Excellent value! These headphones compete with brands twice the price. Comfortable for long wearing sessions.", "sentiment": "Positive"},
+        {"text": "Connection issues are frustrating - keeps dropping Bluetooth connection. Sound quality is good when it stays connected though.", "sentiment": "Negative"},
+        {"text": "Good bass response and clear highs. The carrying case is a nice touch. Overall satisfied with the purchase.", "sentiment": "Positive"},
+        {"text": "Average quality at best. You get what you pay for. Not suitable for audiophiles but fine for casual listening.", "sentiment": "Neutral"},
+        {"text": "Amazing build quality! The metal construction feels premium. Worth every penny for the durability alone.", "sentiment": "Positive"},
+        {"text": "Too tight on the head, becomes uncomfortable after 30 minutes. Sound quality doesn't justify the discomfort.", "sentiment": "Negative"},
+        {"text": "Works as advertised. No frills but gets the job done. Battery life is the standout feature.", "sentiment": "Neutral"}
+    ],
+    "clothing": [
+        {"text": "Perfect fit! The fabric quality is excellent and the color is exactly as shown in photos. Very satisfied.", "sentiment": "Positive"},
+        {"text": "Runs small - order one size up. Material is decent but not as soft as expected.", "sentiment": "Neutral"},
+        {"text": "Shrunk after first wash despite following care instructions. Disappointed with the quality for the price.", "sentiment": "Negative"},
+        {"text": "Beautiful design and great quality! Gets lots of compliments when I wear it. Highly recommended.", "sentiment": "Positive"},
+        {"text": "Comfortable and stylish. The material breathes well so it's good for all-day wear.", "sentiment": "Positive"},
+        {"text": "Average quality. Nothing special but works for the price. Expected better material at this price point.", "sentiment": "Neutral"},
+        {"text": "Color faded quickly after just a few washes. Fit is good but durability is questionable.", "sentiment": "Negative"},
+        {"text": "Exactly what I was looking for! The attention to detail is impressive. Will buy from this brand again.", "sentiment": "Positive"},
+        {"text": "Sizing is inconsistent with other brands. Quality is okay but the fit issues are frustrating.", "sentiment": "Negative"},
+        {"text": "Good basic item. Does what it's supposed to do. Not fashion-forward but practical.", "sentiment": "Neutral"}
+    ],
+    "furniture": [
+        {"text": "Excellent quality furniture! Sturdy construction and easy to assemble. Looks more expensive than it was.", "sentiment": "Positive"},
+        {"text": "Assembly took 4 hours and some parts didn't align properly. Once assembled, it's decent but the process was frustrating.", "sentiment": "Neutral"},
+        {"text": "Wobbly and unstable. Doesn't feel safe for daily use. Particle board construction is disappointing.", "sentiment": "Negative"},
+        {"text": "Perfect size for my space! The finish is beautiful and it was much easier to assemble than expected.", "sentiment": "Positive"},
+        {"text": "Good value for money. Not premium quality but serves its purpose well. Instructions could be clearer.", "sentiment": "Neutral"},
+        {"text": "Scratches easily and shows wear quickly. Looks good from a distance but up close quality is lacking.", "sentiment": "Negative"},
+        {"text": "Solid construction and stylish design. Exceeded my expectations for flat-pack furniture.", "sentiment": "Positive"},
+        {"text": "Average quality. You get what you pay for. Suitable for temporary use but not long-term investment.", "sentiment": "Neutral"},
+        {"text": "Missing hardware made assembly impossible. Customer service was slow to send replacement parts.", "sentiment": "Negative"},
+        {"text": "Beautiful piece that transformed my room! Sturdy and well-made. Worth every penny.", "sentiment": "Positive"}
+    ],
+    "general": [
+        {"text": "This product is absolutely amazing! The quality exceeded my expectations and the price is very reasonable.", "sentiment": "Positive"},
+        {"text": "I'm quite disappointed with this purchase. The product stopped working after just a week of use.", "sentiment": "Negative"},
+        {"text": "It's an okay product. Does what it's supposed to do but nothing extraordinary.", "sentiment": "Neutral"},
+        {"text": "Excellent product! Fast shipping and great customer service. The quality is top-notch.", "sentiment": "Positive"},
+        {"text": "Not worth the money. Poor quality materials and the design is flawed.", "sentiment": "Negative"},
+        {"text": "Good value for money. The product works well and meets my needs. No complaints so far.", "sentiment": "Positive"},
+        {"text": "Average quality. It works but I've seen better products in this price range.", "sentiment": "Neutral"},
+        {"text": "I love this product! It has made my life so much easier. Highly recommended!", "sentiment": "Positive"},
+        {"text": "Could be better. The design needs improvement and the materials feel cheap.", "sentiment": "Negative"},
+        {"text": "Pretty good overall. Some minor issues but nothing deal-breaking.", "sentiment": "Neutral"}
+    ]
+}
 
-def get_mock_reviews(max_reviews=20, product_url="", product_name=""):
+def get_mock_reviews(max_reviews=None, product_url="", product_name="", seed=None):
     """
-    Returns realistic mock review data based on product type.
+    Returns realistic mock review data based on product type: one review
+    per template (all of them by default), then reviews composed by
+    scraper.synthetic.generate_reviews beyond that. Seeded requests are
+    all generated, so the same seed gives the same reviews.
     """
     # Extract product type from URL or name for more targeted reviews
     product_type = detect_product_type(product_url, product_name)
     
-    # Review templates by product type
-    review_templates = {
-        "electronics": [
-            {"text": "Great sound quality for the price! The battery life is impressive - lasts about 8 hours of continuous use. Easy to pair with devices.", "sentiment": "Positive"},
-            {"text": "Decent headphones but the noise cancellation could be better. Works well for calls but music quality is just average.", "sentiment": "Neutral"},
-            {"text": "Stopped working after 3 months of light use. The build quality feels cheap and customer service was unhelpful with warranty.", "sentiment": "Negative"},
-            {"text": "Excellent value! These headphones compete with brands twice the price. Comfortable for long wearing sessions.", "sentiment": "Positive"},
-            {"text": "Connection issues are frustrating - keeps dropping Bluetooth connection. Sound quality is good when it stays connected though.", "sentiment": "Negative"},
-            {"text": "Good bass response and clear highs. The carrying case is a nice touch. Overall satisfied with the purchase.", "sentiment": "Positive"},
-            {"text": "Average quality at best. You get what you pay for. Not suitable for audiophiles but fine for casual listening.", "sentiment": "Neutral"},
-            {"text": "Amazing build quality! The metal construction feels premium. Worth every penny for the durability alone.", "sentiment": "Positive"},
-            {"text": "Too tight on the head, becomes uncomfortable after 30 minutes. Sound quality doesn't justify the discomfort.", "sentiment": "Negative"},
-            {"text": "Works as advertised. No frills but gets the job done. Battery life is the standout feature.", "sentiment": "Neutral"}
-        ],
-        "clothing": [
-            {"text": "Perfect fit! The fabric quality is excellent and the color is exactly as shown in photos. Very satisfied.", "sentiment": "Positive"},
-            {"text": "Runs small - order one size up. Material is decent but not as soft as expected.", "sentiment": "Neutral"},
-            {"text": "Shrunk after first wash despite following care instructions. Disappointed with the quality for the price.", "sentiment": "Negative"},
-            {"text": "Beautiful design and great quality! Gets lots of compliments when I wear it. Highly recommended.", "sentiment": "Positive"},
-            {"text": "Comfortable and stylish. The material breathes well so it's good for all-day wear.", "sentiment": "Positive"},
-            {"text": "Average quality. Nothing special but works for the price. Expected better material at this price point.", "sentiment": "Neutral"},
-            {"text": "Color faded quickly after just a few washes. Fit is good but durability is questionable.", "sentiment": "Negative"},
-            {"text": "Exactly what I was looking for! The attention to detail is impressive. Will buy from this brand again.", "sentiment": "Positive"},
-            {"text": "Sizing is inconsistent with other brands. Quality is okay but the fit issues are frustrating.", "sentiment": "Negative"},
-            {"text": "Good basic item. Does what it's supposed to do. Not fashion-forward but practical.", "sentiment": "Neutral"}
-        ],
-        "furniture": [
-            {"text": "Excellent quality furniture! Sturdy construction and easy to assemble. Looks more expensive than it was.", "sentiment": "Positive"},
-            {"text": "Assembly took 4 hours and some parts didn't align properly. Once assembled, it's decent but the process was frustrating.", "sentiment": "Neutral"},
-            {"text": "Wobbly and unstable. Doesn't feel safe for daily use. Particle board construction is disappointing.", "sentiment": "Negative"},
-            {"text": "Perfect size for my space! The finish is beautiful and it was much easier to assemble than expected.", "sentiment": "Positive"},
-            {"text": "Good value for money. Not premium quality but serves its purpose well. Instructions could be clearer.", "sentiment": "Neutral"},
-            {"text": "Scratches easily and shows wear quickly. Looks good from a distance but up close quality is lacking.", "sentiment": "Negative"},
-            {"text": "Solid construction and stylish design. Exceeded my expectations for flat-pack furniture.", "sentiment": "Positive"},
-            {"text": "Average quality. You get what you pay for. Suitable for temporary use but not long-term investment.", "sentiment": "Neutral"},
-            {"text": "Missing hardware made assembly impossible. Customer service was slow to send replacement parts.", "sentiment": "Negative"},
-            {"text": "Beautiful piece that transformed my room! Sturdy and well-made. Worth every penny.", "sentiment": "Positive"}
-        ],
-        "general": [
-            {"text": "This product is absolutely amazing! The quality exceeded my expectations and the price is very reasonable.", "sentiment": "Positive"},
-            {"text": "I'm quite disappointed with this purchase. The product stopped working after just a week of use.", "sentiment": "Negative"},
-            {"text": "It's an okay product. Does what it's supposed to do but nothing extraordinary.", "sentiment": "Neutral"},
-            {"text": "Excellent product! Fast shipping and great customer service. The quality is top-notch.", "sentiment": "Positive"},
-            {"text": "Not worth the money. Poor quality materials and the design is flawed.", "sentiment": "Negative"},
-            {"text": "Good value for money. The product works well and meets my needs. No complaints so far.", "sentiment": "Positive"},
-            {"text": "Average quality. It works but I've seen better products in this price range.", "sentiment": "Neutral"},
-            {"text": "I love this product! It has made my life so much easier. Highly recommended!", "sentiment": "Positive"},
-            {"text": "Could be better. The design needs improvement and the materials feel cheap.", "sentiment": "Negative"},
-            {"text": "Pretty good overall. Some minor issues but nothing deal-breaking.", "sentiment": "Neutral"}
-        ]
-    }
-    
     # Get appropriate reviews for product type
-    templates = review_templates.get(product_type, review_templates["general"])
+    templates = REVIEW_TEMPLATES.get(product_type, REVIEW_TEMPLATES["general"])
+    if max_reviews is None:
+        max_reviews = len(templates)
+
+    if seed is not None:
+        from scraper.synthetic import generate_reviews
+        return list(generate_reviews(max_reviews, product_type=product_type, product_name=product_name, seed=seed))
     
     # Add variety by randomizing and adding product-specific elements
-    import random
     selected_reviews = []
     
     for i in range(min(max_reviews, len(templates))):
@@ -298,69 +428,64 @@ def get_mock_reviews(max_reviews=20, product_url="", product_name=""):
     
     # Shuffle for variety
     random.shuffle(selected_reviews)
+
+    # Beyond the fixed templates, compose reviews with the generator
+    if max_reviews > len(templates):
+        from scraper.synthetic import generate_reviews
+        selected_reviews.extend(generate_reviews(max_reviews - len(templates), product_type=product_type, product_name=product_name))
     return selected_reviews
 
-def detect_product_type(product_url, product_name):
-    """
-    Detect product type from URL or name
-    """
-    url_lower = product_url.lower()
-    name_lower = product_name.lower()
-    
-    # Electronics keywords
-    electronics_keywords = [
+# Product type keywords, checked in this order by detect_product_type
+PRODUCT_TYPE_KEYWORDS = {
+    "electronics": [
         'headphone', 'phone', 'laptop', 'tablet', 'camera', 'speaker', 'bluetooth',
         'wireless', 'charger', 'battery', 'electronic', 'gadget', 'tech'
-    ]
-    
-    # Clothing keywords
-    clothing_keywords = [
+    ],
+    "clothing": [
         'shirt', 'pants', 'dress', 'shoes', 'jacket', 'cloth', 'wear', 'fashion',
         'clothing', 'apparel', 'outfit', 'wardrobe'
-    ]
-    
-    # Furniture keywords
-    furniture_keywords = [
+    ],
+    "furniture": [
         'table', 'chair', 'sofa', 'bed', 'shelf', 'cabinet', 'furniture',
         'wardrobe', 'desk', 'storage', 'almira', 'sofa'
     ]
+}
+
+def detect_product_type(product_url, product_name):
+    """
+    Detect product type from URL or name
+    """
+    url_lower = product_url.lower()
+    name_lower = product_name.lower()
     
-    # Check keywords
-    for keyword in electronics_keywords:
-        if keyword in url_lower or keyword in name_lower:
-            return "electronics"
-    
-    for keyword in clothing_keywords:
-        if keyword in url_lower or keyword in name_lower:
-            return "clothing"
-    
-    for keyword in furniture_keywords:
-        if keyword in url_lower or keyword in name_lower:
-            return "furniture"
+    for product_type, keywords in PRODUCT_TYPE_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword in url_lower or keyword in name_lower:
+                return product_type
     
     return "general"
 
-def customize_review(text, product_name, product_type):
+def customize_review(text, product_name, product_type, rng=random):
     """
-    Customize review text with product-specific details
+    Customize review text with product-specific details. Pass a seeded
+    random.Random as rng for reproducible output.
     """
     if not product_name or product_name == "Unknown Product":
         return text
     
     # Add product name to some reviews
-    import random
-    if random.random() < 0.3:  # 30% chance to mention product
+    if rng.random() < 0.3:  # 30% chance to mention product
         text = text.replace("This product", f"This {product_name}")
     
     # Add type-specific details
     if product_type == "electronics":
-        if random.random() < 0.2:
+        if rng.random() < 0.2:
             text += " The tech features are impressive."
     elif product_type == "clothing":
-        if random.random() < 0.2:
+        if rng.random() < 0.2:
             text += " The fit and finish are excellent."
     elif product_type == "furniture":
-        if random.random() < 0.2:
+        if rng.random() < 0.2:
             text += " Assembly was straightforward."
     
     return text
@@ -369,5 +494,5 @@ def customize_review(text, product_name, product_type):
 # TEST BLOCK — DO NOT REMOVE
 if __name__ == "__main__":
     url = "https://www.amazon.in/product-reviews/B0CHX7HK9Y"
-    data = get_reviews(url)
-    print(data)
+    reviews, product_name, page_data = get_reviews(url)
+    print(product_name, page_data, reviews.to_documents())
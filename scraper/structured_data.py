@@ -0,0 +1,182 @@
+import html
+import json
+import re
+
+# schema.org types that describe a product page
+PRODUCT_TYPES = {"Product", "ProductGroup", "IndividualProduct", "ProductModel"}
+
+# Same minimum as the CSS selector path
+MIN_REVIEW_LENGTH = 10
+
+_TAG = re.compile(r'<[^>]+>')
+
+def _type_names(value):
+    """
+    "@type" as bare names: "http://schema.org/Product" -> "Product".
+    """
+    values = value if isinstance(value, list) else [value]
+    return {re.split(r'[/:#]', str(v))[-1] for v in values if v}
+
+def _text(value):
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, dict):
+        value = value.get("name") or value.get("@value")
+    if value is None:
+        return None
+    text = ' '.join(_TAG.sub(' ', html.unescape(str(value))).split())
+    return text or None
+
+def _number(value):
+    if isinstance(value, list):
+        value = value[0] if value else None
+    try:
+        return float(str(value).replace(",", ".").strip())
+    except (TypeError, ValueError):
+        return None
+
+def make_rating(value, count=None, best=None):
+    """
+    Star rating as stored with the product, or None without a value.
+    """
+    value = _number(value)
+    if value is None:
+        return None
+    count = _number(count)
+    return {
+        "value": round(value, 2),
+        "count": int(count) if count is not None else None,
+        "best": _number(best) or 5.0
+    }
+
+def _review_texts(texts):
+    return [text for text in texts if text and len(text) > MIN_REVIEW_LENGTH]
+
+# JSON-LD
+
+def _json_ld_nodes(soup):
+    for script in soup.find_all("script", type=re.compile(r'application/ld\+json', re.I)):
+        raw = (script.string or script.get_text() or "").strip()
+        # Some sites wrap the JSON in HTML comments or CDATA markers
+        raw = re.sub(r'^\s*(<!--|//\s*<!\[CDATA\[)|(-->|//\s*\]\]>)\s*$', '', raw)
+        try:
+            yield json.loads(raw, strict=False)
+        except ValueError:
+            continue
+
+def _find_products(node, depth=0):
+    """
+    Product objects anywhere in a JSON-LD document (top level, @graph,
+    mainEntity, item lists...).
+    """
+    if depth > 8:
+        return
+    if isinstance(node, list):
+        for item in node:
+            yield from _find_products(item, depth + 1)
+    elif isinstance(node, dict):
+        if _type_names(node.get("@type")) & PRODUCT_TYPES:
+            yield node
+        for key, value in node.items():
+            if key not in ("review", "aggregateRating") and isinstance(value, (dict, list)):
+                yield from _find_products(value, depth + 1)
+
+def _json_ld_product(product):
+    reviews = product.get("review") or product.get("reviews") or []
+    if isinstance(reviews, dict):
+        reviews = [reviews]
+    rating = product.get("aggregateRating")
+    if isinstance(rating, list):
+        rating = rating[0] if rating else None
+    return {
+        "name": _text(product.get("name")),
+        "rating": make_rating(
+            rating.get("ratingValue"),
+            rating.get("reviewCount") or rating.get("ratingCount"),
+            rating.get("bestRating")
+        ) if isinstance(rating, dict) else None,
+        "reviews": _review_texts(
+            _text(review.get("reviewBody") or review.get("description"))
+            for review in reviews if isinstance(review, dict)
+        ),
+        "source": "json-ld"
+    }
+
+def extract_json_ld(soup):
+    """
+    The most complete schema.org Product in the page's JSON-LD, or None.
+    """
+    products = [_json_ld_product(p) for node in _json_ld_nodes(soup) for p in _find_products(node)]
+    products = [p for p in products if p["name"] or p["rating"] or p["reviews"]]
+    if not products:
+        return None
+    return max(products, key=lambda p: (len(p["reviews"]), p["rating"] is not None, p["name"] is not None))
+
+# Microdata
+
+def _has_prop(name):
+    return lambda value: bool(value) and name in value.split()
+
+def _props(scope, name):
+    """
+    Elements with itemprop=name belonging to scope itself, not to an item
+    nested inside it.
+    """
+    for element in scope.find_all(attrs={"itemprop": _has_prop(name)}):
+        if element.find_parent(attrs={"itemscope": True}) is scope:
+            yield element
+
+def _prop_value(scope, *names):
+    for name in names:
+        for element in _props(scope, name):
+            value = element.get("content") or element.get_text(" ", strip=True)
+            if value:
+                return value
+    return None
+
+def extract_microdata(soup):
+    """
+    Name, rating and reviews from a schema.org/Product microdata item, or None.
+    """
+    scope = soup.find(attrs={"itemscope": True, "itemtype": re.compile(r'schema\.org/(%s)$' % "|".join(PRODUCT_TYPES), re.I)})
+    if scope is None:
+        return None
+
+    rating_scope = next(_props(scope, "aggregateRating"), None)
+    rating = make_rating(
+        _prop_value(rating_scope, "ratingValue"),
+        _prop_value(rating_scope, "reviewCount", "ratingCount"),
+        _prop_value(rating_scope, "bestRating")
+    ) if rating_scope is not None else None
+
+    reviews = [
+        _text(_prop_value(review, "reviewBody", "description"))
+        for name in ("review", "reviews") for review in _props(scope, name)
+    ]
+    return {
+        "name": _text(_prop_value(scope, "name")),
+        "rating": rating,
+        "reviews": _review_texts(reviews),
+        "source": "microdata"
+    }
+
+def extract_structured_data(soup):
+    """
+    Product name, star rating and review texts from JSON-LD, completed from
+    microdata when JSON-LD lacks them. None when the page has neither.
+    """
+    found = extract_json_ld(soup)
+    if found and found["name"] and found["rating"] and found["reviews"]:
+        return found
+
+    microdata = extract_microdata(soup)
+    if not found:
+        return microdata
+    if microdata:
+        found = {
+            "name": found["name"] or microdata["name"],
+            "rating": found["rating"] or microdata["rating"],
+            "reviews": found["reviews"] or microdata["reviews"],
+            "source": found["source"] if found["reviews"] or not microdata["reviews"] else microdata["source"]
+        }
+    return found
@@ -0,0 +1,168 @@
+import json
+import random
+import re
+import sys
+from collections import deque
+
+from scraper.scraper import REVIEW_TEMPLATES, PRODUCT_TYPE_KEYWORDS, customize_review, detect_product_type
+
+# Default share of each sentiment among generated reviews
+SENTIMENT_MIX = {"Positive": 0.5, "Negative": 0.3, "Neutral": 0.2}
+
+# Relative weights for reviews of 1, 2, 3, ... sentences
+LENGTH_WEIGHTS = (25, 35, 20, 12, 8)
+
+# Earlier reviews kept as candidates for duplicates
+DUPLICATE_WINDOW = 1000
+
+PRODUCT_TYPES = list(REVIEW_TEMPLATES)
+
+BRANDS = ["Acme", "Nova", "Zenith", "Orbit", "Vertex", "Lumen", "Apex", "Kite", "Maple", "Summit"]
+MODELS = ["Pro", "Lite", "Max", "Plus", "Mini", "One", "X", "Air", "Prime", "Go"]
+
+# Product nouns for "general", which must not match any category keyword
+GENERAL_NOUNS = ["blender", "water bottle", "yoga mat", "backpack", "lamp", "kettle", "notebook", "umbrella"]
+
+# Neutral sentences that lengthen a review without changing its sentiment
+FILLERS = [
+    "Bought this {n} weeks ago.",
+    "Delivery took {n} days.",
+    "I have been using it daily.",
+    "Got it on sale.",
+    "Not my first order from this seller.",
+    "Packaging was standard."
+]
+
+# "The <aspect> is <adjective>." sentences, by product type and sentiment
+ASPECTS = {
+    "electronics": ["battery", "screen", "sound", "charging speed", "build", "app", "camera", "connectivity"],
+    "clothing": ["fabric", "stitching", "fit", "color", "size chart", "zipper", "collar", "material"],
+    "furniture": ["finish", "frame", "cushioning", "assembly manual", "wood", "hardware", "height", "surface"],
+    "general": ["quality", "packaging", "design", "price", "finish", "size", "manual", "handle"]
+}
+ADJECTIVES = {
+    "Positive": ["excellent", "great", "superb", "really good", "better than expected", "impressive", "solid", "perfect"],
+    "Negative": ["terrible", "poor", "awful", "flimsy", "worse than expected", "disappointing", "bad", "useless"],
+    "Neutral": ["fine", "average", "okay", "as described", "standard", "acceptable", "decent", "ordinary"]
+}
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+_NUMBER = re.compile(r'\b\d+\b')
+
+def _sentence_pools():
+    """
+    Template sentences grouped by product type and sentiment.
+    """
+    pools = {}
+    for product_type, templates in REVIEW_TEMPLATES.items():
+        for template in templates:
+            sentences = _SENTENCE_END.split(template["text"])
+            pools.setdefault((product_type, template["sentiment"]), []).extend(sentences)
+    return pools
+
+SENTENCE_POOLS = _sentence_pools()
+
+def _near_duplicate(text, rng):
+    """
+    Exact copy or a copy differing only in case, spacing or punctuation.
+    """
+    variant = rng.randrange(4)
+    if variant == 1:
+        return text.lower()
+    if variant == 2:
+        return text.rstrip(".!") + "!!"
+    if variant == 3:
+        return "  ".join(text.split(" "))
+    return text
+
+def generate_reviews(count, product_type="general", product_name="", seed=None,
+                     sentiment_mix=None, length_weights=LENGTH_WEIGHTS, duplicate_rate=0.0, rng=None):
+    """
+    Yield count mock reviews ({"text", "sentiment"}) for a product type.
+
+    Reviews are composed from template sentences of the drawn sentiment,
+    with numbers varied, aspect and filler sentences mixed in and the text
+    customized with customize_review. The same seed gives the same stream.
+    sentiment_mix weights the labels, length_weights the number of
+    sentences (1, 2, ...), and duplicate_rate is the share of reviews that
+    repeat (or nearly repeat) an earlier one.
+    """
+    rng = rng or random.Random(seed)
+    mix = sentiment_mix or SENTIMENT_MIX
+    labels, label_weights = list(mix), list(mix.values())
+    lengths = range(1, len(length_weights) + 1)
+    recent = deque(maxlen=DUPLICATE_WINDOW)
+
+    for _ in range(count):
+        if recent and rng.random() < duplicate_rate:
+            original = rng.choice(recent)
+            yield {"text": _near_duplicate(original["text"], rng), "sentiment": original["sentiment"]}
+            continue
+
+        sentiment = rng.choices(labels, label_weights)[0]
+        pool = SENTENCE_POOLS.get((product_type, sentiment)) or SENTENCE_POOLS[("general", sentiment)]
+        size = rng.choices(lengths, length_weights)[0]
+
+        sentences = rng.sample(pool, min(size, len(pool)))
+        if rng.random() < 0.6:
+            aspect = rng.choice(ASPECTS.get(product_type, ASPECTS["general"]))
+            sentences.insert(rng.randrange(len(sentences) + 1), f"The {aspect} is {rng.choice(ADJECTIVES[sentiment])}.")
+        if size > len(pool) or rng.random() < 0.2:
+            sentences.insert(rng.randrange(len(sentences) + 1), rng.choice(FILLERS))
+        text = " ".join(sentences)
+        text = _NUMBER.sub(lambda m: str(rng.randint(2, 12)), text.replace("{n}", str(rng.randint(2, 9))))
+        text = customize_review(text, product_name, product_type, rng)
+
+        review = {"text": text, "sentiment": sentiment}
+        recent.append(review)
+        yield review
+
+def _product_nouns():
+    """
+    Category keywords usable as product nouns (detected as that category).
+    """
+    nouns = {"general": GENERAL_NOUNS}
+    for product_type, keywords in PRODUCT_TYPE_KEYWORDS.items():
+        nouns[product_type] = [k for k in dict.fromkeys(keywords) if detect_product_type("", k) == product_type]
+    return nouns
+
+def generate_products(count, reviews_per_product=(5, 50), seed=None, type_weights=None, **review_options):
+    """
+    Yield count mock products ({"name", "url", "product_type", "reviews"}).
+    The product type comes from detect_product_type on the generated name,
+    and each product gets a random number of reviews in reviews_per_product
+    from generate_reviews (review_options are passed through).
+    """
+    rng = random.Random(seed)
+    nouns = _product_nouns()
+    weights = [(type_weights or {}).get(t, 1) for t in PRODUCT_TYPES]
+
+    for i in range(count):
+        product_type = rng.choices(PRODUCT_TYPES, weights)[0]
+        noun = rng.choice(nouns[product_type])
+        name = f"{rng.choice(BRANDS)} {noun.title()} {rng.choice(MODELS)}"
+        url = f"https://shop.example.com/{re.sub(r'[^a-z0-9]+', '-', name.lower())}/p/{i}"
+        low, high = reviews_per_product
+        product_type = detect_product_type(url, name)
+        reviews = list(generate_reviews(rng.randint(low, high), product_type, name, rng=rng, **review_options))
+        yield {"name": name, "url": url, "product_type": product_type, "reviews": reviews}
+
+
+# Write a corpus as NDJSON, one product per line:
+#   python -m scraper.synthetic --products 10000 --seed 1 > corpus.ndjson
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic product/review corpus as NDJSON")
+    parser.add_argument("--products", type=int, default=100)
+    parser.add_argument("--min-reviews", type=int, default=5)
+    parser.add_argument("--max-reviews", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duplicate-rate", type=float, default=0.0)
+    parser.add_argument("--mix", default="", help="Sentiment mix, e.g. Positive=0.6,Negative=0.3,Neutral=0.1")
+    args = parser.parse_args()
+
+    mix = {k: float(v) for k, v in (part.split("=") for part in args.mix.split(",") if part)} or None
+    for product in generate_products(args.products, (args.min_reviews, args.max_reviews), seed=args.seed,
+                                     sentiment_mix=mix, duplicate_rate=args.duplicate_rate):
+        sys.stdout.write(json.dumps(product) + "\n")
@@ -0,0 +1,192 @@
+"""
+Precompiled VADER lexicon.
+
+SentimentIntensityAnalyzer() reads and parses vader_lexicon.txt and
+emoji_utf8_lexicon.txt in every process, keeps the raw file text, and
+VectorScorer then compiles the lexicon into its arrays. This module does
+all of that once and writes the result to one binary file: a JSON header
+followed by aligned NumPy arrays and newline-joined word lists. Loading
+memory-maps the file, so the arrays are read-only views on pages shared
+through the OS page cache by every worker process. Both scorers read the
+valences from those arrays (the VADER analyzer through LexiconView); only
+the token -> id vocabulary and the small emoji dict are built per process.
+
+The artifact records the size and mtime of the VADER source files and the
+format version. Build it at install/deploy time, after the requirements
+are installed (deploy.sh and the Procfile release step do):
+    python -m sentiment.lexicon_artifact
+Processes never write it; with a stale or missing artifact they parse the
+VADER sources as before.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+
+import numpy as np
+import vaderSentiment.vaderSentiment as vader
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer, BOOSTER_DICT, NEGATE, SPECIAL_CASES
+
+from sentiment.vector_scorer import CompiledLexicon, RULE_WORDS
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Where the artifact is read from and written to; empty disables it
+LEXICON_ARTIFACT = os.getenv(
+    'SENTIMENT_LEXICON_ARTIFACT',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vader_lexicon.bin')
+)
+
+MAGIC = b"VLEX"
+FORMAT_VERSION = 2
+ALIGNMENT = 64
+
+class LexiconView(Mapping):
+    """
+    VADER's word -> valence lexicon read from the arrays of a
+    CompiledLexicon. Multi-word entries ("fed up") are left out: VADER
+    looks the lexicon up one whitespace-separated token at a time, so they
+    never match.
+    """
+    __slots__ = ("compiled",)
+
+    def __init__(self, compiled):
+        self.compiled = compiled
+
+    def __getitem__(self, word):
+        i = self.compiled.vocab.get(word)
+        if i is None or not self.compiled.in_lexicon[i]:
+            raise KeyError(word)
+        return float(self.compiled.valence[i])
+
+    def __contains__(self, word):
+        i = self.compiled.vocab.get(word)
+        return i is not None and bool(self.compiled.in_lexicon[i])
+
+    def __iter__(self):
+        in_lexicon = self.compiled.in_lexicon
+        return (word for word in self.compiled.words if in_lexicon[self.compiled.vocab[word]])
+
+    def __len__(self):
+        return int(np.count_nonzero(self.compiled.in_lexicon))
+
+class LexiconAnalyzer(SentimentIntensityAnalyzer):
+    """
+    SentimentIntensityAnalyzer over an already loaded lexicon and emoji
+    dict; polarity_scores() is unchanged.
+    """
+    def __init__(self, lexicon, emojis):
+        self.lexicon = lexicon
+        self.emojis = emojis
+
+def source_key():
+    """
+    Fingerprint of everything the artifact is built from.
+    """
+    vader_dir = os.path.dirname(os.path.abspath(vader.__file__))
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(FORMAT_VERSION).encode())
+    for name in ("vader_lexicon.txt", "emoji_utf8_lexicon.txt", "vaderSentiment.py"):
+        stat = os.stat(os.path.join(vader_dir, name))
+        digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    digest.update(repr((RULE_WORDS, sorted(BOOSTER_DICT.items()), NEGATE, sorted(SPECIAL_CASES.items()))).encode())
+    return digest.hexdigest()
+
+def _join(words):
+    if any("\n" in w for w in words):
+        raise ValueError("Lexicon entries must not contain newlines")
+    return np.frombuffer("\n".join(words).encode("utf-8"), dtype=np.uint8)
+
+def _split(blob):
+    text = bytes(blob).decode("utf-8")
+    return text.split("\n") if text else []
+
+def build(path=LEXICON_ARTIFACT):
+    """
+    Parses the VADER sources, compiles the lexicon and writes the artifact
+    (atomically, so running workers never see a partial file).
+    """
+    analyzer = SentimentIntensityAnalyzer()
+    compiled = CompiledLexicon(analyzer.lexicon)
+    arrays = {
+        "emoji_keys": _join(list(analyzer.emojis)),
+        "emoji_values": _join(list(analyzer.emojis.values())),
+        "words": _join(compiled.words),
+        "valence": compiled.valence,
+        "in_lexicon": compiled.in_lexicon,
+        "booster": compiled.booster,
+        "negates": compiled.negates,
+    }
+
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        layout[name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        offset += array.nbytes
+    header = json.dumps({"version": FORMAT_VERSION, "source": source_key(), "arrays": layout}).encode()
+    # Array offsets are relative to the aligned end of the header
+    data_start = -(-(len(MAGIC) + 4 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+def load(path=LEXICON_ARTIFACT):
+    """
+    (LexiconView, emoji dict, CompiledLexicon) from the artifact, or None
+    when it is missing, unreadable or built from other sources.
+    """
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        if buffer[:len(MAGIC)] != MAGIC:
+            return None
+        header_size = struct.unpack_from("<I", buffer, len(MAGIC))[0]
+        header = json.loads(buffer[len(MAGIC) + 4:len(MAGIC) + 4 + header_size])
+        if header.get("version") != FORMAT_VERSION or header.get("source") != source_key():
+            return None
+        data_start = -(-(len(MAGIC) + 4 + header_size) // ALIGNMENT) * ALIGNMENT
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + spec["offset"]).reshape(spec["shape"])
+    except (ValueError, KeyError, struct.error):
+        return None
+
+    compiled = CompiledLexicon.from_arrays(
+        _split(arrays["words"]), arrays["valence"], arrays["in_lexicon"], arrays["booster"], arrays["negates"]
+    )
+    emojis = dict(zip(_split(arrays["emoji_keys"]), _split(arrays["emoji_values"])))
+    return LexiconView(compiled), emojis, compiled
+
+def load_analyzer(path=LEXICON_ARTIFACT):
+    """
+    (analyzer, compiled lexicon) from the artifact, or parsed from the
+    VADER sources when the artifact is missing or stale.
+    """
+    if path:
+        loaded = load(path)
+        if loaded is not None:
+            lexicon, emojis, compiled = loaded
+            return LexiconAnalyzer(lexicon, emojis), compiled
+        logger.warning("Lexicon artifact missing or stale, parsing the VADER sources; "
+                       "build it with: python -m sentiment.lexicon_artifact", extra={"path": path})
+
+    analyzer = SentimentIntensityAnalyzer()
+    return analyzer, CompiledLexicon(analyzer.lexicon)
+
+if __name__ == "__main__":
+    built = build()
+    print(f"✅ Built {built} ({os.path.getsize(built) / 1024:.0f} KiB)")
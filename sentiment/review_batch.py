@@ -0,0 +1,119 @@
+import numpy as np
+
+LABELS = ("Positive", "Negative", "Neutral")
+RULES = (
+    "negated_positive", "negative_descriptor", "neutral_indicator",
+    "compound_positive", "compound_negative", "compound_neutral"
+)
+UNSCORED = 255
+
+_LABEL_CODES = {label: code for code, label in enumerate(LABELS)}
+_RULE_CODES = {rule: code for code, rule in enumerate(RULES)}
+
+class ReviewBatch:
+    """
+    Columnar batch of reviews used from the scraper to storage: one list of
+    texts plus parallel NumPy arrays for label and rule codes (uint8) and
+    the [neg, neu, pos, compound] scores (float32). This replaces a dict
+    per review per pipeline stage; documents for BSON/JSON are built only
+    at the boundaries with to_documents().
+    """
+    __slots__ = ("texts", "labels", "rules", "scores")
+
+    def __init__(self, texts=None, labels=None, rules=None, scores=None):
+        self.texts = list(texts or [])
+        size = len(self.texts)
+        self.labels = labels if labels is not None else np.full(size, UNSCORED, dtype=np.uint8)
+        self.rules = rules if rules is not None else np.full(size, UNSCORED, dtype=np.uint8)
+        self.scores = scores if scores is not None else np.full((size, 4), np.nan, dtype=np.float32)
+
+    @classmethod
+    def from_texts(cls, texts):
+        return cls(texts)
+
+    @classmethod
+    def from_reviews(cls, reviews):
+        """
+        Build an unscored batch from scraped review dicts ({"text": ...}).
+        """
+        if isinstance(reviews, cls):
+            return reviews
+        return cls([r["text"] for r in reviews])
+
+    @classmethod
+    def from_documents(cls, documents):
+        """
+        Stored reviews are always labelled; legacy ones may lack scores.
+        """
+        documents = list(documents)
+        batch = cls([d["text"] for d in documents])
+        for i, d in enumerate(documents):
+            batch.labels[i] = _LABEL_CODES[d["sentiment"]]
+            batch.rules[i] = _RULE_CODES.get(d.get("rule"), UNSCORED)
+            if d.get("scores"):
+                batch.scores[i] = d["scores"]
+        return batch
+
+    @classmethod
+    def concat(cls, *batches):
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return cls()
+        return cls(
+            [text for batch in batches for text in batch.texts],
+            np.concatenate([batch.labels for batch in batches]),
+            np.concatenate([batch.rules for batch in batches]),
+            np.concatenate([batch.scores for batch in batches])
+        )
+
+    def __len__(self):
+        return len(self.texts)
+
+    def take(self, indices):
+        """
+        New batch with the rows at indices, in that order.
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        return ReviewBatch([self.texts[i] for i in indices], self.labels[indices], self.rules[indices], self.scores[indices])
+
+    def unscored(self):
+        return np.flatnonzero(self.labels == UNSCORED)
+
+    def set_result(self, index, result):
+        """
+        Store a score_sentiment() result for row index.
+        """
+        self.labels[index] = _LABEL_CODES[result["label"]]
+        self.rules[index] = _RULE_CODES[result["rule"]]
+        self.scores[index] = (result["neg"], result["neu"], result["pos"], result["compound"])
+
+    def summary(self):
+        counts = np.bincount(self.labels[self.labels != UNSCORED], minlength=len(LABELS))
+        return {label: int(counts[code]) for code, label in enumerate(LABELS)}
+
+    def compounds(self):
+        return self.scores[:, 3]
+
+    def to_documents(self):
+        """
+        Review dicts as stored in MongoDB and returned by the API.
+        """
+        documents = []
+        for i, text in enumerate(self.texts):
+            document = {"text": text}
+            if self.labels[i] != UNSCORED:
+                document["sentiment"] = LABELS[self.labels[i]]
+            if not np.isnan(self.scores[i, 3]):
+                neg, neu, pos, compound = self.scores[i].tolist()
+                document["scores"] = [round(neg, 3), round(neu, 3), round(pos, 3), round(compound, 4)]
+            if self.rules[i] != UNSCORED:
+                document["rule"] = RULES[self.rules[i]]
+            documents.append(document)
+        return documents
+
+
+def review_documents(reviews):
+    """
+    Review dicts for storage/JSON from a ReviewBatch or an existing list.
+    """
+    return reviews.to_documents() if isinstance(reviews, ReviewBatch) else list(reviews)
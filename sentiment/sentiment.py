@@ -1,12 +1,48 @@
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+import os
 import re
+import numpy as np
+from sentiment.review_batch import ReviewBatch
+from sentiment.vector_scorer import VectorScorer
+from sentiment.lexicon_artifact import load_analyzer
 
-# Create analyzer object (loads VADER lexicon internally)
-analyzer = SentimentIntensityAnalyzer()
+# VADER analyzer and compiled lexicon, memory-mapped from the precompiled
+# artifact (sentiment/lexicon_artifact.py) instead of parsed per process
+analyzer, compiled_lexicon = load_analyzer()
 
-def analyze_sentiment(text):
-    # Get sentiment scores
-    scores = analyzer.polarity_scores(text)
+# Scoring backend: "vader" scores text by text with the analyzer above,
+# "vectorized" scores whole batches with the same lexicon in NumPy
+# (sentiment/vector_scorer.py, checked against vader by test_vader_parity.py)
+SENTIMENT_BACKEND = os.getenv('SENTIMENT_BACKEND', 'vader')
+vector_scorer = VectorScorer(compiled_lexicon, analyzer.emojis)
+
+# Histogram bin edges for compound scores (10 bins over [-1, 1])
+COMPOUND_BINS = np.linspace(-1.0, 1.0, 11)
+
+def polarity_scores(texts):
+    """
+    VADER polarity_scores() for each text, from the configured backend.
+    """
+    if SENTIMENT_BACKEND == 'vectorized':
+        return vector_scorer.polarity_scores(texts)
+    return [analyzer.polarity_scores(text) for text in texts]
+
+def score_sentiments(texts):
+    """
+    score_sentiment() for a batch of texts, scored in one backend call.
+    """
+    return [label_scores(text, scores) for text, scores in zip(texts, polarity_scores(texts))]
+
+def score_sentiment(text):
+    """
+    Label a review and keep the evidence: the VADER score vector and the
+    rule that decided the label.
+    """
+    return score_sentiments([text])[0]
+
+def label_scores(text, scores):
+    """
+    Apply the labelling rules to a review and its VADER scores.
+    """
     compound = scores["compound"]
     
     # Check for explicit negative indicators
@@ -20,19 +56,78 @@ def analyze_sentiment(text):
     # Check for explicit negative sentiment patterns
     if any(word in text_lower for word in negative_words) and any(word in text_lower for word in positive_words):
         # Negation of positive words (e.g., "not good", "not amazing")
-        return "Negative"
+        label, rule = "Negative", "negated_positive"
     elif any(word in text_lower for word in negative_descriptors):
         # Direct negative descriptors
-        return "Negative"
+        label, rule = "Negative", "negative_descriptor"
     elif any(phrase in text_lower for phrase in neutral_indicators):
         # Neutral indicators
-        return "Neutral"
+        label, rule = "Neutral", "neutral_indicator"
     elif compound >= 0.1:  # Increased threshold for positive
-        return "Positive"
+        label, rule = "Positive", "compound_positive"
     elif compound <= -0.05:  # Keep threshold for negative
-        return "Negative"
+        label, rule = "Negative", "compound_negative"
     else:
-        return "Neutral"
+        label, rule = "Neutral", "compound_neutral"
+    
+    return {
+        "label": label,
+        "rule": rule,
+        "neg": scores["neg"],
+        "neu": scores["neu"],
+        "pos": scores["pos"],
+        "compound": compound
+    }
+
+def analyze_sentiment(text):
+    return score_sentiment(text)["label"]
+
+def compound_statistics(compounds):
+    """
+    Product-level statistics over the compound scores of its reviews,
+    computed with NumPy in one pass over the array.
+    """
+    values = np.asarray(compounds, dtype=np.float64)
+    # Reviews stored before scores were kept have no compound score
+    values = values[~np.isnan(values)]
+    counts, _ = np.histogram(values, bins=COMPOUND_BINS)
+    if values.size == 0:
+        return {"mean_compound": None, "std_compound": None, "histogram": {"bins": COMPOUND_BINS.round(2).tolist(), "counts": counts.tolist()}}
+    return {
+        "mean_compound": round(float(values.mean()), 4),
+        "std_compound": round(float(values.std()), 4),
+        "histogram": {"bins": COMPOUND_BINS.round(2).tolist(), "counts": counts.tolist()}
+    }
+
+
+def summarize_reviews(reviews, previous_reviews=None):
+    """
+    Score each scraped review, count labels per sentiment and compute the
+    compound score statistics. Returns the reviews_data dict stored by
+    ProductModel, with the reviews as a ReviewBatch.
+
+    reviews may be a ReviewBatch or a list of {"text": ...} dicts.
+    previous_reviews are already scored review documents (e.g. from the
+    stored product on a refresh); they are kept and counted without
+    re-scoring.
+    """
+    batch = ReviewBatch.from_reviews(reviews)
+    unscored = batch.unscored()
+    results = score_sentiments([batch.texts[i] for i in unscored])
+    for i, result in zip(unscored, results):
+        batch.set_result(i, result)
+
+    if previous_reviews:
+        batch = ReviewBatch.concat(ReviewBatch.from_documents(previous_reviews), batch)
+
+    score_stats = compound_statistics(batch.compounds())
+
+    return {
+        "summary": batch.summary(),
+        "reviews": batch,
+        "score_stats": score_stats,
+        "mean_compound": score_stats["mean_compound"]
+    }
 
 
 # TEST BLOCK — to check if this file works alone
@@ -0,0 +1,353 @@
+import string
+import numpy as np
+from vaderSentiment.vaderSentiment import BOOSTER_DICT, NEGATE, SPECIAL_CASES, C_INCR, N_SCALAR
+
+# Token ids 0 and 1 are words outside the vocabulary (1 when the word holds
+# "n't", which VADER treats as a negation); the last id pads windows that
+# run past either end of a text.
+UNKNOWN = 0
+UNKNOWN_NEGATION = 1
+
+# Words the VADER rules test by name
+RULE_WORDS = ("no", "or", "nor", "but", "least", "at", "very", "never", "so", "this", "without", "doubt", "kind", "of")
+
+# Raw token -> encoded id, shared across batches; cleared when it grows past this
+TOKEN_CACHE_SIZE = 200000
+
+class CompiledLexicon:
+    """
+    The VADER lexicon as parallel NumPy arrays indexed by token id: valence,
+    lexicon membership, booster increment and negation flag, plus the
+    token -> id vocabulary covering lexicon, booster, negation and rule words.
+    """
+    __slots__ = ("words", "vocab", "valence", "in_lexicon", "booster", "negates", "pad")
+
+    def __init__(self, lexicon):
+        phrase_words = {w for phrase in list(SPECIAL_CASES) + list(BOOSTER_DICT) for w in phrase.split()}
+        words = set(lexicon) | set(BOOSTER_DICT) | set(NEGATE) | set(RULE_WORDS) | phrase_words
+        words = {w for w in words if " " not in w}
+
+        self.words = ["", "n't"] + sorted(words)
+        self.vocab = {w: i for i, w in enumerate(self.words)}
+        self.vocab[""] = UNKNOWN
+        self.pad = len(self.words)
+
+        size = self.pad + 1
+        self.valence = np.zeros(size, dtype=np.float64)
+        self.in_lexicon = np.zeros(size, dtype=bool)
+        self.booster = np.zeros(size, dtype=np.float64)
+        self.negates = np.zeros(size, dtype=bool)
+        for word, i in self.vocab.items():
+            if word in lexicon:
+                self.valence[i] = lexicon[word]
+                self.in_lexicon[i] = True
+            self.booster[i] = BOOSTER_DICT.get(word, 0.0)
+            self.negates[i] = word in NEGATE or "n't" in word
+        self.negates[UNKNOWN_NEGATION] = True
+
+    @classmethod
+    def from_arrays(cls, words, valence, in_lexicon, booster, negates):
+        """
+        Rebuild from the arrays of a compiled lexicon artifact (see
+        sentiment/lexicon_artifact.py); the arrays may be read-only views.
+        """
+        compiled = cls.__new__(cls)
+        compiled.words = words
+        compiled.vocab = {w: i for i, w in enumerate(words)}
+        compiled.vocab[""] = UNKNOWN
+        compiled.pad = len(words)
+        compiled.valence = valence
+        compiled.in_lexicon = in_lexicon
+        compiled.booster = booster
+        compiled.negates = negates
+        return compiled
+
+    def ids(self, *words):
+        return [self.vocab[w] for w in words]
+
+    def phrase_ids(self, phrases):
+        """
+        (word ids, value) for each multi-word phrase in phrases.
+        """
+        return [(tuple(self.ids(*p.split())), value) for p, value in phrases.items() if " " in p]
+
+
+class VectorScorer:
+    """
+    Drop-in replacement for SentimentIntensityAnalyzer.polarity_scores over
+    a batch of texts. Texts are tokenized once into one flat array of token
+    ids; VADER's per-token rules (boosters, ALL CAPS, negation windows,
+    idioms, "least", "but") then run as NumPy operations over the whole
+    batch, shifted by at most three positions within each text.
+    """
+
+    def __init__(self, lexicon, emojis):
+        # lexicon is VADER's word -> valence dict, or already compiled
+        self.lexicon = lexicon if isinstance(lexicon, CompiledLexicon) else CompiledLexicon(lexicon)
+        self.emojis = emojis
+        self._token_cache = {}
+
+        L = self.lexicon
+        (self.NO, self.OR, self.NOR, self.BUT, self.LEAST, self.AT, self.VERY,
+         self.NEVER, self.SO, self.THIS, self.WITHOUT, self.DOUBT, self.KIND, self.OF) = L.ids(*RULE_WORDS)
+        self.special_cases = L.phrase_ids(SPECIAL_CASES)
+        self.booster_phrases = L.phrase_ids(BOOSTER_DICT)
+
+    def _replace_emojis(self, text):
+        # Same conversion as polarity_scores, skipped for plain ASCII text
+        if text.isascii():
+            return text.strip()
+        text_no_emoji = ""
+        prev_space = True
+        for ch in text:
+            if ch in self.emojis:
+                if not prev_space:
+                    text_no_emoji += ' '
+                text_no_emoji += self.emojis[ch]
+                prev_space = False
+            else:
+                text_no_emoji += ch
+                prev_space = ch == ' '
+        return text_no_emoji.strip()
+
+    def _encode_token(self, token):
+        """
+        Token id * 2 + is-ALL-CAPS for a whitespace-separated token.
+        """
+        stripped = token.strip(string.punctuation)
+        if len(stripped) <= 2:
+            stripped = token
+        lower = stripped.lower()
+        token_id = self.lexicon.vocab.get(lower)
+        if token_id is None:
+            token_id = UNKNOWN_NEGATION if "n't" in lower else UNKNOWN
+        code = token_id * 2 + stripped.isupper()
+        if len(self._token_cache) >= TOKEN_CACHE_SIZE:
+            self._token_cache.clear()
+        self._token_cache[token] = code
+        return code
+
+    def tokenize(self, texts):
+        """
+        Encoded tokens of all texts as one array, plus tokens per text and
+        the "!"/"?" emphasis per text.
+        """
+        cache = self._token_cache
+        encode = self._encode_token
+        codes = []
+        lengths = np.zeros(len(texts), dtype=np.intp)
+        emphasis = np.zeros(len(texts), dtype=np.float64)
+        for t, text in enumerate(texts):
+            text = self._replace_emojis(text)
+            tokens = text.split()
+            codes.extend([cache[token] if token in cache else encode(token) for token in tokens])
+            lengths[t] = len(tokens)
+            emphasis[t] = punctuation_emphasis(text)
+        return np.asarray(codes, dtype=np.int64), lengths, emphasis
+
+    def valences(self, ids, upper, doc, pos, length, cap_diff):
+        """
+        Per-token sentiment valence before the "but" rule, i.e. what
+        sentiment_valence() appends for each token.
+        """
+        L = self.lexicon
+        pad = L.pad
+
+        def shift(offset, values=ids, fill=pad):
+            # values[i + offset] when it lies in the same text, else fill
+            shifted = np.full_like(values, fill)
+            if offset < 0:
+                shifted[-offset:] = values[:offset]
+                inside = pos >= -offset
+            else:
+                shifted[:-offset] = values[offset:]
+                inside = pos + offset < length
+            return np.where(inside, shifted, fill)
+
+        prev = [None, shift(-1), shift(-2), shift(-3)]
+        prev_upper = [None, shift(-1, upper, False), shift(-2, upper, False), shift(-3, upper, False)]
+        next1, next2 = shift(1), shift(2)
+        in_lexicon = L.in_lexicon
+
+        # Boosters and "kind of" carry no valence of their own
+        scored = in_lexicon[ids] & (L.booster[ids] == 0) & ~((ids == self.KIND) & (next1 == self.OF))
+
+        base = L.valence[ids]
+        valence = np.where((ids == self.NO) & in_lexicon[next1], 0.0, base)
+        after_no = (prev[1] == self.NO) | (prev[2] == self.NO) | \
+            ((prev[3] == self.NO) & ((prev[1] == self.OR) | (prev[1] == self.NOR)))
+        valence = np.where(after_no, base * N_SCALAR, valence)
+
+        caps = upper & cap_diff
+        valence = np.where(caps, np.where(valence > 0, valence + C_INCR, valence - C_INCR), valence)
+
+        for start_i, damp in ((0, 1.0), (1, 0.95), (2, 0.9)):
+            word = prev[start_i + 1]
+            active = (pos > start_i) & ~in_lexicon[word]
+
+            scalar = L.booster[word]
+            scalar = np.where(valence < 0, -scalar, scalar)
+            boost_caps = (scalar != 0) & prev_upper[start_i + 1] & cap_diff
+            scalar = np.where(boost_caps, np.where(valence > 0, scalar + C_INCR, scalar - C_INCR), scalar)
+            valence = np.where(active, valence + scalar * damp, valence)
+
+            if start_i == 0:
+                negated = L.negates[prev[1]]
+                valence = np.where(active & negated, valence * N_SCALAR, valence)
+            else:
+                far = prev[start_i + 1]
+                so_this = (prev[start_i] == self.SO) | (prev[start_i] == self.THIS)
+                if start_i == 1:
+                    never_so = (far == self.NEVER) & so_this
+                    without_doubt = (far == self.WITHOUT) & (prev[1] == self.DOUBT)
+                else:
+                    never_so = ((far == self.NEVER) & so_this) | (prev[1] == self.SO) | (prev[1] == self.THIS)
+                    without_doubt = (far == self.WITHOUT) & ((prev[2] == self.DOUBT) | (prev[1] == self.DOUBT))
+                negated = ~never_so & ~without_doubt & L.negates[far]
+                valence = np.where(active & never_so, valence * 1.25, valence)
+                valence = np.where(active & negated, valence * N_SCALAR, valence)
+
+            if start_i == 2:
+                valence = self._special_idioms(valence, active, ids, prev, next1, next2)
+
+        least = ~in_lexicon[prev[1]] & (prev[1] == self.LEAST)
+        at_very = (prev[2] == self.AT) | (prev[2] == self.VERY)
+        least &= (pos == 1) | ((pos > 1) & ~at_very)
+        valence = np.where(least, valence * N_SCALAR, valence)
+
+        return np.where(scored, valence, 0.0)
+
+    def _special_idioms(self, valence, active, ids, prev, next1, next2):
+        window = {0: ids, -1: prev[1], -2: prev[2], -3: prev[3], 1: next1, 2: next2}
+
+        def matches(offsets, phrase):
+            if len(offsets) != len(phrase):
+                return np.zeros(len(ids), dtype=bool)
+            match = np.ones(len(ids), dtype=bool)
+            for offset, word in zip(offsets, phrase):
+                match &= window[offset] == word
+            return match
+
+        # The first preceding sequence that is a special case wins; the
+        # sequences starting at the word itself override it
+        idiom = np.full(len(ids), np.nan)
+        for offsets in ((-1, 0), (-2, -1, 0), (-2, -1), (-3, -2, -1), (-3, -2)):
+            for phrase, value in self.special_cases:
+                idiom[np.isnan(idiom) & matches(offsets, phrase)] = value
+        for offsets in ((0, 1), (0, 1, 2)):
+            for phrase, value in self.special_cases:
+                idiom[matches(offsets, phrase)] = value
+        valence = np.where(active & ~np.isnan(idiom), idiom, valence)
+
+        for offsets in ((-3, -2), (-2, -1)):
+            for phrase, value in self.booster_phrases:
+                valence = np.where(active & matches(offsets, phrase), valence + value, valence)
+        return valence
+
+    def score_batch(self, texts):
+        """
+        [neg, neu, pos, compound] per text as an (n, 4) float64 array,
+        unrounded.
+        """
+        texts = list(texts)
+        count = len(texts)
+        codes, lengths, emphasis = self.tokenize(texts)
+        ids, upper = codes >> 1, (codes & 1).astype(bool)
+
+        doc = np.repeat(np.arange(count), lengths)
+        starts = np.cumsum(lengths) - lengths
+        pos = np.arange(len(ids)) - starts[doc]
+        length = lengths[doc]
+
+        # Some but not all words of the text are ALL CAPS
+        upper_count = np.bincount(doc, weights=upper, minlength=count)
+        cap_diff = ((lengths - upper_count) > 0) & (upper_count > 0)
+
+        sentiments = self.valences(ids, upper, doc, pos, length, cap_diff[doc])
+
+        # "but": halve what comes before the first one, boost what comes after
+        first_but = np.full(count, np.iinfo(np.intp).max)
+        is_but = ids == self.BUT
+        np.minimum.at(first_but, doc[is_but], pos[is_but])
+        but_at = first_but[doc]
+        has_but = but_at != np.iinfo(np.intp).max
+        factor = np.where(pos < but_at, 0.5, np.where(pos > but_at, 1.5, 1.0))
+        scaled = np.where(has_but, sentiments * factor, sentiments)
+        # VADER finds each value with list.index(); where a scaled value
+        # equals another value in the text that picks an earlier position,
+        # so replay its loop for those few texts
+        starts_of = starts.tolist()
+        for t in colliding_texts(doc, sentiments, scaled, has_but):
+            start, end = starts_of[t], starts_of[t] + lengths[t]
+            scaled[start:end] = but_check(sentiments[start:end].tolist(), first_but[t])
+        sentiments = scaled
+
+        total = np.bincount(doc, weights=sentiments, minlength=count)
+        total = np.where(total > 0, total + emphasis, np.where(total < 0, total - emphasis, total))
+        compound = np.clip(total / np.sqrt(total * total + 15), -1.0, 1.0)
+
+        pos_sum = np.bincount(doc, weights=np.where(sentiments > 0, sentiments + 1, 0.0), minlength=count)
+        neg_sum = np.bincount(doc, weights=np.where(sentiments < 0, sentiments - 1, 0.0), minlength=count)
+        neu_count = np.bincount(doc, weights=sentiments == 0, minlength=count)
+        pos_sum, neg_sum = (
+            np.where(pos_sum > -neg_sum, pos_sum + emphasis, pos_sum),
+            np.where(pos_sum < -neg_sum, neg_sum - emphasis, neg_sum)
+        )
+
+        scores = np.zeros((count, 4), dtype=np.float64)
+        has_tokens = lengths > 0
+        denominator = np.where(has_tokens, pos_sum - neg_sum + neu_count, 1.0)
+        scores[:, 0] = np.abs(neg_sum / denominator)
+        scores[:, 1] = np.abs(neu_count / denominator)
+        scores[:, 2] = np.abs(pos_sum / denominator)
+        scores[:, 3] = compound
+        scores[~has_tokens] = 0.0
+        return scores
+
+    def polarity_scores(self, texts):
+        """
+        One polarity_scores()-style dict per text, rounded the same way.
+        """
+        return [
+            {"neg": round(neg, 3), "neu": round(neu, 3), "pos": round(pos, 3), "compound": round(compound, 4)}
+            for neg, neu, pos, compound in self.score_batch(texts).tolist()
+        ]
+
+
+def punctuation_emphasis(text):
+    """
+    VADER's intensity boost from up to four "!" and from two or more "?".
+    """
+    ep_amplifier = min(text.count("!"), 4) * 0.292
+    qm_count = text.count("?")
+    qm_amplifier = 0
+    if qm_count > 1:
+        qm_amplifier = qm_count * 0.18 if qm_count <= 3 else 0.96
+    return ep_amplifier + qm_amplifier
+
+
+def colliding_texts(doc, original, scaled, has_but):
+    """
+    Texts where a nonzero scaled value equals a nonzero original value.
+    """
+    candidates = has_but & (original != 0)
+    docs = np.concatenate([doc[candidates], doc[candidates]])
+    values = np.concatenate([original[candidates], scaled[candidates]])
+    scaled_flag = np.repeat([False, True], candidates.sum())
+    order = np.lexsort((scaled_flag, values, docs))
+    docs, values, scaled_flag = docs[order], values[order], scaled_flag[order]
+    same = (docs[1:] == docs[:-1]) & (values[1:] == values[:-1]) & (scaled_flag[1:] != scaled_flag[:-1])
+    return np.unique(docs[1:][same]).tolist()
+
+
+def but_check(sentiments, but_index):
+    """
+    VADER's _but_check loop on one text's sentiments, index quirk included.
+    """
+    for sentiment in sentiments:
+        si = sentiments.index(sentiment)
+        if si < but_index:
+            sentiments[si] = sentiment * 0.5
+        elif si > but_index:
+            sentiments[si] = sentiment * 1.5
+    return sentiments
@@ -0,0 +1,93 @@
+"""
+ASGI endpoints (asgi.py) over an in-memory product model.
+
+Run with pytest:
+    python -m pytest test_asgi.py
+"""
+from datetime import datetime
+
+import pytest
+from bson.objectid import ObjectId
+from starlette.testclient import TestClient
+
+import asgi
+
+PRODUCT_ID = ObjectId()
+
+class MemoryProductModel:
+    def __init__(self, products):
+        self.products = {str(p["_id"]): p for p in products}
+
+    async def get_product_by_id(self, product_id):
+        return self.products.get(product_id)
+
+    async def get_all_products(self):
+        return list(self.products.values())
+
+    async def get_product_by_url(self, product_url):
+        return next((p for p in self.products.values() if p["product_url"] == product_url), None)
+
+    async def create_product(self, product_name, product_url, reviews_data, product_type=None):
+        # As when the insert is still queued in the write buffer
+        return str(ObjectId()), "pending"
+
+@pytest.fixture
+def client(monkeypatch):
+    now = datetime(2026, 1, 2, 3, 4, 5)
+    product = {
+        "_id": PRODUCT_ID,
+        "product_name": "Acme Phone",
+        "product_url": "https://example.com/p/1",
+        "created_at": now,
+        "updated_at": now,
+        # Set by the request tracker and the refresh scheduler
+        "last_requested_at": now,
+        "next_refresh_at": now,
+        "sentiment_summary": {"Positive": 1, "Negative": 0, "Neutral": 0},
+        "reviews": [{"text": "Works great", "sentiment": "Positive"}],
+    }
+    monkeypatch.setattr(asgi, "db_connected", True)
+    monkeypatch.setattr(asgi, "product_model", MemoryProductModel([product]))
+    monkeypatch.setattr(asgi, "sync_product_model", None)
+    monkeypatch.setattr(asgi.async_db_connection, "is_available", lambda analytics=False: True)
+    # No lifespan: the in-memory model stands in for the database
+    return TestClient(asgi.app)
+
+def test_get_product_with_request_tracking_dates(client):
+    response = client.get(f"/products/{PRODUCT_ID}")
+    assert response.status_code == 200
+    product = response.json()["product"]
+    assert product["_id"] == str(PRODUCT_ID)
+    assert product["last_requested_at"] == "2026-01-02 03:04:05"
+    assert product["next_refresh_at"] == "2026-01-02 03:04:05"
+
+def test_get_all_products(client):
+    response = client.get("/products")
+    assert response.status_code == 200
+    assert response.json()["products"][0]["last_requested_at"] == "2026-01-02 03:04:05"
+
+def test_analyze_product_already_analyzed(client):
+    response = client.post("/analyze-product?reviews=none", json={"url": "https://example.com/p/1"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["message"] == "Product already analyzed"
+    assert body["product_id"] == str(PRODUCT_ID)
+    assert body["reviews_total"] == 1
+    assert body["reviews"] == []
+
+def test_analyze_product_requires_url(client):
+    response = client.post("/analyze-product", json={})
+    assert response.status_code == 400
+
+def test_analyze_product_pending_store(client, monkeypatch):
+    async def get_reviews_async(product_url, executor=None):
+        return [{"text": "Battery lasts all day"}], "Acme Watch", {"extraction": "selectors", "rating": 4.5}
+    monkeypatch.setattr(asgi, "get_reviews_async", get_reviews_async)
+    monkeypatch.setattr(asgi, "ANALYZE_MODE", "inline")
+
+    response = client.post("/analyze-product", json={"url": "https://example.com/p/2"})
+    assert response.status_code == 202
+    body = response.json()
+    assert body["stored"] == "pending"
+    assert body["product_name"] == "Acme Watch"
+    assert body["reviews_total"] == 1
@@ -0,0 +1,30 @@
+"""
+Review deduplication (scraper/dedupe.py).
+
+Run with pytest:
+    python -m pytest test_dedupe.py
+"""
+from scraper.dedupe import dedupe_reviews
+
+def texts(reviews):
+    return [r["text"] for r in dedupe_reviews([{"text": t} for t in reviews])]
+
+def test_exact_duplicates_dropped():
+    assert texts(["Great phone!", "great phone", "Battery died in a week."]) == ["Great phone!", "Battery died in a week."]
+
+def test_parent_element_dropped():
+    child = "Sturdy build and the battery easily lasts two full days of heavy use."
+    assert texts([child, f"{child} Verified", "Screen scratches too easily."]) == [child, "Screen scratches too easily."]
+
+def test_parent_of_several_children_dropped():
+    first = "Sturdy build and the battery easily lasts two full days."
+    second = "Camera is sharp in daylight but struggles indoors."
+    assert texts([first, second, f"{first} {second}"]) == [first, second]
+
+def test_longer_review_quoting_a_short_one_kept():
+    reviews = [
+        "Very good product",
+        "Very good product, exactly as described and delivered two days early. Would buy again.",
+        "Terrible. Not a very good product at all, returned it.",
+    ]
+    assert texts(reviews) == reviews
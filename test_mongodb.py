@@ -21,7 +21,7 @@ def test_connection():
                 "reviews": [{"text": "Great product!", "sentiment": "Positive"}]
             }
             
-            product_id = product_model.create_product(
+            product_id, _ = product_model.create_product(
                 "Test Product", 
                 "https://example.com/test", 
                 sample_data
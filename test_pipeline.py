@@ -1,16 +1,15 @@
 from scraper.scraper import get_reviews
-from sentiment.sentiment import analyze_sentiment
+from sentiment.sentiment import summarize_reviews
 
 # Amazon product review URL
 url = "https://www.amazon.in/product-reviews/B0CHX7HK9Y"
 
 # Step 1: get reviews
-reviews = get_reviews(url)
+reviews, product_name, page_data = get_reviews(url)
 
 # Step 2: analyze sentiment for each review
-for r in reviews:
-    sentiment = analyze_sentiment(r["text"])
-    r["sentiment"] = sentiment
+reviews_data = summarize_reviews(reviews)
 
 # Step 3: print final result
-print(reviews)
+print(product_name, page_data["rating"], reviews_data["summary"])
+print(reviews_data["reviews"].to_documents())
@@ -0,0 +1,53 @@
+"""
+Review archiving (database/retention.py) over an in-memory MongoDB.
+
+Run with pytest (needs mongomock):
+    python -m pytest test_retention.py
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from database.retention import ReviewArchive
+
+@pytest.fixture
+def archive():
+    db = mongomock.MongoClient()["retention_test"]
+    return ReviewArchive(db["products"], db["review_archive"], store="collection")
+
+def add_product(archive, days_old):
+    return archive.products.insert_one({
+        "product_url": "https://example.com/p/1",
+        "updated_at": datetime.utcnow() - timedelta(days=days_old),
+        "reviews": [{"text": "Works great", "sentiment": "Positive"}, {"text": "Broke in a week", "sentiment": "Negative"}],
+    }).inserted_id
+
+def test_archive_then_restore(archive):
+    product_id = add_product(archive, days_old=100)
+    assert archive.archive(older_than_days=90)["products"] == 1
+    product = archive.products.find_one({"_id": product_id})
+    assert "reviews" not in product and product["reviews_archived"]["count"] == 2
+
+    assert archive.restore(product_id) == 2
+    product = archive.products.find_one({"_id": product_id})
+    assert [r["text"] for r in product["reviews"]] == ["Works great", "Broke in a week"]
+    assert "reviews_archived" not in product
+
+def test_restored_reviews_are_not_archived_again(archive):
+    product_id = add_product(archive, days_old=100)
+    archive.archive(older_than_days=90)
+    archive.restore(product_id)
+
+    # updated_at is still old, but the reviews were just restored
+    assert archive.archive(older_than_days=90)["products"] == 0
+    assert "reviews" in archive.products.find_one({"_id": product_id})
+
+def test_restored_reviews_age_from_restore(archive):
+    product_id = add_product(archive, days_old=100)
+    archive.archive(older_than_days=90)
+    archive.restore(product_id)
+    archive.products.update_one({"_id": product_id}, {"$set": {"restored_at": datetime.utcnow() - timedelta(days=91)}})
+
+    assert archive.archive(older_than_days=90)["products"] == 1
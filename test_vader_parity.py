@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+VADER Parity Test
+Checks that the vectorized scorer (sentiment/vector_scorer.py) gives the
+same polarity scores as SentimentIntensityAnalyzer.polarity_scores, on
+review sentences, VADER's own examples and a seeded random corpus that
+exercises boosters, negations, ALL CAPS, "but", "least", idioms,
+punctuation and emoji. Also compares throughput.
+
+Usage:
+    python test_vader_parity.py --texts 20000
+    python -m pytest test_vader_parity.py
+"""
+import argparse
+import random
+import time
+
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer, BOOSTER_DICT, NEGATE, SPECIAL_CASES
+from sentiment.vector_scorer import VectorScorer, RULE_WORDS
+from sentiment.lexicon_artifact import LexiconAnalyzer, build, load
+from scraper.scraper import get_mock_reviews
+from scraper.synthetic import generate_reviews
+
+# polarity_scores rounds to 3 (neg/neu/pos) and 4 (compound) places
+TOLERANCE = 1e-3
+
+analyzer = SentimentIntensityAnalyzer()
+scorer = VectorScorer(analyzer.lexicon, analyzer.emojis)
+
+EXAMPLES = [
+    "VADER is smart, handsome, and funny.",
+    "VADER is smart, handsome, and funny!",
+    "VADER is very smart, handsome, and funny.",
+    "VADER is VERY SMART, handsome, and FUNNY.",
+    "VADER is VERY SMART, handsome, and FUNNY!!!",
+    "VADER is VERY SMART, uber handsome, and FRIGGIN FUNNY!!!",
+    "VADER is not smart, handsome, nor funny.",
+    "The book was good.",
+    "At least it isn't a horrible book.",
+    "The book was only kind of good.",
+    "The plot was good, but the characters are uncompelling and the dialog is not great.",
+    "Today SUX!",
+    "Today only kinda sux! But I'll get by, lol",
+    "Make sure you :) or :D today!",
+    "Catch utf-8 emoji such as 💘 and 💋 and 😁",
+    "Not bad at all",
+    "This phone is amazing",
+    "Worst phone ever",
+    "Phone is okay",
+    "It is without doubt the best phone, never so happy",
+    "No good, no problems or issues",
+    "The camera is the bomb but the battery is the shit",
+    "Least useful charger, not the least bit worth it, at least it works",
+    "Good good good but good",
+    "",
+    "   ",
+    "!!! ???",
+]
+
+def random_corpus(count, seed=7):
+    """
+    Random word sequences drawn from lexicon, booster, negation, rule and
+    idiom words, with some ALL CAPS, trailing punctuation and emoji.
+    """
+    rng = random.Random(seed)
+    lexicon_words = sorted(analyzer.lexicon)
+    pool = rng.sample(lexicon_words, 400) + list(BOOSTER_DICT) + NEGATE + list(RULE_WORDS) + list(SPECIAL_CASES)
+    pool += ["the", "a", "phone", "battery", "camera", "!", "??", ":)", ":(", "💘", "😁", "😡"]
+    texts = []
+    for _ in range(count):
+        words = [rng.choice(pool) for _ in range(rng.randint(0, 20))]
+        words = [w.upper() if rng.random() < 0.1 else w for w in words]
+        words = [w + rng.choice([",", "!", "?", ".", "..."]) if rng.random() < 0.3 else w for w in words]
+        texts.append(" ".join(words))
+    return texts
+
+def review_corpus():
+    synthetic = [r["text"] for r in generate_reviews(2000, "electronics", "Nova Speaker Pro", seed=3, duplicate_rate=0.1)]
+    return [r["text"] for r in get_mock_reviews(10)] + synthetic + EXAMPLES
+
+def mismatches(texts):
+    expected = [analyzer.polarity_scores(text) for text in texts]
+    actual = scorer.polarity_scores(texts)
+    return [
+        (text, e, a) for text, e, a in zip(texts, expected, actual)
+        if any(abs(e[key] - a[key]) > TOLERANCE for key in e)
+    ]
+
+def test_examples_match():
+    assert mismatches(review_corpus()) == []
+
+def test_random_corpus_matches():
+    assert mismatches(random_corpus(5000)) == []
+
+def test_batch_order_independent():
+    texts = review_corpus()
+    one_by_one = [scorer.polarity_scores([text])[0] for text in texts]
+    assert one_by_one == scorer.polarity_scores(texts)
+
+def test_empty_batch():
+    assert scorer.polarity_scores([]) == []
+
+def test_lexicon_artifact_matches(tmp_path):
+    lexicon, emojis, compiled = load(build(str(tmp_path / "vader_lexicon.bin")))
+    texts = review_corpus() + random_corpus(1000)
+    expected = [analyzer.polarity_scores(text) for text in texts]
+    assert [LexiconAnalyzer(lexicon, emojis).polarity_scores(text) for text in texts] == expected
+    assert VectorScorer(compiled, emojis).polarity_scores(texts) == scorer.polarity_scores(texts)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the vectorized scorer with VADER")
+    parser.add_argument("--texts", type=int, default=20000)
+    args = parser.parse_args()
+
+    print("🧪 VADER Parity Test")
+    print("=" * 50)
+
+    texts = review_corpus() + random_corpus(args.texts)
+    bad = mismatches(texts)
+    if bad:
+        print(f"❌ {len(bad)} of {len(texts)} texts differ by more than {TOLERANCE}")
+        for text, expected, actual in bad[:10]:
+            print(f"   {text!r}\n      vader: {expected}\n      vector: {actual}")
+    else:
+        print(f"✅ All {len(texts)} texts match within {TOLERANCE}")
+
+    # Throughput on review-length texts
+    reviews = [f"{text} {text}" for text in random_corpus(args.texts, seed=11)]
+    start = time.perf_counter()
+    for text in reviews:
+        analyzer.polarity_scores(text)
+    vader_time = time.perf_counter() - start
+    start = time.perf_counter()
+    scorer.polarity_scores(reviews)
+    vector_time = time.perf_counter() - start
+    print(f"⏱️  vader:      {len(reviews) / vader_time:,.0f} texts/s")
+    print(f"⏱️  vectorized: {len(reviews) / vector_time:,.0f} texts/s ({vader_time / vector_time:.1f}x)")
+
+    return not bad
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Scrape Worker
+Runs queued /analyze-product jobs (ANALYZE_MODE=queue) from the jobs
+collection: scrape, score and store, then write the result back to the job.
+
+Jobs are claimed under a lease that is renewed while the job runs, so any
+number of workers on any number of hosts can share the queue, and a job
+whose worker died is picked up again once its lease expires.
+
+Run as its own process (several per host is fine):
+    python worker.py
+"""
+import sys
+import os
+import signal
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database.connection import db_connection
+from log_utils import configure_logging, get_logger, set_request_id
+
+logger = get_logger("worker")
+
+# Jobs run concurrently by one worker process
+WORKER_CONCURRENCY = int(os.getenv('WORKER_CONCURRENCY', '1'))
+# Seconds between claim attempts while the queue is empty
+WORKER_POLL_SECONDS = float(os.getenv('WORKER_POLL_SECONDS', '2'))
+
+class LeaseLost(Exception):
+    pass
+
+class MockData(Exception):
+    """
+    The scrape fell back to mock reviews; the job is retried instead of
+    storing them.
+    """
+    def __init__(self, page_data):
+        super().__init__(f"No real reviews ({page_data.get('block_reason') or page_data.get('mock_reason')})")
+        self.retry_after = page_data.get('retry_after')
+
+def analyze(job, product_model, lease_lost):
+    """
+    The /analyze-product pipeline for one job. Returns the job result.
+    """
+    from scraper.scraper import get_reviews, detect_product_type
+    from sentiment.sentiment import summarize_reviews
+
+    product_url = job['product_url']
+    # A retried job may find the product stored by its previous attempt
+    existing = product_model.get_product_by_url(product_url)
+    if existing:
+        return {'product_id': str(existing['_id']), 'product_name': existing.get('product_name'), 'existing': True}
+
+    reviews, extracted_product_name, page_data = get_reviews(product_url)
+    if page_data['extraction'] == 'mock':
+        raise MockData(page_data)
+    product_name = extracted_product_name if extracted_product_name != "Unknown Product" else job.get('product_name', "Unknown Product")
+
+    reviews_data = summarize_reviews(reviews)
+    reviews_data['rating'] = page_data.get('rating')
+
+    # Another worker owns the job now and will store the product
+    if lease_lost.is_set():
+        raise LeaseLost()
+    product_type = detect_product_type(product_url, product_name)
+    product_id, stored = product_model.create_product(product_name, product_url, reviews_data, product_type)
+    return {
+        'product_id': product_id,
+        'stored': stored,
+        'product_name': product_name,
+        'reviews_total': len(reviews_data['reviews']),
+        'extraction': page_data.get('extraction')
+    }
+
+class Worker:
+    def __init__(self, job_queue, product_model, name, poll_seconds=WORKER_POLL_SECONDS):
+        self.job_queue = job_queue
+        self.product_model = product_model
+        self.name = name
+        self.poll_seconds = poll_seconds
+        self.stopping = threading.Event()
+        self.processed = 0
+        self.failed = 0
+
+    def run_once(self):
+        """
+        Claims and runs one job. False when the queue had nothing due.
+        """
+        from database.jobs import Heartbeat
+
+        job = self.job_queue.claim(self.name)
+        if not job:
+            return False
+
+        job_id = str(job['_id'])
+        set_request_id(f"job-{job_id}")
+        logger.info("Claimed job", extra={"job_id": job_id, "url": job['product_url'], "attempt": job['attempts']})
+        try:
+            with Heartbeat(self.job_queue, job, self.name) as heartbeat:
+                result = analyze(job, self.product_model, heartbeat.lost)
+        except LeaseLost:
+            logger.warning("Dropped job after losing its lease", extra={"job_id": job_id})
+            return True
+        except Exception as e:
+            self.failed += 1
+            logger.warning("Job failed: %s", e, extra={"job_id": job_id, "attempt": job['attempts']})
+            # While a site's breaker is open, retry when it is due to close
+            self.job_queue.fail(job, self.name, str(e), getattr(e, 'retry_after', None))
+            return True
+
+        if self.job_queue.complete(job, self.name, result):
+            self.processed += 1
+            logger.info("Job done", extra={"job_id": job_id, "product_id": result['product_id']})
+        else:
+            logger.warning("Job finished after its lease was taken over", extra={"job_id": job_id})
+        return True
+
+    def run_forever(self):
+        while not self.stopping.is_set():
+            try:
+                self.job_queue.expire_exhausted()
+                if self.run_once():
+                    continue
+            except Exception as e:
+                logger.error("Worker pass failed: %s", e)
+            self.stopping.wait(self.poll_seconds)
+
+def main():
+    configure_logging()
+    if not db_connection.connect():
+        print("❌ Database is NOT connected")
+        return False
+
+    from database.models import product_model, job_queue
+    from database.jobs import worker_name
+    from scraper.browser_supervisor import browser_supervisor
+    browser_supervisor.start()
+
+    workers = [Worker(job_queue, product_model, worker_name(str(i))) for i in range(WORKER_CONCURRENCY)]
+    threads = [threading.Thread(target=w.run_forever, name=w.name) for w in workers]
+
+    def stop(signum, frame):
+        # Finish the running jobs; unclaimed ones stay queued
+        for worker in workers:
+            worker.stopping.set()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    print(f"⚙️  Scrape worker {worker_name()} running {WORKER_CONCURRENCY} job(s) at a time")
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Stats and history writes of the last jobs may still be buffered
+    from database.write_buffer import write_buffer
+    write_buffer.stop()
+    return True
+
+if __name__ == "__main__":
+    main()